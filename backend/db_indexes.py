@@ -0,0 +1,113 @@
+"""
+Declarative MongoDB index provisioning and query plan reporting
+"""
+
+import os
+import logging
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _status_check_ttl_indexes():
+    """Optional retention for status checks, in seconds (unset keeps them forever)"""
+    ttl = os.environ.get("STATUS_CHECK_TTL_SECONDS")
+    if not ttl:
+        return []
+    # TTL indexes must be single-field; without one, timestamp_id already serves timestamp sorts
+    return [IndexModel([("timestamp", DESCENDING)], name="timestamp", expireAfterSeconds=int(ttl))]
+
+
+def index_models():
+    """Indexes every collection should have, keyed by collection name"""
+    return {
+        "rooms": [
+            IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+            IndexModel([("created_at", DESCENDING)], name="created_at"),
+        ],
+        "status_checks": [
+            IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+            # Keyset pagination walks (timestamp, id) newest first
+            IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id"),
+            *_status_check_ttl_indexes(),
+        ],
+    }
+
+
+# Keyset cursor filter used by /api/status/page after the first page
+_AFTER_CURSOR = {"$or": [
+    {"timestamp": {"$lt": datetime(2000, 1, 1)}},
+    {"timestamp": datetime(2000, 1, 1), "id": {"$lt": "__probe__"}},
+]}
+_NEWEST_FIRST = [("timestamp", DESCENDING), ("id", DESCENDING)]
+_STATUS_CHECK_FIELDS = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
+# Reads issued by request handlers, exactly as the handlers issue them:
+# (handler, collection, filter, projection, sort, limit). Room writes filter on
+# {"id": ...} like the room lookup, so they are covered by its shape.
+QUERY_SHAPES = [
+    ("GET /api/rooms/{room_id}", "rooms", {"id": "__probe__"}, {"_id": 0, "chat_messages": 0}, None, 1),
+    ("POST /api/rooms/join", "rooms", {"id": "__probe__"}, {"_id": 0, "chat_messages": 1}, None, 1),
+    ("GET /api/status", "status_checks", {}, _STATUS_CHECK_FIELDS, [("timestamp", ASCENDING)], 1000),
+    ("GET /api/status/page", "status_checks", {}, _STATUS_CHECK_FIELDS, _NEWEST_FIRST, 101),
+    ("GET /api/status/page?cursor", "status_checks", _AFTER_CURSOR, _STATUS_CHECK_FIELDS, _NEWEST_FIRST, 101),
+    ("GET /api/status/export", "status_checks", {}, _STATUS_CHECK_FIELDS, _NEWEST_FIRST, None),
+]
+
+
+async def ensure_indexes(db):
+    """Create any missing indexes; existing ones are left untouched"""
+    created = {}
+    for collection, models in index_models().items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # Typically an index with the same name but different options, or duplicate ids
+            logger.error(f"Could not create indexes on {collection}: {e}")
+            created[collection] = []
+    logger.info(f"Indexes ensured: {created}")
+    return created
+
+
+def _plan_stages(plan):
+    """Flatten the stage names of a winning plan tree"""
+    if not plan:
+        return []
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+async def query_plan_report(db):
+    """Explain every known query shape and flag any that scan a whole collection"""
+    report = []
+    for handler, collection, query, projection, sort, limit in QUERY_SHAPES:
+        cursor = db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        try:
+            explain = await cursor.explain()
+        except Exception as e:
+            report.append({"handler": handler, "collection": collection, "filter": list(query), "error": str(e)})
+            continue
+
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        # Slot-based engine nests the classic plan under queryPlan
+        stages = _plan_stages(winning.get("queryPlan", winning))
+        report.append({
+            "handler": handler,
+            "collection": collection,
+            "filter": list(query),
+            "sort": [field for field, _ in sort] if sort else [],
+            "limit": limit,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+        })
+    return report
@@ -0,0 +1,66 @@
+"""
+Process memory diagnostics for soak tests and leak hunting
+"""
+
+import os
+import logging
+import resource
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDiagnostics:
+    """Reports RSS and, when enabled, allocation growth by source line since startup"""
+
+    def __init__(self):
+        self.enabled = os.environ.get("MEMORY_DIAGNOSTICS", "false").strip().lower() in ("1", "true", "yes", "on")
+        self.tracemalloc_frames = int(os.environ.get("TRACEMALLOC_FRAMES", "0"))
+        self.baseline = None
+
+    def start(self):
+        """Begin tracing allocations; the first snapshot is the baseline growth is measured from"""
+        if self.enabled and self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self.baseline = tracemalloc.take_snapshot()
+            logger.info(f"tracemalloc started with {self.tracemalloc_frames} frames")
+
+    def rss_bytes(self):
+        """Current resident set size; falls back to the peak where /proc is unavailable"""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            # ru_maxrss is KiB on Linux and bytes on macOS; either way it is the peak
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def top_growth(self, limit=10):
+        """Source lines whose allocations grew most since the baseline snapshot"""
+        if self.baseline is None or not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        stats = snapshot.compare_to(self.baseline, "lineno")
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def snapshot(self, sizes, limit=10):
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "rss_bytes": self.rss_bytes(),
+            "traced_bytes": traced[0],
+            "sizes": sizes,
+            "top_growth": self.top_growth(limit),
+        }
+
+# Global memory diagnostics instance
+memory_diagnostics = MemoryDiagnostics()
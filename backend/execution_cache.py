@@ -0,0 +1,191 @@
+"""
+Content-addressed cache for code execution results
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def execution_key(language, version, code, stdin=""):
+    """Hash the inputs that determine an execution's output"""
+    payload = json.dumps([language, version, code, stdin or ""], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExecutionCache:
+    """LRU cache with per-entry TTL for run-code results"""
+
+    def __init__(self):
+        self.enabled = os.environ.get("EXECUTION_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.max_entries = int(os.environ.get("EXECUTION_CACHE_SIZE", "512"))
+        self.ttl = float(os.environ.get("EXECUTION_CACHE_TTL", "300"))
+        self.max_output_bytes = int(os.environ.get("EXECUTION_CACHE_MAX_OUTPUT", "65536"))
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def get(self, key):
+        """Return a cached result, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return dict(result)
+
+    def put(self, key, result):
+        """Store a result unless its output exceeds the size limit"""
+        if not self.enabled or self.max_entries <= 0:
+            return False
+
+        output_size = len(result.get("stdout", "").encode("utf-8")) + len(result.get("stderr", "").encode("utf-8"))
+        if output_size > self.max_output_bytes:
+            self.rejected += 1
+            return False
+
+        self.entries[key] = (time.monotonic() + self.ttl, dict(result))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        self.entries.clear()
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejected_oversize": self.rejected,
+        }
+
+
+class _Flight:
+    """One shared execution, the callers waiting on it and the output it has produced"""
+
+    __slots__ = ("task", "waiters", "streaming", "subscribers", "output")
+
+    def __init__(self, streaming):
+        self.task = None
+        self.waiters = 0
+        self.streaming = streaming
+        self.subscribers = []
+        self.output = []
+
+    async def publish(self, stream_name, text):
+        """Forward output to every caller still waiting on the flight"""
+        self.output.append((stream_name, text))
+        for subscriber in list(self.subscribers):
+            try:
+                await subscriber(stream_name, text)
+            except Exception as e:
+                logger.warning(f"Execution output subscriber failed: {e}")
+
+
+class SingleFlight:
+    """Coalesces concurrent identical executions into one shared upstream call"""
+
+    def __init__(self):
+        # key -> _Flight
+        self.inflight = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key, fn, on_output=None):
+        """Await fn(publish) once per key at a time; returns (result, shared)
+
+        When the first caller passes on_output, publish(stream_name, text) hands
+        output to every caller subscribed with its own on_output; a caller that
+        joins late is first sent the output so far. A caller stops receiving
+        output as soon as it stops waiting. Callers joining a flight started
+        without on_output get the output in one piece when it finishes.
+
+        The shared call is cancelled only when every caller waiting on it is.
+        """
+        flight = self.inflight.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            flight = _Flight(streaming=on_output is not None)
+            flight.task = asyncio.ensure_future(fn(flight.publish if flight.streaming else None))
+            self.inflight[key] = flight
+            self.executions += 1
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        subscribed = False
+        try:
+            if on_output and flight.streaming:
+                sent = 0
+                while sent < len(flight.output):
+                    await on_output(*flight.output[sent])
+                    sent += 1
+                # No await between catching up and subscribing, so no chunk is missed
+                flight.subscribers.append(on_output)
+                subscribed = True
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last waiter gone; stop the call and keep new callers off it
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            if subscribed:
+                flight.subscribers.remove(on_output)
+
+        if on_output and not flight.streaming:
+            for stream_name in ("stdout", "stderr"):
+                if result.get(stream_name):
+                    await on_output(stream_name, result[stream_name])
+        return dict(result), shared
+
+    def _forget(self, key, flight):
+        if self.inflight.get(key) is flight:
+            del self.inflight[key]
+
+    def metrics(self):
+        total = self.executions + self.coalesced
+        return {
+            "inflight": len(self.inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+# Global execution cache instance
+execution_cache = ExecutionCache()
+
+# Global in-flight execution coalescer
+execution_flights = SingleFlight()
@@ -0,0 +1,231 @@
+"""
+Concurrency-limited, room-fair scheduler for code executions
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the wait queue is at capacity"""
+
+
+def _parse_language_limits(value):
+    """Parse 'python=4,cpp=2' into {'python': 4, 'cpp': 2}"""
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        language, limit = item.split("=", 1)
+        limits[language.strip()] = int(limit)
+    return limits
+
+
+class Ticket:
+    """A single execution waiting for, or holding, a slot"""
+
+    __slots__ = ("language", "room_id", "future", "enqueued_at", "started_at", "on_position", "last_position")
+
+    def __init__(self, language, room_id, on_position=None):
+        self.language = language
+        self.room_id = room_id
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.on_position = on_position
+        self.last_position = None
+
+
+class ExecutionScheduler:
+    """Caps concurrent executions globally and per language, serving rooms round-robin"""
+
+    def __init__(self):
+        self.max_concurrent = int(os.environ.get("EXEC_MAX_CONCURRENT", "8"))
+        self.max_per_language = int(os.environ.get("EXEC_MAX_PER_LANGUAGE", str(self.max_concurrent)))
+        self.language_limits = _parse_language_limits(os.environ.get("EXEC_LANGUAGE_LIMITS"))
+        self.max_queue = int(os.environ.get("EXEC_MAX_QUEUE", "100"))
+
+        self.running = 0
+        self.running_by_language = {}
+        # room_id -> deque of waiting tickets; order of keys is the round-robin order
+        self.rooms = OrderedDict()
+        self.waiting = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.wait_samples = deque(maxlen=1000)
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def _language_limit(self, language):
+        return self.language_limits.get(language, self.max_per_language)
+
+    def _has_capacity(self, language):
+        return (self.running < self.max_concurrent and
+                self.running_by_language.get(language, 0) < self._language_limit(language))
+
+    def _start(self, ticket):
+        self.running += 1
+        self.running_by_language[ticket.language] = self.running_by_language.get(ticket.language, 0) + 1
+        ticket.started_at = time.monotonic()
+        wait_ms = (ticket.started_at - ticket.enqueued_at) * 1000
+        self.wait_samples.append(wait_ms)
+        self.total_wait_ms += wait_ms
+        if wait_ms > self.max_wait_ms:
+            self.max_wait_ms = wait_ms
+
+    def _prune(self):
+        """Drop tickets whose waiters were cancelled but have not run their cleanup yet"""
+        for room_id in list(self.rooms):
+            queue = self.rooms[room_id]
+            live = deque(ticket for ticket in queue if not ticket.future.done())
+            if len(live) == len(queue):
+                continue
+            self.waiting -= len(queue) - len(live)
+            if live:
+                self.rooms[room_id] = live
+            else:
+                del self.rooms[room_id]
+
+    def _dispatch(self):
+        """Grant free slots to waiting tickets, one room at a time"""
+        self._prune()
+        progressed = True
+        while progressed and self.waiting and self.running < self.max_concurrent:
+            progressed = False
+            for room_id in list(self.rooms):
+                queue = self.rooms[room_id]
+                ticket = next((t for t in queue if self._has_capacity(t.language)), None)
+                if ticket is None:
+                    continue
+                queue.remove(ticket)
+                self.waiting -= 1
+                if queue:
+                    # Served rooms go to the back of the rotation
+                    self.rooms.move_to_end(room_id)
+                else:
+                    del self.rooms[room_id]
+                # Count the slot as taken only once a live waiter holds it
+                ticket.future.set_result(True)
+                self._start(ticket)
+                progressed = True
+                break
+        self._notify_positions()
+
+    def _position(self, ticket):
+        """Estimate how many tickets will be served before this one, plus one"""
+        queue = self.rooms.get(ticket.room_id)
+        if not queue or ticket not in queue:
+            return 0
+        index = queue.index(ticket)
+        position = index + 1
+        before = True
+        for room_id, other in self.rooms.items():
+            if room_id == ticket.room_id:
+                before = False
+                continue
+            position += min(len(other), index + 1 if before else index)
+        return position
+
+    def _notify_positions(self):
+        for queue in self.rooms.values():
+            for ticket in queue:
+                if ticket.on_position is None:
+                    continue
+                position = self._position(ticket)
+                if position != ticket.last_position:
+                    ticket.last_position = position
+                    try:
+                        ticket.on_position(position)
+                    except Exception as e:
+                        logger.warning(f"Queue position callback failed: {e}")
+
+    def position(self, ticket):
+        """Current 1-based queue position of a ticket, or 0 if it is running"""
+        return self._position(ticket)
+
+    async def acquire(self, language, room_id=None, on_position=None):
+        """Wait for an execution slot and return the granted ticket"""
+        room_id = room_id or ""
+        ticket = Ticket(language, room_id, on_position)
+
+        if not self.waiting and self._has_capacity(language):
+            self._start(ticket)
+            return ticket
+
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Execution queue is full ({self.max_queue} waiting)")
+
+        self.rooms.setdefault(room_id, deque()).append(ticket)
+        self.waiting += 1
+        # Waiters held back by their language's cap must not block a language with free slots
+        self._dispatch()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Slot was granted just as the waiter was cancelled
+                self.release(ticket)
+            else:
+                queue = self.rooms.get(room_id)
+                if queue and ticket in queue:
+                    queue.remove(ticket)
+                    self.waiting -= 1
+                    if not queue:
+                        del self.rooms[room_id]
+                self._dispatch()
+            raise
+        return ticket
+
+    def release(self, ticket):
+        """Return a ticket's slot and wake the next waiter"""
+        self.running -= 1
+        self.running_by_language[ticket.language] -= 1
+        self.completed += 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, language, room_id=None, on_position=None):
+        ticket = await self.acquire(language, room_id, on_position)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def metrics(self):
+        samples = sorted(self.wait_samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+        started = self.completed + self.running
+        return {
+            "running": self.running,
+            "running_by_language": {k: v for k, v in self.running_by_language.items() if v},
+            "waiting": self.waiting,
+            "waiting_rooms": len(self.rooms),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_ms": {
+                "avg": round(self.total_wait_ms / started, 2) if started else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.max_wait_ms, 2),
+            },
+        }
+
+# Global execution scheduler instance
+execution_scheduler = ExecutionScheduler()
@@ -0,0 +1,74 @@
+"""
+Tracks running executions per user and room so they can be cancelled
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionTracker:
+    """Owns execution tasks; a user's new run in a room supersedes the previous one"""
+
+    def __init__(self):
+        # job_id -> (room_id, user_id, task)
+        self.jobs = {}
+        # (room_id, user_id) -> job_id of that user's current run
+        self.current = {}
+        # job_id -> why it was cancelled, for jobs cancelled through the tracker
+        self.reasons = {}
+        self.cancelled = {"superseded": 0, "left": 0, "disconnected": 0, "requested": 0}
+
+    def track(self, job_id, task, room_id=None, user_id=None):
+        """Register a running execution, cancelling the user's earlier run in the room"""
+        if user_id:
+            previous = self.current.get((room_id, user_id))
+            if previous:
+                self.cancel(previous, "superseded")
+            self.current[(room_id, user_id)] = job_id
+
+        self.jobs[job_id] = (room_id, user_id, task)
+        task.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id):
+        room_id, user_id, _ = self.jobs.pop(job_id, (None, None, None))
+        if user_id and self.current.get((room_id, user_id)) == job_id:
+            del self.current[(room_id, user_id)]
+
+    def cancel(self, job_id, reason="requested"):
+        """Cancel one execution; returns False if it is not running"""
+        entry = self.jobs.get(job_id)
+        # A job already cancelled keeps its first reason until its task has unwound
+        if entry is None or entry[2].done() or job_id in self.reasons:
+            return False
+        self.reasons[job_id] = reason
+        self.cancelled[reason] = self.cancelled.get(reason, 0) + 1
+        entry[2].cancel()
+        logger.info(f"Execution {job_id} cancelled ({reason})")
+        return True
+
+    def cancel_user(self, user_id, room_id=None, reason="requested"):
+        """Cancel a user's running executions, optionally only within one room"""
+        job_ids = [
+            job_id for job_id, (job_room, job_user, _) in self.jobs.items()
+            if job_user == user_id and (room_id is None or job_room == room_id)
+        ]
+        return sum(self.cancel(job_id, reason) for job_id in job_ids)
+
+    def owner(self, job_id):
+        """(room_id, user_id) of a running execution, or None"""
+        entry = self.jobs.get(job_id)
+        return (entry[0], entry[1]) if entry else None
+
+    def pop_reason(self, job_id):
+        """Why a job was cancelled by the tracker, or None if it was cancelled elsewhere"""
+        return self.reasons.pop(job_id, None)
+
+    def metrics(self):
+        return {
+            "running": len(self.jobs),
+            "cancelled": dict(self.cancelled),
+        }
+
+# Global execution tracker instance
+execution_tracker = ExecutionTracker()
@@ -0,0 +1,472 @@
+"""
+Pluggable code execution backends for the run-code endpoint
+"""
+
+import os
+import sys
+import signal
+import shutil
+import codecs
+import asyncio
+import logging
+import tempfile
+
+from piston_client import piston_client
+from python_pool import PythonWorkerPool
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class OutputBatcher:
+    """Coalesces streamed output so a chatty program yields a few events per interval, not one per pipe read
+
+    write() matches the on_output callback signature. Buffered text is passed on
+    once it reaches max_bytes, after interval seconds, or before output from the
+    other stream, so stdout/stderr interleaving is preserved. Call close() once
+    the run finishes; writes after close() or cancel() are dropped.
+    """
+
+    def __init__(self, on_output, interval=None, max_bytes=None):
+        self.on_output = on_output
+        if interval is None:
+            interval = float(os.environ.get("EXEC_OUTPUT_FLUSH_MS", "50")) / 1000
+        self.interval = interval
+        self.max_bytes = max_bytes or int(os.environ.get("EXEC_OUTPUT_FLUSH_BYTES", "16384"))
+        self.stream_name = None
+        self.parts = []
+        self.size = 0
+        self.timer = None
+        self.closed = False
+        # Keeps batches in order if a timed flush and a size flush overlap
+        self.lock = asyncio.Lock()
+
+    async def write(self, stream_name, text):
+        if self.closed:
+            return
+        if self.parts and stream_name != self.stream_name:
+            await self.flush()
+        self.stream_name = stream_name
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.max_bytes:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self.timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Pass on everything buffered so far"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.parts:
+            return
+        stream_name, text = self.stream_name, "".join(self.parts)
+        self.parts, self.size = [], 0
+        async with self.lock:
+            await self.on_output(stream_name, text)
+
+    async def close(self):
+        """Pass on the remaining output and stop accepting more"""
+        await self.flush()
+        self.closed = True
+
+    def cancel(self):
+        """Drop buffered output and stop accepting more"""
+        self.closed = True
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.parts, self.size = [], 0
+
+
+class Executor:
+    """Base class for execution backends
+
+    run() takes a RunCodeRequest and returns a dict with the RunCodeResponse
+    fields (stdout, stderr, exit_code and optionally error).
+    """
+
+    name = "base"
+
+    async def start(self):
+        """Called from the application startup hook"""
+
+    async def close(self):
+        """Called from the application shutdown hook"""
+
+    def metrics(self):
+        return {}
+
+    def resolve(self, language):
+        """Map a frontend language name to (backend language, version), or None if unsupported"""
+        raise NotImplementedError
+
+    async def runtimes(self):
+        """List available runtimes as dicts with language, version and aliases"""
+        raise NotImplementedError
+
+    async def run(self, request, language, version):
+        raise NotImplementedError
+
+    async def stream(self, request, language, version, on_output):
+        """Run code, awaiting on_output(stream_name, text) as output arrives
+
+        Backends without incremental output deliver everything once the run ends.
+        """
+        result = await self.run(request, language, version)
+        for stream_name in ("stdout", "stderr"):
+            if result.get(stream_name):
+                await on_output(stream_name, result[stream_name])
+        return result
+
+
+class PistonExecutor(Executor):
+    """Runs code remotely through the Piston API"""
+
+    name = "piston"
+
+    # Map frontend language names to Piston API language names
+    LANGUAGE_MAPPING = {
+        "javascript": "javascript",
+        "python": "python",
+        "cpp": "cpp",
+        "typescript": "typescript",
+        "html": "html",
+        "css": "css"
+    }
+
+    def resolve(self, language):
+        return self.LANGUAGE_MAPPING.get(language, language), "*"
+
+    async def runtimes(self):
+        response = await piston_client.request("GET", "/runtimes")
+        response.raise_for_status()
+        return [
+            {
+                "language": runtime["language"],
+                "version": runtime["version"],
+                "aliases": runtime.get("aliases", [])
+            }
+            for runtime in response.json()
+        ]
+
+    async def run(self, request, language, version):
+        piston_payload = {
+            "language": language,
+            "version": version,
+            "files": [{
+                "content": request.code
+            }],
+            "stdin": request.stdin or ""
+        }
+
+        logger.info("Sending request to Piston API...")
+        response = await piston_client.execute(piston_payload)
+
+        if response.status_code != 200:
+            logger.error(f"Piston API error: {response.status_code} - {response.text}")
+            return {
+                "stdout": "",
+                "stderr": f"Piston API error: {response.status_code}",
+                "exit_code": 1,
+                "error": f"API request failed with status {response.status_code}"
+            }
+
+        result = response.json()
+        compile_result = result.get("compile")
+        if compile_result and (compile_result.get("code") != 0 or compile_result.get("signal")):
+            # Piston skips the run stage when compilation fails
+            compiled = self._stage_result(compile_result)
+            compiled["error"] = compiled.get("error") or "Compilation failed"
+            return compiled
+        return self._stage_result(result.get("run", {}))
+
+    @staticmethod
+    def _stage_result(stage):
+        """Map a Piston stage to a run result; runs killed by a signal (timeouts, OOM) become errors"""
+        result = {
+            "stdout": stage.get("stdout") or "",
+            "stderr": stage.get("stderr") or "",
+            "exit_code": stage.get("code"),
+        }
+        signal_name = stage.get("signal")
+        if signal_name or result["exit_code"] is None:
+            # Report the exit code the way a shell would, as LocalExecutor does
+            signal_number = signal.Signals.__members__.get(signal_name) if signal_name else None
+            result["exit_code"] = 128 + signal_number if signal_number else 1
+            if signal_name == "SIGKILL":
+                result["error"] = stage.get("message") or "Execution killed by SIGKILL (time or memory limit exceeded)"
+            elif signal_name:
+                result["error"] = stage.get("message") or f"Execution terminated by {signal_name}"
+            else:
+                result["error"] = stage.get("message") or "Execution did not complete"
+        return result
+
+
+class LocalExecutor(Executor):
+    """Runs code in local subprocesses with rlimits and a per-run scratch directory"""
+
+    name = "local"
+
+    def __init__(self):
+        self.timeout = float(os.environ.get("LOCAL_EXEC_TIMEOUT", "10"))
+        self.compile_timeout = float(os.environ.get("LOCAL_EXEC_COMPILE_TIMEOUT", "30"))
+        self.cpu_seconds = int(os.environ.get("LOCAL_EXEC_CPU_SECONDS", "5"))
+        self.memory_mb = int(os.environ.get("LOCAL_EXEC_MEMORY_MB", "256"))
+        self.compile_memory_mb = int(os.environ.get("LOCAL_EXEC_COMPILE_MEMORY_MB", "1024"))
+        self.max_output = int(os.environ.get("LOCAL_EXEC_MAX_OUTPUT", "65536"))
+        self.max_file_bytes = int(os.environ.get("LOCAL_EXEC_MAX_FILE_BYTES", str(1024 * 1024)))
+
+        self.python = os.environ.get("LOCAL_EXEC_PYTHON") or sys.executable
+        self.node = shutil.which("node")
+        self.cxx = shutil.which("g++") or shutil.which("clang++")
+        self.versions = {"python": "%d.%d.%d" % sys.version_info[:3]} if self.python == sys.executable else {}
+
+        self.python_pool = None
+        if int(os.environ.get("PYTHON_POOL_SIZE", "0")) > 0:
+            self.python_pool = PythonWorkerPool(self)
+
+    async def start(self):
+        await self._detect_versions()
+        if self.python_pool:
+            await self.python_pool.start()
+
+    async def _detect_versions(self):
+        """Ask each local toolchain for its version so cache keys change on upgrades"""
+        commands = {
+            "python": [self.python, "-c", "import platform; print(platform.python_version())"],
+            "javascript": [self.node, "--version"] if self.node else None,
+            "cpp": [self.cxx, "-dumpfullversion", "-dumpversion"] if self.cxx else None,
+        }
+        for language, argv in commands.items():
+            if not argv:
+                continue
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+                )
+                stdout, _ = await asyncio.wait_for(process.communicate(), 10)
+                version = stdout.decode().strip().lstrip("v")
+                if process.returncode == 0 and version:
+                    self.versions[language] = version
+            except Exception as e:
+                logger.warning(f"Could not detect local {language} version: {e}")
+
+    async def close(self):
+        if self.python_pool:
+            await self.python_pool.close()
+
+    def metrics(self):
+        return {"python_pool": self.python_pool.metrics() if self.python_pool else None}
+
+    def resolve(self, language):
+        if language == "python":
+            return "python", self.versions.get("python", "local")
+        if language == "javascript" and self.node:
+            return "javascript", self.versions.get("javascript", "local")
+        if language == "cpp" and self.cxx:
+            return "cpp", self.versions.get("cpp", "local")
+        return None
+
+    async def runtimes(self):
+        aliases = {"python": ["py", "python3"], "javascript": ["js", "node"], "cpp": ["c++", "g++"]}
+        runtimes = []
+        for language in ("python", "javascript", "cpp"):
+            resolved = self.resolve(language)
+            if resolved:
+                runtimes.append({"language": language, "version": resolved[1], "aliases": aliases[language]})
+        return runtimes
+
+    def _limits(self, cpu_seconds, memory_mb):
+        """Build a preexec_fn that applies resource limits in the child"""
+        if resource is None:
+            return None
+
+        max_file_bytes = self.max_file_bytes
+
+        def apply_limits():
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_bytes, max_file_bytes))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+            if memory_mb:
+                memory_bytes = memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+        return apply_limits
+
+    async def _read_capped(self, stream, buffer, overflow, stream_name=None, on_output=None):
+        """Read a pipe into buffer, signalling overflow once max_output is exceeded"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                if on_output:
+                    tail = decoder.decode(b"", final=True)
+                    if tail:
+                        await on_output(stream_name, tail)
+                return
+            remaining = self.max_output - len(buffer)
+            if remaining > 0:
+                buffer.extend(chunk[:remaining])
+                if on_output:
+                    text = decoder.decode(chunk[:remaining])
+                    if text:
+                        await on_output(stream_name, text)
+            if len(chunk) > remaining:
+                overflow.set()
+                return
+
+    async def _spawn(self, argv, cwd, cpu_seconds, memory_mb):
+        """Start a sandboxed child process in its own session"""
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": cwd, "LANG": "C.UTF-8"},
+            preexec_fn=self._limits(cpu_seconds, memory_mb),
+            start_new_session=True,
+        )
+
+    async def _run_process(self, argv, cwd, stdin, timeout, cpu_seconds, memory_mb, on_output=None):
+        """Run one process to completion, enforcing wall-clock and output limits"""
+        process = await self._spawn(argv, cwd, cpu_seconds, memory_mb)
+        return await self._communicate(process, stdin.encode("utf-8"), timeout, cpu_seconds, on_output)
+
+    async def _communicate(self, process, stdin, timeout, cpu_seconds, on_output=None):
+        """Feed stdin and collect output from a started process until it exits"""
+        stdout, stderr = bytearray(), bytearray()
+        overflow = asyncio.Event()
+
+        async def feed_stdin():
+            try:
+                if stdin:
+                    process.stdin.write(stdin)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                process.stdin.close()
+
+        async def communicate():
+            await asyncio.gather(
+                feed_stdin(),
+                self._read_capped(process.stdout, stdout, overflow, "stdout", on_output),
+                self._read_capped(process.stderr, stderr, overflow, "stderr", on_output),
+            )
+            await process.wait()
+
+        error = None
+        communicate_task = asyncio.ensure_future(communicate())
+        overflow_task = asyncio.ensure_future(overflow.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {communicate_task, overflow_task},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if overflow_task in done:
+                error = f"Output limit of {self.max_output} bytes exceeded"
+            elif communicate_task not in done:
+                error = f"Execution timed out after {timeout:g} seconds"
+        finally:
+            overflow_task.cancel()
+            if process.returncode is None:
+                self._kill(process)
+            communicate_task.cancel()
+            await asyncio.gather(communicate_task, return_exceptions=True)
+            await process.wait()
+
+        exit_code = process.returncode
+        if exit_code < 0:
+            # Killed by a signal; report it the way a shell would
+            if -exit_code == signal.SIGXCPU and error is None:
+                error = f"CPU time limit of {cpu_seconds} seconds exceeded"
+            exit_code = 128 - exit_code
+
+        return {
+            "stdout": stdout.decode("utf-8", errors="replace"),
+            "stderr": stderr.decode("utf-8", errors="replace"),
+            "exit_code": exit_code,
+            "error": error,
+        }
+
+    @staticmethod
+    def _kill(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def run(self, request, language, version):
+        return await self.stream(request, language, version, None)
+
+    async def stream(self, request, language, version, on_output):
+        if language == "python" and self.python_pool:
+            result = await self.python_pool.run(request, on_output)
+            if result is not None:
+                return result
+
+        with tempfile.TemporaryDirectory(prefix="codesync-run-") as scratch:
+            if language == "python":
+                source = os.path.join(scratch, "main.py")
+                argv = [self.python, "-I", "-B", "-u", source]
+                memory_mb = self.memory_mb
+            elif language == "javascript":
+                source = os.path.join(scratch, "main.js")
+                # V8 reserves far more address space than it uses, so cap the heap instead of RLIMIT_AS
+                argv = [self.node, f"--max-old-space-size={self.memory_mb}", source]
+                memory_mb = 0
+            elif language == "cpp":
+                source = os.path.join(scratch, "main.cpp")
+                argv = [os.path.join(scratch, "main")]
+                memory_mb = self.memory_mb
+            else:
+                raise ValueError(f"Unsupported language for local execution: {language}")
+
+            with open(source, "w", encoding="utf-8") as f:
+                f.write(request.code)
+
+            if language == "cpp":
+                compiled = await self._run_process(
+                    [self.cxx, "-O2", "-std=c++17", "-o", argv[0], source],
+                    scratch, "", self.compile_timeout, int(self.compile_timeout), self.compile_memory_mb
+                )
+                if compiled["exit_code"] != 0 or compiled["error"]:
+                    compiled["error"] = compiled["error"] or "Compilation failed"
+                    if on_output and compiled["stderr"]:
+                        await on_output("stderr", compiled["stderr"])
+                    return compiled
+
+            result = await self._run_process(
+                argv, scratch, request.stdin or "", self.timeout, self.cpu_seconds, memory_mb, on_output
+            )
+            if result["error"] is None:
+                del result["error"]
+            return result
+
+
+def create_executor():
+    """Build the executor selected by CODE_EXECUTOR (piston or local)"""
+    backend = os.environ.get("CODE_EXECUTOR", "piston").strip().lower()
+    if backend == "local":
+        if resource is None:
+            logger.warning("resource module unavailable; local executor runs without rlimits")
+        return LocalExecutor()
+    if backend != "piston":
+        logger.warning(f"Unknown CODE_EXECUTOR '{backend}', falling back to piston")
+    return PistonExecutor()
+
+# Global executor instance
+executor = create_executor()
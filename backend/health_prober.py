@@ -0,0 +1,89 @@
+"""
+Background MongoDB health prober with a cached status for health endpoints
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+from mongo_config import mongo_config
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Pings MongoDB on a fixed interval so health requests never touch the database"""
+
+    def __init__(self):
+        self.interval = float(os.environ.get("HEALTH_PROBE_INTERVAL", "5"))
+        self.timeout_ms = int(os.environ.get("HEALTH_PROBE_TIMEOUT_MS", "2000"))
+        self.stale_after = float(os.environ.get("HEALTH_PROBE_STALE_AFTER", str(self.interval * 3)))
+        self.database_ok = False
+        self.probed_at = None
+        self.latency_ms = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.task = None
+
+    async def probe(self):
+        """Run one ping and update the cached status"""
+        started = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(
+                mongo_config.health_check(max_time_ms=self.timeout_ms),
+                timeout=self.timeout_ms / 1000 + 1
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"MongoDB health probe timed out after {self.timeout_ms}ms")
+            ok = False
+
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.probed_at = time.time()
+        self.probes += 1
+        if ok:
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+        if ok != self.database_ok:
+            logger.info(f"MongoDB health changed: {'connected' if ok else 'disconnected'}")
+        self.database_ok = ok
+        return ok
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"Error in health probe: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def age(self):
+        """Seconds since the last completed probe, or None before the first one"""
+        return round(time.time() - self.probed_at, 2) if self.probed_at else None
+
+    def ready(self):
+        """Database reachable and the cached result recent enough to trust"""
+        age = self.age()
+        return self.database_ok and age is not None and age <= self.stale_after
+
+    def status(self):
+        return {
+            "database": "connected" if self.database_ok else "disconnected",
+            "probe_age_seconds": self.age(),
+            "probe_latency_ms": self.latency_ms,
+            "probe_interval_seconds": self.interval,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+# Global health prober instance
+health_prober = HealthProber()
@@ -0,0 +1,90 @@
+"""
+Fast JSON encoding and decoding for responses, request bodies and SSE events
+"""
+
+import json
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson is not installed; using the standard library JSON codec")
+
+# orjson's decode error subclasses this one, so callers catch a single type either way
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(value):
+    """Types FastAPI's encoder would handle that the JSON libraries do not"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps_str(value) -> str:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    loads = orjson.loads
+else:
+    def dumps(value) -> bytes:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_str(value) -> str:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available
+
+    Handlers that return one directly also skip FastAPI's jsonable_encoder
+    pass, which dominates the cost of large payloads such as room state.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_body(model):
+    """Dependency validating the raw request body with model_validate_json
+
+    Pydantic parses and validates the bytes in one pass instead of FastAPI
+    decoding to a dict first. Errors are raised like FastAPI's own body
+    validation errors. Pair it with json_body_openapi so the docs still show
+    the request schema.
+    """
+    async def parse(request: Request):
+        body = await request.body()
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+    return Depends(parse)
+
+
+def json_body_openapi(model):
+    """openapi_extra documenting a body parsed by json_body; the model must not nest other models"""
+    return {"requestBody": {"content": {"application/json": {"schema": model.model_json_schema()}}, "required": True}}
@@ -0,0 +1,171 @@
+"""
+Queue-based logging pipeline with JSON output and hot-path sampling
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not user-supplied extras
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _parse_rates(spec):
+    """Parse "broadcast=0.1,chat=0.5" into {"broadcast": 0.1, "chat": 0.5}"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extras passed via extra={...} become top-level fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Samples and rate-limits records tagged with extra={"event": ...}
+
+    Warnings and above, and untagged records, always pass. The first record let
+    through after a rate-limited stretch carries a "suppressed" count.
+    """
+
+    def __init__(self, sample_rates, rate_limit):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limit = rate_limit
+        # event -> [tokens, last refill time, suppressed since last emitted]
+        self.buckets = {}
+        self.sampled_out = {}
+        self.rate_limited = {}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.sample_rates.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled_out[event] = self.sampled_out.get(event, 0) + 1
+            return False
+
+        if self.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self.buckets.get(event)
+        if bucket is None:
+            bucket = self.buckets[event] = [self.rate_limit, now, 0]
+        bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            self.rate_limited[event] = self.rate_limited.get(event, 0) + 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without formatting them; drops when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; callers pass immutable args
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Routes all logging through a bounded queue drained by a background thread"""
+
+    def __init__(self):
+        self.level = os.environ.get("LOG_LEVEL", "INFO").upper()
+        self.format = os.environ.get("LOG_FORMAT", "json").strip().lower()
+        self.queue_size = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+        self.sample_rates = _parse_rates(os.environ.get("LOG_SAMPLE_RATES", "broadcast=0.1"))
+        self.rate_limit = float(os.environ.get("LOG_RATE_LIMIT", "20"))
+        self.handler = None
+        self.sampler = None
+        self.listener = None
+
+    def configure(self):
+        """Replace the root handlers with the queue handler and start the listener"""
+        if self.listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if self.format == "json" else logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.Queue(maxsize=self.queue_size)
+        self.handler = NonBlockingQueueHandler(log_queue)
+        self.sampler = SamplingFilter(self.sample_rates, self.rate_limit)
+        self.handler.addFilter(self.sampler)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+
+        self.listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def metrics(self):
+        if self.handler is None:
+            return {"configured": False}
+        return {
+            "configured": True,
+            "format": self.format,
+            "queued": self.handler.queue.qsize(),
+            "queue_size": self.queue_size,
+            "dropped": self.handler.dropped,
+            "sample_rates": dict(self.sample_rates),
+            "rate_limit_per_second": self.rate_limit,
+            "sampled_out": dict(self.sampler.sampled_out),
+            "rate_limited": dict(self.sampler.rate_limited),
+        }
+
+# Global logging pipeline instance
+log_pipeline = LogPipeline()
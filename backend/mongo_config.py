@@ -3,18 +3,183 @@ MongoDB Atlas Connection Configuration with Authentication Handling
 """
 
 import os
+import time
 import logging
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
 from urllib.parse import quote_plus
 
+from metrics import metrics_registry
+
 logger = logging.getLogger(__name__)
 
+command_latency = metrics_registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency reported by the driver", ("command",)
+)
+
+# Wire compressors and the optional package each one needs
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+def available_compressors(requested):
+    """Filter a comma-separated compressor list down to those importable here"""
+    compressors = []
+    for name in [c.strip() for c in requested.split(",") if c.strip()]:
+        module = COMPRESSOR_MODULES.get(name)
+        if module is None:
+            logger.warning(f"Unknown MongoDB compressor '{name}' ignored")
+            continue
+        try:
+            __import__(module)
+        except ImportError:
+            logger.warning(f"MongoDB compressor '{name}' requires the '{module}' package; skipping")
+            continue
+        compressors.append(name)
+    return compressors
+
+class MongoMonitor(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Driver event listener collecting command latency and pool checkout statistics
+    
+    Motor runs driver calls on worker threads, so counters are guarded by a lock.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.commands = {}
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total_ms = 0.0
+        self.checkout_wait_max_ms = 0.0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_clears = 0
+    
+    # Command events
+    def _command_stats(self, name):
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0}
+        return stats
+    
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        self._record_command(event.command_name, event.duration_micros / 1000, failed=False)
+    
+    def failed(self, event):
+        self._record_command(event.command_name, event.duration_micros / 1000, failed=True)
+    
+    def _record_command(self, name, elapsed_ms, failed):
+        command_latency.observe(elapsed_ms / 1000, name)
+        with self.lock:
+            stats = self._command_stats(name)
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            if elapsed_ms > stats["max_ms"]:
+                stats["max_ms"] = elapsed_ms
+            if failed:
+                stats["failures"] += 1
+    
+    # Connection pool events
+    def connection_check_out_started(self, event):
+        self.local.checkout_started = time.perf_counter()
+    
+    def connection_checked_out(self, event):
+        # Newer drivers report the wait directly; otherwise time it on this thread
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            wait_ms = duration * 1000
+        else:
+            started = getattr(self.local, "checkout_started", None)
+            wait_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        with self.lock:
+            self.checkouts += 1
+            self.checkout_wait_total_ms += wait_ms
+            if wait_ms > self.checkout_wait_max_ms:
+                self.checkout_wait_max_ms = wait_ms
+    
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.checkout_failures += 1
+    
+    def connection_created(self, event):
+        with self.lock:
+            self.connections_created += 1
+    
+    def connection_closed(self, event):
+        with self.lock:
+            self.connections_closed += 1
+    
+    def pool_cleared(self, event):
+        with self.lock:
+            self.pool_clears += 1
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_checked_in(self, event):
+        pass
+    
+    def snapshot(self):
+        with self.lock:
+            return {
+                "commands": {
+                    name: {
+                        "count": stats["count"],
+                        "failures": stats["failures"],
+                        "avg_ms": round(stats["total_ms"] / stats["count"], 3) if stats["count"] else 0.0,
+                        "max_ms": round(stats["max_ms"], 3),
+                    }
+                    for name, stats in self.commands.items()
+                },
+                "pool": {
+                    "checkouts": self.checkouts,
+                    "checkout_failures": self.checkout_failures,
+                    "checkout_wait_avg_ms": round(self.checkout_wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                    "checkout_wait_max_ms": round(self.checkout_wait_max_ms, 3),
+                    "connections_open": self.connections_created - self.connections_closed,
+                    "connections_created": self.connections_created,
+                    "pool_clears": self.pool_clears,
+                },
+            }
+
 class MongoDBConfig:
     def __init__(self):
         self.client = None
         self.db = None
         self.connected = False
+        self.monitor = MongoMonitor()
+        self.pool_options = self._pool_options()
+    
+    def _pool_options(self):
+        """Connection pool and wire compression settings from the environment"""
+        options = {
+            "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", os.environ.get("MAX_CONNECTIONS", "100"))),
+            "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", os.environ.get("MIN_CONNECTIONS", "0"))),
+            "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+            "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        }
+        compressors = available_compressors(os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+        if compressors:
+            options["compressors"] = compressors
+            if "zlib" in compressors:
+                options["zlibCompressionLevel"] = int(os.environ.get("MONGO_ZLIB_LEVEL", "6"))
+        return options
+    
+    def _client_options(self):
+        return {**self.pool_options, "event_listeners": [self.monitor]}
         
     async def connect(self):
         """Connect to MongoDB with multiple fallback options"""
@@ -25,6 +190,8 @@ class MongoDBConfig:
             self._connect_with_separate_credentials,
             self._connect_local_fallback
         ]
+        if os.environ.get('MONGO_BACKEND', '').strip().lower() == 'memory':
+            connection_methods = [self._connect_in_memory]
         
         for method in connection_methods:
             try:
@@ -53,6 +220,7 @@ class MongoDBConfig:
             tlsAllowInvalidCertificates=False,
             serverSelectionTimeoutMS=10000,
             connectTimeoutMS=10000,
+            **self._client_options(),
         )
         
         # Test connection
@@ -80,6 +248,7 @@ class MongoDBConfig:
             mongo_url,
             tls=True,
             serverSelectionTimeoutMS=10000,
+            **self._client_options(),
         )
         
         await self.client.admin.command('ping')
@@ -92,24 +261,48 @@ class MongoDBConfig:
             raise ValueError("Local fallback not allowed in production")
             
         mongo_url = "mongodb://localhost:27017"
-        self.client = AsyncIOMotorClient(mongo_url)
+        self.client = AsyncIOMotorClient(mongo_url, **self._client_options())
         await self.client.admin.command('ping')
         self.db = self.client[os.environ.get('DB_NAME', 'codesync')]
         return True
     
-    async def health_check(self):
+    async def _connect_in_memory(self):
+        """In-process mock database for load tests and local runs without MongoDB"""
+        if os.environ.get('ENVIRONMENT') == 'production':
+            raise ValueError("In-memory backend not allowed in production")
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise ValueError("MONGO_BACKEND=memory requires the 'mongomock-motor' package "
+                             "(pip install -r benchmarks/requirements.txt)")
+        
+        self.client = AsyncMongoMockClient()
+        self.db = self.client[os.environ.get('DB_NAME', 'codesync')]
+        return True
+    
+    async def health_check(self, max_time_ms=5000):
         """Check if MongoDB connection is healthy"""
-        if not self.connected or not self.client:
+        if not self.client:
             return False
             
         try:
-            await self.client.admin.command('ping', maxTimeMS=5000)
-            return True
+            await self.client.admin.command('ping', maxTimeMS=max_time_ms)
+            # A client that failed earlier may have reconnected since
+            self.connected = self.db is not None
+            return self.connected
         except Exception as e:
             logger.error(f"MongoDB health check failed: {e}")
             self.connected = False
             return False
     
+    def metrics(self):
+        """Pool configuration plus driver-level command and pool statistics"""
+        return {
+            "connected": self.connected,
+            "pool_options": self.pool_options,
+            **self.monitor.snapshot(),
+        }
+    
     def get_database(self):
         """Get database instance"""
         if not self.connected:
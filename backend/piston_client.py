@@ -0,0 +1,141 @@
+"""
+Pooled HTTP client for the Piston code execution API
+"""
+
+import os
+import time
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PISTON_URL = "https://emkc.org/api/v2/piston"
+
+upstream_latency = metrics_registry.histogram(
+    "piston_request_duration_seconds", "Latency of requests to the Piston API", ("host", "path")
+)
+
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class HostLatency:
+    """Running latency statistics for requests to a single host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, elapsed_ms, failed=False):
+        self.requests += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+        }
+
+
+class PistonClient:
+    """Application-lifetime httpx client with keep-alive connection pooling"""
+
+    def __init__(self):
+        self.base_url = os.environ.get("PISTON_URL", DEFAULT_PISTON_URL).rstrip("/")
+        self.timeout = float(os.environ.get("PISTON_TIMEOUT", "30"))
+        self.max_connections = int(os.environ.get("PISTON_MAX_CONNECTIONS", "20"))
+        self.max_keepalive = int(os.environ.get("PISTON_MAX_KEEPALIVE", "10"))
+        self.keepalive_expiry = float(os.environ.get("PISTON_KEEPALIVE_EXPIRY", "30"))
+        self.http2 = _env_flag("PISTON_HTTP2")
+        self.client = None
+        self.latency = {}
+
+    async def start(self):
+        """Open the shared client; called from the application startup hook"""
+        if self.client is not None:
+            return
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("PISTON_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+        logger.info(f"Piston client started for {self.base_url} (http2={http2}, max_connections={self.max_connections})")
+
+    async def close(self):
+        """Close pooled connections; called from the application shutdown hook"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logger.info("Piston client closed")
+
+    async def request(self, method, path, **kwargs):
+        """Send a request through the pool, recording per-host latency"""
+        if self.client is None:
+            await self.start()
+
+        host = urlsplit(self.base_url).netloc
+        stats = self.latency.setdefault(host, HostLatency())
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except Exception:
+            elapsed = time.perf_counter() - started
+            stats.observe(elapsed * 1000, failed=True)
+            upstream_latency.observe(elapsed, host, path)
+            raise
+        elapsed = time.perf_counter() - started
+        stats.observe(elapsed * 1000, failed=response.status_code >= 500)
+        upstream_latency.observe(elapsed, host, path)
+        return response
+
+    async def execute(self, payload):
+        """POST an execution payload to Piston's /execute endpoint"""
+        return await self.request("POST", "/execute", json=payload)
+
+    def metrics(self):
+        """Per-host latency and pool configuration"""
+        return {
+            "base_url": self.base_url,
+            "started": self.client is not None,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive,
+            "hosts": {host: stats.as_dict() for host, stats in self.latency.items()},
+        }
+
+# Global Piston client instance
+piston_client = PistonClient()
@@ -0,0 +1,130 @@
+"""
+End-to-end propagation latency of broadcast events, measured from client acks
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+
+from metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock time (epoch ms) the current HTTP request arrived, set by RequestClockMiddleware
+request_received_at = ContextVar("request_received_at", default=None)
+
+propagation_latency = metrics_registry.histogram(
+    "event_propagation_seconds", "Time from the triggering request arriving to a peer acknowledging the event",
+    ("event_type",), buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+class RequestClockMiddleware:
+    """ASGI middleware recording when each HTTP request arrived, before body parsing and validation"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_received_at.set(time.time() * 1000)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_received_at.reset(token)
+
+
+class PropagationTracker:
+    """Stamps broadcasts with a per-room sequence and turns peer acks into latency samples
+
+    Latency runs from the triggering request reaching the server to the ack
+    reaching it, minus the time the client says it held the event before
+    acking. It therefore includes the ack's own trip back, which keeps it an
+    upper bound that needs no client clock sync.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("PROPAGATION_TRACKING", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.pending_per_room = int(os.environ.get("PROPAGATION_PENDING_PER_ROOM", "1024"))
+        self.samples_per_room = int(os.environ.get("PROPAGATION_SAMPLES_PER_ROOM", "1000"))
+        self.ack_window_ms = float(os.environ.get("PROPAGATION_ACK_WINDOW", "60")) * 1000
+        self.sequences = {}
+        # room_id -> OrderedDict seq -> [origin_at, event_type, users that acked]
+        self.pending = {}
+        # room_id -> deque of recent latency samples in ms
+        self.samples = {}
+        self.acks = 0
+        self.rejected_acks = 0
+
+    def stamp(self, room_id, event_type):
+        """Sequence number and send time (epoch ms) for a broadcast about to go out"""
+        sent_at = time.time() * 1000
+        seq = self.sequences.get(room_id, 0) + 1
+        self.sequences[room_id] = seq
+        if self.enabled:
+            room_pending = self.pending.get(room_id)
+            if room_pending is None:
+                room_pending = self.pending[room_id] = OrderedDict()
+            origin_at = request_received_at.get()
+            room_pending[seq] = [origin_at if origin_at is not None else sent_at, event_type, set()]
+            if len(room_pending) > self.pending_per_room:
+                room_pending.popitem(last=False)
+        return seq, sent_at
+
+    def ack(self, room_id, user_id, seq, hold_ms=0.0):
+        """Record one peer's receipt of an event; returns the latency in ms or None if not accepted"""
+        entry = self.pending.get(room_id, {}).get(seq)
+        now = time.time() * 1000
+        if entry is None or user_id in entry[2] or now - entry[0] > self.ack_window_ms:
+            self.rejected_acks += 1
+            return None
+
+        entry[2].add(user_id)
+        latency_ms = max(0.0, now - entry[0] - max(0.0, hold_ms))
+        room_samples = self.samples.get(room_id)
+        if room_samples is None:
+            room_samples = self.samples[room_id] = deque(maxlen=self.samples_per_room)
+        room_samples.append(latency_ms)
+        propagation_latency.observe(latency_ms / 1000, entry[1])
+        self.acks += 1
+        return latency_ms
+
+    def forget_room(self, room_id):
+        self.sequences.pop(room_id, None)
+        self.pending.pop(room_id, None)
+        self.samples.pop(room_id, None)
+
+    def room_report(self, room_id):
+        samples = sorted(self.samples.get(room_id, ()))
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+        return {
+            "room_id": room_id,
+            "last_seq": self.sequences.get(room_id, 0),
+            "samples": len(samples),
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(samples[-1], 2) if samples else 0.0,
+            },
+        }
+
+    def metrics(self):
+        return {
+            "enabled": self.enabled,
+            "acks": self.acks,
+            "rejected_acks": self.rejected_acks,
+            "rooms": [self.room_report(room_id) for room_id in self.samples],
+        }
+
+# Global propagation tracker instance
+propagation_tracker = PropagationTracker()
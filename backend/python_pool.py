@@ -0,0 +1,215 @@
+"""
+Pre-warmed pool of single-use Python sandbox workers for the local executor
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+READY_MARKER = b"\x00codesync-worker-ready\n"
+
+# Runs inside each worker: pre-import modules, announce readiness, then wait
+# for one job line on stdin and execute main.py from the scratch directory as
+# __main__, reporting exceptions and exit codes the way `python main.py` would.
+WORKER_BOOTSTRAP = r"""
+import sys, io, json, types, traceback, importlib
+for _name in sys.argv[1:]:
+    try:
+        importlib.import_module(_name)
+    except Exception:
+        pass
+sys.stdout.buffer.write(%r)
+sys.stdout.flush()
+_job = json.loads(sys.stdin.buffer.readline())
+sys.stdin = io.TextIOWrapper(io.BytesIO(_job["stdin"].encode("utf-8")), encoding="utf-8")
+_path = _job["path"]
+sys.argv = [_path]
+_main = types.ModuleType("__main__")
+_main.__file__ = _path
+_main.__builtins__ = __builtins__
+sys.modules["__main__"] = _main
+with open(_path, encoding="utf-8") as _f:
+    _source = _f.read()
+_code = 0
+try:
+    exec(compile(_source, _path, "exec"), _main.__dict__)
+except SystemExit as _e:
+    if _e.code is None:
+        _code = 0
+    elif isinstance(_e.code, int):
+        _code = _e.code
+    else:
+        print(_e.code, file=sys.stderr)
+        _code = 1
+except BaseException as _e:
+    traceback.print_exception(type(_e), _e, _e.__traceback__.tb_next)
+    _code = 1
+sys.stdout.flush()
+sys.stderr.flush()
+raise SystemExit(_code)
+""" % READY_MARKER
+
+
+class Worker:
+    """A warmed interpreter process waiting for exactly one job"""
+
+    __slots__ = ("process", "scratch", "ready_at")
+
+    def __init__(self, process, scratch):
+        self.process = process
+        self.scratch = scratch
+        self.ready_at = time.monotonic()
+
+    def alive(self):
+        return self.process.returncode is None
+
+
+class PythonWorkerPool:
+    """Keeps PYTHON_POOL_SIZE interpreters started and pre-imported, each used once"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.size = int(os.environ.get("PYTHON_POOL_SIZE", "0"))
+        self.max_idle = float(os.environ.get("PYTHON_POOL_MAX_IDLE", "300"))
+        self.warmup_timeout = float(os.environ.get("PYTHON_POOL_WARMUP_TIMEOUT", "10"))
+        self.preload = [m.strip() for m in os.environ.get(
+            "PYTHON_POOL_PRELOAD", "math,random,json,re,collections,itertools,functools,string,datetime"
+        ).split(",") if m.strip()]
+
+        self.idle = deque()
+        self.spawning = 0
+        self.refill_tasks = set()
+        self.recycle_task = None
+        self.running = False
+
+        self.warm_runs = 0
+        self.cold_fallbacks = 0
+        self.spawned = 0
+        self.recycled = 0
+        self.spawn_failures = 0
+
+    async def start(self):
+        """Warm the pool up to its configured size"""
+        self.running = True
+        await asyncio.gather(*(self._spawn_worker() for _ in range(self.size)))
+        self.recycle_task = asyncio.create_task(self._recycle_loop())
+        logger.info(f"Python worker pool warmed with {len(self.idle)} workers")
+
+    async def close(self):
+        self.running = False
+        if self.recycle_task:
+            self.recycle_task.cancel()
+        for task in list(self.refill_tasks):
+            task.cancel()
+        while self.idle:
+            self._discard(self.idle.popleft())
+
+    async def _spawn_worker(self):
+        self.spawning += 1
+        scratch = tempfile.mkdtemp(prefix="codesync-worker-")
+        process = None
+        try:
+            process = await self.executor._spawn(
+                [self.executor.python, "-I", "-B", "-u", "-c", WORKER_BOOTSTRAP, *self.preload],
+                scratch, self.executor.cpu_seconds, self.executor.memory_mb
+            )
+            marker = await asyncio.wait_for(process.stdout.readline(), self.warmup_timeout)
+            if marker != READY_MARKER:
+                raise RuntimeError(f"unexpected worker handshake: {marker[:80]!r}")
+        except Exception as e:
+            self.spawn_failures += 1
+            logger.warning(f"Failed to warm Python worker: {e}")
+            if process is not None and process.returncode is None:
+                self.executor._kill(process)
+                await process.wait()
+            shutil.rmtree(scratch, ignore_errors=True)
+            return
+        finally:
+            self.spawning -= 1
+
+        worker = Worker(process, scratch)
+        if self.running:
+            self.spawned += 1
+            self.idle.append(worker)
+        else:
+            self._discard(worker)
+
+    def _refill(self):
+        """Top the pool back up in the background"""
+        missing = self.size - len(self.idle) - self.spawning
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._spawn_worker())
+            self.refill_tasks.add(task)
+            task.add_done_callback(self.refill_tasks.discard)
+
+    def _discard(self, worker):
+        if worker.alive():
+            self.executor._kill(worker.process)
+        shutil.rmtree(worker.scratch, ignore_errors=True)
+
+    async def _recycle_loop(self):
+        """Replace workers that have sat idle longer than PYTHON_POOL_MAX_IDLE"""
+        while True:
+            await asyncio.sleep(max(1.0, self.max_idle / 4))
+            cutoff = time.monotonic() - self.max_idle
+            fresh = deque()
+            while self.idle:
+                worker = self.idle.popleft()
+                if worker.ready_at < cutoff or not worker.alive():
+                    self.recycled += 1
+                    self._discard(worker)
+                else:
+                    fresh.append(worker)
+            self.idle.extend(fresh)
+            self._refill()
+
+    def _acquire(self):
+        while self.idle:
+            worker = self.idle.popleft()
+            if worker.alive():
+                return worker
+            self._discard(worker)
+        return None
+
+    async def run(self, request, on_output=None):
+        """Run code on a warm worker, or return None when none is ready"""
+        worker = self._acquire()
+        self._refill()
+        if worker is None:
+            self.cold_fallbacks += 1
+            return None
+
+        self.warm_runs += 1
+        try:
+            path = os.path.join(worker.scratch, "main.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(request.code)
+            job = json.dumps({"path": path, "stdin": request.stdin or ""}).encode("utf-8") + b"\n"
+            result = await self.executor._communicate(
+                worker.process, job, self.executor.timeout, self.executor.cpu_seconds, on_output
+            )
+        finally:
+            self._discard(worker)
+
+        if result["error"] is None:
+            del result["error"]
+        return result
+
+    def metrics(self):
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "spawning": self.spawning,
+            "warm_runs": self.warm_runs,
+            "cold_fallbacks": self.cold_fallbacks,
+            "spawned": self.spawned,
+            "recycled": self.recycled,
+            "spawn_failures": self.spawn_failures,
+        }
@@ -0,0 +1,111 @@
+"""
+Read-through cache for room documents with versioned invalidation
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class RoomCache:
+    """TTL + LRU cache of room documents, including negative entries for unknown IDs
+
+    Every write bumps a per-room version while loads of that room are in
+    flight; a load that started before the bump is not stored, so a slow read
+    can never resurrect stale data. Versions are dropped once no load is
+    pending, so they never outlive the loads they guard.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.environ.get("ROOM_CACHE_TTL", "60"))
+        self.negative_ttl = float(os.environ.get("ROOM_CACHE_NEGATIVE_TTL", "10"))
+        self.max_entries = int(os.environ.get("ROOM_CACHE_SIZE", "1000"))
+        # room_id -> (expires_at, room document or None for "does not exist")
+        self.entries = OrderedDict()
+        self.versions = {}
+        # room_id -> number of loader calls in flight
+        self.loading = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _store(self, room_id, room):
+        ttl = self.ttl if room is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        self.entries[room_id] = (time.monotonic() + ttl, room)
+        self.entries.move_to_end(room_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _bump(self, room_id):
+        if room_id in self.loading:
+            self.versions[room_id] = self.versions.get(room_id, 0) + 1
+
+    async def get(self, room_id, loader):
+        """Return the cached room, calling loader(room_id) on a miss; None if it does not exist"""
+        entry = self.entries.get(room_id)
+        if entry is not None:
+            expires_at, room = entry
+            if expires_at >= time.monotonic():
+                self.entries.move_to_end(room_id)
+                if room is None:
+                    self.negative_hits += 1
+                    return None
+                self.hits += 1
+                return dict(room)
+            del self.entries[room_id]
+
+        self.misses += 1
+        version = self.versions.get(room_id, 0)
+        self.loading[room_id] = self.loading.get(room_id, 0) + 1
+        try:
+            room = await loader(room_id)
+        finally:
+            pending = self.loading.pop(room_id) - 1
+            if pending:
+                self.loading[room_id] = pending
+        if self.versions.get(room_id, 0) == version:
+            self._store(room_id, dict(room) if room is not None else None)
+        if room_id not in self.loading:
+            self.versions.pop(room_id, None)
+        return room
+
+    def put(self, room_id, room):
+        """Cache a room that was just created, replacing any negative entry"""
+        self._bump(room_id)
+        self._store(room_id, dict(room))
+
+    def apply(self, room_id, fields):
+        """Record a write: merge fields into a cached room and invalidate in-flight loads"""
+        self._bump(room_id)
+        entry = self.entries.get(room_id)
+        if entry is not None and entry[1] is not None:
+            self.entries[room_id] = (entry[0], {**entry[1], **fields})
+        else:
+            self.entries.pop(room_id, None)
+
+    def invalidate(self, room_id):
+        """Drop a room after a delete or any write whose result is unknown"""
+        self._bump(room_id)
+        self.entries.pop(room_id, None)
+        self.invalidations += 1
+
+    def metrics(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+# Global room cache instance
+room_cache = RoomCache()
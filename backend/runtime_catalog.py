@@ -0,0 +1,109 @@
+"""
+Cached catalog of the languages and versions offered by the execution backend
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+from executors import executor
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(version):
+    """Sort key that orders '3.10.0' after '3.9.4'"""
+    parts = []
+    for part in version.replace("-", ".").split("."):
+        parts.append((0, int(part), "") if part.isdigit() else (-1, 0, part))
+    return parts
+
+
+class RuntimeCatalog:
+    """Resolves frontend language names to concrete runtimes without a network call"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.refresh_interval = float(os.environ.get("RUNTIME_CATALOG_REFRESH", "3600"))
+        self.retry_interval = float(os.environ.get("RUNTIME_CATALOG_RETRY", "60"))
+        # Lookup name (language or alias) -> (language, version)
+        self.runtimes = {}
+        self.loaded_at = None
+        self.refresh_task = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def refresh(self):
+        """Fetch runtimes from the executor, keeping the previous catalog on failure"""
+        try:
+            runtimes = await self.executor.runtimes()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"Runtime catalog refresh failed: {e}")
+            return False
+
+        # Keep only the newest version of each language
+        latest = {}
+        for runtime in runtimes:
+            current = latest.get(runtime["language"])
+            if current is None or _version_key(runtime["version"]) > _version_key(current["version"]):
+                latest[runtime["language"]] = runtime
+
+        catalog = {}
+        for runtime in latest.values():
+            entry = (runtime["language"], runtime["version"])
+            for alias in runtime.get("aliases", []):
+                catalog.setdefault(alias, entry)
+        for runtime in latest.values():
+            catalog[runtime["language"]] = (runtime["language"], runtime["version"])
+
+        self.runtimes = catalog
+        self.loaded_at = time.time()
+        self.refreshes += 1
+        logger.info(f"Runtime catalog loaded with {len(latest)} languages from {self.executor.name} executor")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval if self.loaded_at else self.retry_interval)
+
+    async def start(self):
+        """Load the catalog in the background; resolve() defers to the executor until it has"""
+        self.refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+
+    def resolve(self, language):
+        """Return (language, version) for a frontend language name, or None if unsupported"""
+        if self.loaded_at is None:
+            # Catalog never loaded; let the executor resolve on its own
+            return self.executor.resolve(language)
+
+        resolved = self.executor.resolve(language)
+        if resolved is None:
+            return None
+        return self.runtimes.get(resolved[0]) or self.runtimes.get(language)
+
+    def languages(self):
+        """Available languages and the versions requests resolve to"""
+        return [
+            {"language": language, "version": version}
+            for language, version in sorted(set(self.runtimes.values()))
+        ]
+
+    def metrics(self):
+        return {
+            "loaded": self.loaded_at is not None,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "languages": len(set(self.runtimes.values())),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+# Global runtime catalog for the configured executor
+runtime_catalog = RuntimeCatalog(executor)
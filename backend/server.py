@@ -1,19 +1,21 @@
-from fastapi import FastAPI, APIRouter, BackgroundTasks, Request, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, APIRouter, BackgroundTasks, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.exception_handlers import http_exception_handler
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.errors import BulkWriteError, ConnectionFailure, ServerSelectionTimeoutError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Optional
 import uuid
 from datetime import datetime
 import json
+import time
+import base64
 import asyncio
 from contextlib import asynccontextmanager
 import httpx
@@ -22,28 +24,77 @@ import traceback
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from log_config import log_pipeline
+from tracing import tracer, TracingMiddleware
+from propagation import propagation_tracker, RequestClockMiddleware
+from diagnostics import memory_diagnostics
+from json_codec import FastJSONResponse, json_body, json_body_openapi, dumps_str, loads as json_loads, JSONDecodeError
+from traffic_recorder import traffic_recorder, TrafficRecorderMiddleware
+from metrics import metrics_registry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, SIZE_BUCKETS
 from mongo_config import mongo_config
+from db_indexes import ensure_indexes, query_plan_report
+from health_prober import health_prober
+from room_cache import room_cache
+from piston_client import piston_client
+from execution_cache import execution_cache, execution_flights, execution_key
+from executors import executor, OutputBatcher
+from execution_scheduler import execution_scheduler, QueueFullError
+from runtime_catalog import runtime_catalog
+from execution_tracker import execution_tracker
 
 # MongoDB will be initialized in startup event
 db = None
 
+# Bulk status check ingestion limits
+STATUS_BULK_BATCH_SIZE = int(os.environ.get("STATUS_BULK_BATCH_SIZE", "500"))
+STATUS_BULK_MAX_RECORDS = int(os.environ.get("STATUS_BULK_MAX_RECORDS", "10000"))
+
+# Session cleanup; rooms empty for ROOM_EVICT_AFTER seconds leave memory (0 keeps them forever)
+CLEANUP_INTERVAL = float(os.environ.get("SESSION_CLEANUP_INTERVAL", "30"))
+ROOM_EVICT_AFTER = float(os.environ.get("ROOM_EVICT_AFTER", "600"))
+
 # Store active sessions and SSE connections for real-time updates
 active_rooms: Dict[str, Dict] = {}
 user_sessions: Dict[str, Dict] = {}
+# Queued items are (encoded event, trace context or None) so streams never re-parse payloads
 sse_connections: Dict[str, asyncio.Queue] = {}
 
-# Configure logging first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging first; records are formatted and written off the event loop
+log_pipeline.configure()
 logger = logging.getLogger(__name__)
 
+# Metrics exposed on /metrics
+http_latency = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until response headers", ("method", "route", "status")
+)
+broadcast_fanout = metrics_registry.histogram(
+    "broadcast_recipients", "Users an event was queued for per send_to_room call", ("event_type",), buckets=SIZE_BUCKETS
+)
+broadcast_duration = metrics_registry.histogram(
+    "broadcast_duration_seconds", "Time spent fanning an event out to a room", ("event_type",)
+)
+execution_latency = metrics_registry.histogram(
+    "code_execution_duration_seconds", "Execution backend latency for run-code, excluding queueing", ("executor", "language")
+)
+metrics_registry.gauge("sse_connections", "Open SSE streams", lambda: len(sse_connections))
+metrics_registry.gauge(
+    "sse_queue_depth", "Events waiting in SSE queues",
+    lambda: {("total",): sum(q.qsize() for q in sse_connections.values()),
+             ("max",): max((q.qsize() for q in sse_connections.values()), default=0)},
+    ("aggregate",)
+)
+metrics_registry.gauge("active_rooms", "Rooms held in memory", lambda: len(active_rooms))
+metrics_registry.gauge("active_room_users", "Users joined to in-memory rooms",
+                       lambda: sum(len(room["users"]) for room in active_rooms.values()))
+metrics_registry.gauge("log_records_dropped", "Log records dropped because the log queue was full",
+                       lambda: log_pipeline.metrics().get("dropped", 0))
+
 # Create the main app
 app = FastAPI(
     title="CodeSync API",
     description="Real-time collaborative code editor backend",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Create a router with the /api prefix
@@ -55,6 +106,9 @@ class StatusCheck(BaseModel):
     client_name: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+# Status reads fetch only StatusCheck's fields, whatever else a document carries
+STATUS_CHECK_FIELDS = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
 class StatusCheckCreate(BaseModel):
     client_name: str
 
@@ -90,12 +144,21 @@ class RunCodeRequest(BaseModel):
     language: str
     code: str
     stdin: Optional[str] = ""
+    cache: bool = True  # Set to False for non-deterministic code (random, time, network)
+    room_id: Optional[str] = None
+    user_id: Optional[str] = None
 
 class RunCodeResponse(BaseModel):
     stdout: str
     stderr: str
     exit_code: int
     error: Optional[str] = None
+    cached: bool = False
+
+class CancelRunRequest(BaseModel):
+    room_id: Optional[str] = None
+    user_id: str
+    job_id: Optional[str] = None
 
 class ChatMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -122,35 +185,66 @@ class LeaveRoomRequest(BaseModel):
     user_id: str
     user_name: str
 
+class EventAck(BaseModel):
+    seq: int
+    hold_ms: float = 0  # time the client held the event before acking it
+
+class EventAckRequest(BaseModel):
+    room_id: str
+    user_id: str
+    acks: List[EventAck]
+
 # Utility functions for SSE
 async def send_to_room(room_id: str, event_type: str, data: dict, exclude_user: str = None):
     """Send an event to all users in a room via SSE"""
-    logger.info(f"Broadcasting {event_type} event to room {room_id} (excluding user: {exclude_user})")
-    
     if room_id in active_rooms:
+        started = time.perf_counter()
         recipients = 0
-        for user_id, user_data in active_rooms[room_id]["users"].items():
-            if exclude_user and user_id == exclude_user:
-                continue
+        with tracer.span("room.broadcast", room_id=room_id, event_type=event_type) as span:
+            seq, sent_at = propagation_tracker.stamp(room_id, event_type)
+            event_data = {
+                "type": event_type,
+                "data": data,
+                "seq": seq,
+                "sent_at": sent_at
+            }
+            if span is not None:
+                # Lets clients look the event up in /api/traces
+                event_data["trace_id"] = span.trace_id
+            # Every recipient gets the same payload, so encode it once; the trace context
+            # travels beside it so each SSE stream can record its delivery in this trace
+            item = (dumps_str(event_data), span.context() if span is not None else None)
             
-            if user_id in sse_connections:
-                event_data = {
-                    "type": event_type,
-                    "data": data
-                }
-                try:
-                    await sse_connections[user_id].put(json.dumps(event_data))
-                    recipients += 1
-                except:
-                    # Remove broken connection
-                    logger.warning(f"Removing broken SSE connection for user: {user_id}")
-                    if user_id in sse_connections:
-                        del sse_connections[user_id]
+            for user_id, user_data in active_rooms[room_id]["users"].items():
+                if exclude_user and user_id == exclude_user:
+                    continue
+                
+                if user_id in sse_connections:
+                    try:
+                        await sse_connections[user_id].put(item)
+                        recipients += 1
+                    except:
+                        # Remove broken connection
+                        logger.warning(f"Removing broken SSE connection for user: {user_id}")
+                        if user_id in sse_connections:
+                            del sse_connections[user_id]
+            
+            if span is not None:
+                span.set("recipients", recipients)
         
-        logger.info(f"Event {event_type} sent to {recipients} users in room {room_id}")
+        broadcast_duration.observe(time.perf_counter() - started, event_type)
+        broadcast_fanout.observe(recipients, event_type)
+        logger.info("Event %s sent to %d users in room %s", event_type, recipients, room_id,
+                    extra={"event": "broadcast", "room_id": room_id, "event_type": event_type, "recipients": recipients})
     else:
         logger.warning(f"Attempted to send event to non-existent room: {room_id}")
 
+def notify_user(user_id: str, event_type: str, data: dict):
+    """Queue an event for a single user's SSE stream, if connected"""
+    queue = sse_connections.get(user_id)
+    if queue is not None:
+        queue.put_nowait((dumps_str({"type": event_type, "data": data}), None))
+
 async def generate_sse_stream(user_id: str):
     """Generate SSE stream for a user"""
     queue = asyncio.Queue()
@@ -161,8 +255,10 @@ async def generate_sse_stream(user_id: str):
         while True:
             try:
                 # Wait for new messages with timeout
-                message = await asyncio.wait_for(queue.get(), timeout=30.0)
+                message, trace = await asyncio.wait_for(queue.get(), timeout=30.0)
                 yield f"data: {message}\n\n"
+                if trace is not None:
+                    tracer.record("sse.deliver", trace, user_id=user_id)
             except asyncio.TimeoutError:
                 # Send keep-alive ping
                 yield f"data: {json.dumps({'type': 'ping'})}\n\n"
@@ -171,7 +267,8 @@ async def generate_sse_stream(user_id: str):
                 break
     finally:
         logger.info(f"SSE stream ended for user: {user_id}")
-        if user_id in sse_connections:
+        # A reconnect may already have replaced this stream's queue; leave the new one alone
+        if sse_connections.get(user_id) is queue:
             del sse_connections[user_id]
 
 # Root Routes (without /api prefix)
@@ -188,22 +285,43 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for monitoring systems"""
-    logger.info("Health check endpoint accessed")
+    """Health check endpoint for monitoring systems
     
-    # Check MongoDB health using the new config
-    db_status = "disconnected"
-    if await mongo_config.health_check():
-        db_status = "connected"
+    Database status comes from the background prober, so this never waits on MongoDB.
+    """
+    logger.info("Health check endpoint accessed")
     
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "database": db_status,
+        **health_prober.status(),
         "active_rooms": len(active_rooms),
         "active_connections": len(sse_connections)
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the latest cached database probe succeeded and is fresh"""
+    ready = health_prober.ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "timestamp": datetime.utcnow().isoformat(),
+            **health_prober.status()
+        }
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, broadcast, SSE, MongoDB and execution metrics"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Custom exception handlers
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
@@ -214,7 +332,7 @@ async def not_found_handler(request: Request, exc: HTTPException):
             "error": "Not Found",
             "detail": f"The requested endpoint {request.url.path} was not found",
             "method": request.method,
-            "available_endpoints": ["/", "/health", "/api/", "/docs"]
+            "available_endpoints": ["/", "/health", "/health/live", "/health/ready", "/metrics", "/api/", "/docs"]
         }
     )
 
@@ -254,28 +372,156 @@ async def api_root():
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     logger.info(f"Creating status check for client: {input.client_name}")
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    status_obj = StatusCheck(**input.model_dump())
+    _ = await db.status_checks.insert_one(status_obj.model_dump())
     logger.info(f"Status check created with ID: {status_obj.id}")
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    # Oldest first, as before, but walked through the timestamp index instead of natural order
+    status_checks = await db.status_checks.find({}, STATUS_CHECK_FIELDS).sort("timestamp", 1).limit(1000).to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
+def parse_bulk_records(body: bytes, content_type: str):
+    """Split a JSON array or NDJSON body into (index, record or None, error or None) entries"""
+    if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+        entries = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append((len(entries), json_loads(line), None))
+            except JSONDecodeError as e:
+                entries.append((len(entries), None, f"Invalid JSON: {e}"))
+        return entries
+    
+    try:
+        records = json_loads(body)
+    except JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of status checks")
+    return [(index, record, None) for index, record in enumerate(records)]
+
+@api_router.post("/status/bulk")
+async def create_status_checks_bulk(request: Request):
+    """Ingest many status checks from a JSON array or NDJSON body with unordered batched inserts"""
+    entries = parse_bulk_records(await request.body(), request.headers.get("content-type", ""))
+    if len(entries) > STATUS_BULK_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"Too many records (max {STATUS_BULK_MAX_RECORDS})")
+    
+    results = [None] * len(entries)
+    documents = []  # (index, document) pairs that passed validation
+    for index, record, error in entries:
+        if error is None:
+            try:
+                status_obj = StatusCheck(**StatusCheckCreate.model_validate(record).model_dump())
+                documents.append((index, status_obj.model_dump()))
+                continue
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'record'}: {err['msg']}" for err in e.errors())
+        results[index] = {"index": index, "error": error}
+    
+    for start in range(0, len(documents), STATUS_BULK_BATCH_SIZE):
+        batch = documents[start:start + STATUS_BULK_BATCH_SIZE]
+        failed = {}
+        try:
+            await db.status_checks.insert_many([document for _, document in batch], ordered=False)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past failures; map them back to request positions
+            failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+        for position, (index, document) in enumerate(batch):
+            if position in failed:
+                results[index] = {"index": index, "error": failed[position]}
+            else:
+                results[index] = {"index": index, "id": document["id"]}
+    
+    inserted = sum(1 for result in results if "id" in result)
+    logger.info(f"Bulk status ingest: {inserted} inserted, {len(results) - inserted} failed")
+    return {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+
+class StatusCheckPage(BaseModel):
+    items: List[StatusCheck]
+    next_cursor: Optional[str] = None
+
+def encode_status_cursor(status_check: dict) -> str:
+    """Opaque keyset cursor pointing just after this status check"""
+    key = [status_check["timestamp"].isoformat(), status_check["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_status_cursor(cursor: str) -> dict:
+    """Mongo filter selecting status checks that sort after the cursor (newest first)"""
+    try:
+        timestamp, status_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "id": {"$lt": status_id}}
+    ]}
+
+@api_router.get("/status/page", response_model=StatusCheckPage)
+async def get_status_checks_page(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Keyset-paginated status checks, newest first; pass next_cursor to get the following page"""
+    query = decode_status_cursor(cursor) if cursor else {}
+    status_checks = await (
+        db.status_checks.find(query, STATUS_CHECK_FIELDS)
+        .sort([("timestamp", -1), ("id", -1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    
+    next_cursor = None
+    if len(status_checks) > limit:
+        status_checks = status_checks[:limit]
+        next_cursor = encode_status_cursor(status_checks[-1])
+    
+    return {"items": status_checks, "next_cursor": next_cursor}
+
+async def generate_status_export(batch_size: int):
+    """Stream every status check as NDJSON, one driver batch at a time"""
+    cursor = (
+        db.status_checks.find({}, STATUS_CHECK_FIELDS)
+        .sort([("timestamp", -1), ("id", -1)])
+        .batch_size(batch_size)
+    )
+    
+    lines = []
+    async for status_check in cursor:
+        lines.append(dumps_str(status_check))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@api_router.get("/status/export")
+async def export_status_checks(batch_size: int = Query(500, ge=1, le=5000)):
+    """Export all status checks as streaming NDJSON without loading them into memory"""
+    return StreamingResponse(
+        generate_status_export(batch_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=status_checks.ndjson"}
+    )
+
 @api_router.post("/rooms", response_model=Room)
 async def create_room(room_data: RoomCreate):
     logger.info(f"Creating room: {room_data.name} with language: {room_data.language}")
     try:
         room = Room(name=room_data.name, language=room_data.language)
-        room_dict = room.dict()
+        room_dict = room.model_dump()
         
         # Test database connection before operation
         await db.command("ping")
         
         await db.rooms.insert_one(room_dict)
+        room_dict.pop("_id", None)
+        room_cache.put(room.id, room_dict)
         
         # Initialize room in memory
         active_rooms[room.id] = {
@@ -310,13 +556,22 @@ async def create_room_options():
         }
     )
 
+async def load_room(room_id: str):
+    """Fetch a room document by its indexed id, without the Mongo _id or the saved chat history"""
+    return await db.rooms.find_one({"id": room_id}, {"_id": 0, "chat_messages": 0})
+
+async def load_chat_history(room_id: str) -> list:
+    """Chat history saved when the room was last evicted from memory; only joins read it"""
+    room = await db.rooms.find_one({"id": room_id}, {"_id": 0, "chat_messages": 1})
+    return (room or {}).get("chat_messages", [])
+
 @api_router.get("/rooms/{room_id}")
 async def get_room(room_id: str):
     logger.info(f"Getting room details for room_id: {room_id}")
-    room = await db.rooms.find_one({"id": room_id})
+    room = await room_cache.get(room_id, load_room)
     if room:
         logger.info(f"Room found: {room_id}")
-        return room
+        return FastJSONResponse(room)
     logger.warning(f"Room not found: {room_id}")
     return {"error": "Room not found"}
 
@@ -326,33 +581,34 @@ async def join_room(request: JoinRoomRequest):
     user_id = request.user_id
     user_name = request.user_name
     
-    logger.info(f"User {user_name} ({user_id}) attempting to join room: {room_id}")
-    
-    # Check if room exists in database
-    room = await db.rooms.find_one({"id": room_id})
-    if not room:
-        logger.warning(f"Room not found in database: {room_id}")
-        return {"error": "Room not found"}
-    
-    # Initialize room in memory if not exists
+    # Initialize room in memory if not exists; rooms already in memory need no lookup
     if room_id not in active_rooms:
-        logger.info(f"Initializing room in memory: {room_id}")
-        active_rooms[room_id] = {
-            "name": room["name"],
-            "code": room.get("code", ""),
-            "language": room["language"],
-            "users": {},
-            "cursors": {},
-            "chat_messages": [],
-            "typing_users": {}
-        }
+        room = await room_cache.get(room_id, load_room)
+        if not room:
+            logger.warning(f"Room not found in database: {room_id}")
+            return {"error": "Room not found"}
+        chat_messages = await load_chat_history(room_id)
+        
+        # Another join may have loaded the room while this one waited
+        if room_id not in active_rooms:
+            logger.info("Initializing room in memory: %s", room_id, extra={"event": "room_load", "room_id": room_id})
+            active_rooms[room_id] = {
+                "name": room["name"],
+                "code": room.get("code", ""),
+                "language": room["language"],
+                "users": {},
+                "cursors": {},
+                "chat_messages": chat_messages,
+                "typing_users": {}
+            }
     
     # Add user to room with name
     user_data = {"user_id": user_id, "user_name": user_name}
     active_rooms[room_id]["users"][user_id] = user_data
     user_sessions[user_id] = {"room_id": room_id, "user_name": user_name}
     
-    logger.info(f"User {user_name} successfully joined room {room_id}. Total users: {len(active_rooms[room_id]['users'])}")
+    logger.info("User %s (%s) joined room %s. Total users: %d", user_name, user_id, room_id, len(active_rooms[room_id]["users"]),
+                extra={"event": "join", "room_id": room_id, "user_id": user_id})
     
     # Notify other users
     await send_to_room(room_id, "user_joined", {
@@ -361,7 +617,8 @@ async def join_room(request: JoinRoomRequest):
         "users": list(active_rooms[room_id]["users"].values())
     }, exclude_user=user_id)
     
-    return {
+    # Returned as a response so the chat history skips jsonable_encoder
+    return FastJSONResponse({
         "room_id": room_id,
         "room_name": active_rooms[room_id]["name"],
         "code": active_rooms[room_id]["code"],
@@ -370,10 +627,11 @@ async def join_room(request: JoinRoomRequest):
         "user_name": user_name,
         "users": list(active_rooms[room_id]["users"].values()),
         "chat_messages": active_rooms[room_id]["chat_messages"]
-    }
+    })
 
-@api_router.post("/rooms/code")
-async def update_code(update: CodeUpdate):
+@api_router.post("/rooms/code", openapi_extra=json_body_openapi(CodeUpdate))
+async def update_code(update: CodeUpdate = json_body(CodeUpdate)):
+    tracer.span_from_start("request.validate", model="CodeUpdate")
     room_id = update.room_id
     user_id = update.user_id
     user_name = update.user_name
@@ -390,10 +648,12 @@ async def update_code(update: CodeUpdate):
     active_rooms[room_id]["code"] = new_code
     
     # Update in database
-    await db.rooms.update_one(
-        {"id": room_id},
-        {"$set": {"code": new_code}}
-    )
+    with tracer.span("mongo.update_one", collection="rooms"):
+        await db.rooms.update_one(
+            {"id": room_id},
+            {"$set": {"code": new_code}}
+        )
+    room_cache.apply(room_id, {"code": new_code})
     
     # Broadcast to other users with user name
     await send_to_room(room_id, "code_updated", {
@@ -404,8 +664,9 @@ async def update_code(update: CodeUpdate):
     
     return {"success": True}
 
-@api_router.post("/rooms/cursor")
-async def update_cursor(update: CursorUpdate):
+@api_router.post("/rooms/cursor", openapi_extra=json_body_openapi(CursorUpdate))
+async def update_cursor(update: CursorUpdate = json_body(CursorUpdate)):
+    tracer.span_from_start("request.validate", model="CursorUpdate")
     room_id = update.room_id
     user_id = update.user_id
     user_name = update.user_name
@@ -441,22 +702,26 @@ async def save_room(room_id: str):
     
     # Save current code to database
     current_code = active_rooms[room_id]["code"]
+    saved_fields = {"code": current_code, "updated_at": datetime.utcnow()}
     await db.rooms.update_one(
         {"id": room_id},
-        {"$set": {"code": current_code, "updated_at": datetime.utcnow()}}
+        {"$set": saved_fields}
     )
+    room_cache.apply(room_id, saved_fields)
     
     return {"message": "File saved successfully"}
 
-@api_router.post("/send-chat-message")
-async def send_chat_message(request: SendChatMessageRequest):
+@api_router.post("/send-chat-message", openapi_extra=json_body_openapi(SendChatMessageRequest))
+async def send_chat_message(request: SendChatMessageRequest = json_body(SendChatMessageRequest)):
     """Send a chat message to a room"""
+    tracer.span_from_start("request.validate", model="SendChatMessageRequest")
     room_id = request.room_id
     user_id = request.user_id
     user_name = request.user_name
     message = request.message.strip()
     
-    logger.info(f"Chat message from {user_name} ({user_id}) in room {room_id}: {len(message)} chars")
+    logger.info("Chat message from %s (%s) in room %s: %d chars", user_name, user_id, room_id, len(message),
+                extra={"event": "chat", "room_id": room_id, "user_id": user_id})
     
     # Validate input
     if not message:
@@ -480,12 +745,12 @@ async def send_chat_message(request: SendChatMessageRequest):
     )
     
     # Store message in room's chat history (in-memory)
-    active_rooms[room_id]["chat_messages"].append(chat_message.dict())
+    active_rooms[room_id]["chat_messages"].append(chat_message.model_dump())
     
     # Keep only last 100 messages to prevent memory bloat
     if len(active_rooms[room_id]["chat_messages"]) > 100:
         active_rooms[room_id]["chat_messages"] = active_rooms[room_id]["chat_messages"][-100:]
-        logger.info(f"Chat history trimmed to 100 messages for room {room_id}")
+        logger.info("Chat history trimmed to 100 messages for room %s", room_id, extra={"event": "chat_trim"})
     
     # Broadcast message to all users in the room
     await send_to_room(room_id, "chat_message", {
@@ -496,11 +761,10 @@ async def send_chat_message(request: SendChatMessageRequest):
         "timestamp": chat_message.timestamp.isoformat()
     })
     
-    logger.info(f"Chat message broadcasted successfully: {chat_message.id}")
     return {"success": True, "message_id": chat_message.id}
 
-@api_router.post("/typing-status")
-async def update_typing_status(request: TypingStatusRequest):
+@api_router.post("/typing-status", openapi_extra=json_body_openapi(TypingStatusRequest))
+async def update_typing_status(request: TypingStatusRequest = json_body(TypingStatusRequest)):
     """Update user typing status in a room"""
     room_id = request.room_id
     user_id = request.user_id
@@ -530,6 +794,26 @@ async def update_typing_status(request: TypingStatusRequest):
     
     return {"success": True}
 
+@api_router.post("/rooms/ack")
+async def ack_events(request: EventAckRequest):
+    """Record that a client received broadcast events, identified by their room sequence numbers"""
+    if request.room_id not in active_rooms:
+        return {"error": "Room not found"}
+    recorded = sum(
+        propagation_tracker.ack(request.room_id, request.user_id, ack.seq, ack.hold_ms) is not None
+        for ack in request.acks
+    )
+    return {"success": True, "recorded": recorded}
+
+@api_router.get("/rooms/{room_id}/latency")
+async def room_latency(room_id: str):
+    """Delivery latency percentiles for a room's broadcasts, from client acks"""
+    return propagation_tracker.room_report(room_id)
+
+@api_router.get("/propagation/metrics")
+async def propagation_metrics():
+    return propagation_tracker.metrics()
+
 @api_router.post("/leave-room")
 async def leave_room(request: LeaveRoomRequest):
     """Allow user to gracefully leave a room"""
@@ -558,6 +842,9 @@ async def leave_room(request: LeaveRoomRequest):
     if user_id in sse_connections:
         del sse_connections[user_id]
     
+    # Stop any code the user still has running in this room
+    execution_tracker.cancel_user(user_id, room_id, reason="left")
+    
     # Notify remaining users
     await send_to_room(room_id, "user_left", {
         "user_id": user_id,
@@ -567,88 +854,191 @@ async def leave_room(request: LeaveRoomRequest):
     
     return {"success": True, "message": "Left room successfully"}
 
-@api_router.post("/run-code", response_model=RunCodeResponse)
-async def run_code(request: RunCodeRequest):
-    """Execute code using Piston API"""
-    logger.info(f"Code execution request - Language: {request.language}, Code length: {len(request.code)} chars")
+async def execute_request(request: RunCodeRequest, on_output=None) -> dict:
+    """Resolve, cache-check, schedule and run an execution, returning RunCodeResponse fields
     
-    try:
-        # Map frontend language names to Piston API language names
-        language_mapping = {
-            "javascript": "javascript",
-            "python": "python",
-            "cpp": "cpp",
-            "typescript": "typescript",
-            "html": "html",
-            "css": "css"
+    When on_output is given, output is also delivered incrementally through it.
+    """
+    # Resolve against the cached runtime catalog; unknown languages fail without a network call
+    resolved = runtime_catalog.resolve(request.language)
+    if resolved is None:
+        logger.warning(f"Unsupported language for {executor.name} executor: {request.language}")
+        result = {
+            "stdout": "",
+            "stderr": f"Language '{request.language}' is not supported",
+            "exit_code": 1,
+            "error": "Unsupported language"
         }
+        if on_output:
+            await on_output("stderr", result["stderr"])
+        return result
+    language, version = resolved
+    logger.info("Using %s executor with language: %s (%s)", executor.name, language, version, extra={"event": "run_code"})
+    
+    # Serve repeated runs of identical code from the result cache
+    cache_key = None
+    if request.cache:
+        cache_key = execution_key(f"{executor.name}:{language}", version, request.code, request.stdin)
+        cached_result = execution_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("Code execution served from cache", extra={"event": "run_code"})
+            if on_output:
+                for stream_name in ("stdout", "stderr"):
+                    if cached_result.get(stream_name):
+                        await on_output(stream_name, cached_result[stream_name])
+            return {**cached_result, "cached": True}
+    
+    async def run_scheduled(on_output):
+        # Wait for a free execution slot; rooms are served round-robin
+        on_position = None
+        if request.user_id:
+            on_position = lambda position: notify_user(request.user_id, "run_queued", {"position": position})
+        async with execution_scheduler.slot(language, request.room_id, on_position):
+            started = time.perf_counter()
+            if on_output:
+                result = await executor.stream(request, language, version, on_output)
+            else:
+                result = await executor.run(request, language, version)
+            execution_latency.observe(time.perf_counter() - started, executor.name, language)
         
-        piston_language = language_mapping.get(request.language, request.language)
-        logger.info(f"Using Piston language: {piston_language}")
+        logger.info("Code execution completed - stdout length: %d, stderr length: %d, exit_code: %s",
+                    len(result["stdout"]), len(result["stderr"]), result["exit_code"], extra={"event": "run_code"})
         
-        # Prepare the request payload for Piston API
-        piston_payload = {
-            "language": piston_language,
-            "version": "*",  # Use latest version
-            "files": [{
-                "content": request.code
-            }],
-            "stdin": request.stdin or ""
+        # Only runs that completed normally are cached; timeouts and kills may not recur
+        if cache_key and not result.get("error") and result.get("exit_code") is not None:
+            execution_cache.put(cache_key, result)
+        return result
+    
+    if not cache_key:
+        return await run_scheduled(on_output)
+    
+    # Identical runs already in flight share one upstream execution; each caller
+    # subscribes to its output only for as long as it is waiting
+    result, shared = await execution_flights.run(cache_key, run_scheduled, on_output)
+    if shared:
+        logger.info("Code execution coalesced with an identical in-flight run", extra={"event": "run_code"})
+    return result
+
+def execution_error_result(e: Exception) -> dict:
+    """Translate an execution failure into RunCodeResponse fields"""
+    if isinstance(e, QueueFullError):
+        logger.warning(f"Code execution rejected: {e}")
+        return {
+            "stdout": "",
+            "stderr": "Too many programs are running right now. Please try again shortly.",
+            "exit_code": 1,
+            "error": str(e)
         }
-        
-        logger.info("Sending request to Piston API...")
-        
-        # Make request to Piston API
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://emkc.org/api/v2/piston/execute",
-                json=piston_payload,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Piston API error: {response.status_code} - {response.text}")
-                return RunCodeResponse(
-                    stdout="",
-                    stderr=f"Piston API error: {response.status_code}",
-                    exit_code=1,
-                    error=f"API request failed with status {response.status_code}"
-                )
-            
-            result = response.json()
-            logger.info(f"Piston API response received: exit_code={result.get('run', {}).get('code', 'unknown')}")
-            
-            # Extract results from Piston API response
-            run_result = result.get("run", {})
-            stdout = run_result.get("stdout", "")
-            stderr = run_result.get("stderr", "")
-            exit_code = run_result.get("code", 0)
-            
-            logger.info(f"Code execution completed - stdout length: {len(stdout)}, stderr length: {len(stderr)}, exit_code: {exit_code}")
-            
-            return RunCodeResponse(
-                stdout=stdout,
-                stderr=stderr,
-                exit_code=exit_code
-            )
-            
-    except httpx.TimeoutException:
+    if isinstance(e, httpx.TimeoutException):
         logger.error("Code execution timed out after 30 seconds")
-        return RunCodeResponse(
-            stdout="",
-            stderr="Code execution timed out",
-            exit_code=1,
-            error="Request timed out after 30 seconds"
-        )
+        return {
+            "stdout": "",
+            "stderr": "Code execution timed out",
+            "exit_code": 1,
+            "error": "Request timed out after 30 seconds"
+        }
+    logger.error(f"Error executing code: {str(e)}")
+    logger.error(traceback.format_exc())
+    return {
+        "stdout": "",
+        "stderr": f"Execution error: {str(e)}",
+        "exit_code": 1,
+        "error": str(e)
+    }
+
+def cancelled_result(reason: str) -> dict:
+    """RunCodeResponse fields for an execution cancelled through the tracker"""
+    messages = {
+        "superseded": "Execution cancelled: a newer run was started",
+        "left": "Execution cancelled: user left the room",
+        "disconnected": "Execution cancelled: user disconnected",
+    }
+    message = messages.get(reason, "Execution cancelled")
+    return {"stdout": "", "stderr": message, "exit_code": 1, "error": message}
+
+@api_router.post("/run-code", response_model=RunCodeResponse)
+async def run_code(request: RunCodeRequest):
+    """Execute code using the configured execution backend"""
+    logger.info("Code execution request - Language: %s, Code length: %d chars", request.language, len(request.code),
+                extra={"event": "run_code", "room_id": request.room_id})
+    
+    # Run as a tracked task so a newer run, leaving the room or /run-code/cancel can stop it
+    job_id = str(uuid.uuid4())
+    task = asyncio.ensure_future(execute_request(request))
+    execution_tracker.track(job_id, task, request.room_id, request.user_id)
+    
+    try:
+        return RunCodeResponse(**await task)
+    except asyncio.CancelledError:
+        reason = execution_tracker.pop_reason(job_id)
+        if reason is None:
+            raise
+        return RunCodeResponse(**cancelled_result(reason))
     except Exception as e:
-        logger.error(f"Error executing code: {str(e)}")
-        logger.error(traceback.format_exc())
-        return RunCodeResponse(
-            stdout="",
-            stderr=f"Execution error: {str(e)}",
-            exit_code=1,
-            error=str(e)
-        )
+        return RunCodeResponse(**execution_error_result(e))
+
+async def stream_execution(job_id: str, request: RunCodeRequest):
+    """Run code in the background, broadcasting its output to the room as run_output events"""
+    job = {"job_id": job_id, "user_id": request.user_id}
+    
+    async def emit(stream_name: str, text: str):
+        await send_to_room(request.room_id, "run_output", {
+            **job,
+            "stream": stream_name,
+            "data": text,
+            "done": False
+        })
+
+    # Each pipe read would otherwise be its own room-wide broadcast
+    batcher = OutputBatcher(emit)
+    try:
+        result = await execute_request(request, on_output=batcher.write)
+    except asyncio.CancelledError:
+        reason = execution_tracker.pop_reason(job_id)
+        if reason is None:
+            batcher.cancel()
+            raise
+        result = cancelled_result(reason)
+    except Exception as e:
+        result = execution_error_result(e)
+        await batcher.write("stderr", result["stderr"])
+    await batcher.close()
+
+    await send_to_room(request.room_id, "run_output", {
+        **job,
+        "done": True,
+        "exit_code": result["exit_code"],
+        "error": result.get("error"),
+        "cached": result.get("cached", False)
+    })
+
+@api_router.post("/run-code/stream")
+async def run_code_stream(request: RunCodeRequest):
+    """Start a streaming execution whose output is broadcast to the room over SSE"""
+    if not request.room_id or request.room_id not in active_rooms:
+        return {"error": "Room not found"}
+    
+    job_id = str(uuid.uuid4())
+    logger.info("Streaming code execution %s - Language: %s, Room: %s", job_id, request.language, request.room_id,
+                extra={"event": "run_code", "room_id": request.room_id})
+    task = asyncio.create_task(stream_execution(job_id, request))
+    execution_tracker.track(job_id, task, request.room_id, request.user_id)
+    
+    return {"job_id": job_id}
+
+@api_router.post("/run-code/cancel")
+async def cancel_run(request: CancelRunRequest):
+    """Cancel a user's running execution, either a specific job or all of theirs in the room"""
+    if request.job_id:
+        if execution_tracker.owner(request.job_id) != (request.room_id, request.user_id):
+            return {"error": "Execution not found"}
+        cancelled = int(execution_tracker.cancel(request.job_id))
+    else:
+        cancelled = execution_tracker.cancel_user(request.user_id, request.room_id)
+    
+    if not cancelled:
+        return {"error": "No running execution to cancel"}
+    return {"success": True, "cancelled": cancelled}
 
 @api_router.options("/run-code")
 async def run_code_options():
@@ -662,6 +1052,83 @@ async def run_code_options():
         }
     )
 
+@api_router.get("/run-code/metrics")
+async def run_code_metrics():
+    """Connection pool, latency, cache and queue metrics for the execution backend"""
+    return {
+        "executor": {"name": executor.name, **executor.metrics()},
+        "piston": piston_client.metrics(),
+        "cache": execution_cache.metrics(),
+        "coalescing": execution_flights.metrics(),
+        "scheduler": execution_scheduler.metrics(),
+        "runtimes": runtime_catalog.metrics(),
+        "executions": execution_tracker.metrics()
+    }
+
+@api_router.get("/db/metrics")
+async def db_metrics():
+    """MongoDB pool settings, per-command latency, pool checkout and room cache statistics"""
+    return {**mongo_config.metrics(), "room_cache": room_cache.metrics()}
+
+@api_router.get("/db/query-report")
+async def db_query_report():
+    """Winning query plans for each request's query shape, flagging collection scans"""
+    if db is None:
+        return {"error": "Database not connected"}
+    report = await query_plan_report(db)
+    return {
+        "collection_scans": sum(1 for entry in report if entry.get("collection_scan")),
+        "queries": report
+    }
+
+@api_router.get("/traces")
+async def list_traces(limit: int = Query(20, ge=1, le=200)):
+    """Most recent sampled traces held in the in-process ring buffer"""
+    return {"tracing": tracer.metrics(), "traces": tracer.recent_traces(limit)}
+
+@api_router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All buffered spans of one trace, oldest first"""
+    spans = tracer.get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+@api_router.get("/debug/memory")
+async def debug_memory(top: int = Query(10, ge=0, le=100)):
+    """RSS, sizes of in-memory state and allocation growth; only served with MEMORY_DIAGNOSTICS enabled"""
+    if not memory_diagnostics.enabled:
+        raise HTTPException(status_code=404, detail="Memory diagnostics are disabled")
+    rooms = active_rooms.values()
+    sizes = {
+        "active_rooms": len(active_rooms),
+        "room_users": sum(len(room["users"]) for room in rooms),
+        "room_cursors": sum(len(room["cursors"]) for room in rooms),
+        "room_typing_users": sum(len(room.get("typing_users", {})) for room in rooms),
+        "room_chat_messages": sum(len(room["chat_messages"]) for room in rooms),
+        "user_sessions": len(user_sessions),
+        "sse_connections": len(sse_connections),
+        "sse_queued_events": sum(queue.qsize() for queue in sse_connections.values()),
+        "room_cache_entries": len(room_cache.entries),
+        "room_cache_versions": len(room_cache.versions),
+        "execution_cache_entries": len(execution_cache.entries),
+        "execution_jobs": len(execution_tracker.jobs),
+        "propagation_rooms": len(propagation_tracker.sequences),
+        "trace_ring_spans": len(tracer.ring.spans),
+        "asyncio_tasks": len(asyncio.all_tasks()),
+    }
+    return memory_diagnostics.snapshot(sizes, top)
+
+@api_router.get("/traffic/metrics")
+async def traffic_metrics():
+    """State of the opt-in traffic recorder"""
+    return traffic_recorder.metrics()
+
+@api_router.get("/runtimes")
+async def list_runtimes():
+    """Languages the execution backend supports and the versions runs resolve to"""
+    return {"executor": executor.name, "runtimes": runtime_catalog.languages()}
+
 @api_router.get("/sse/{user_id}")
 async def sse_endpoint(user_id: str):
     """Server-Sent Events endpoint for real-time updates"""
@@ -690,67 +1157,115 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+app.add_middleware(TrafficRecorderMiddleware, recorder=traffic_recorder)
+# Outermost, so request latency covers CORS handling too
+app.add_middleware(TracingMiddleware, tracer=tracer)
+app.add_middleware(RequestClockMiddleware)
+app.add_middleware(MetricsMiddleware, latency=http_latency)
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await health_prober.stop()
     if mongo_config.client:
         mongo_config.client.close()
 
+@app.on_event("shutdown")
+async def shutdown_tracing():
+    tracer.close()
+    traffic_recorder.close()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await runtime_catalog.close()
+    await executor.close()
+    await piston_client.close()
+
 # Cleanup function to remove disconnected users
+async def cleanup_sweep():
+    """One pass over the rooms removing disconnected users and stale typing indicators"""
+    current_time = datetime.utcnow()
+    for room_id, room_data in list(active_rooms.items()):
+        users_to_remove = []
+        for user_id in list(room_data["users"].keys()):
+            if user_id not in sse_connections:
+                users_to_remove.append(user_id)
+        
+        # Clean up stale typing indicators (older than 10 seconds)
+        typing_users_to_remove = []
+        for user_id, typing_data in list(room_data.get("typing_users", {}).items()):
+            typing_timestamp = typing_data.get("timestamp")
+            if typing_timestamp and (current_time - typing_timestamp).total_seconds() > 10:
+                typing_users_to_remove.append(user_id)
+        
+        for user_id in typing_users_to_remove:
+            if user_id in room_data["typing_users"]:
+                del room_data["typing_users"][user_id]
+            
+            # Broadcast updated typing status
+            typing_users = list(room_data["typing_users"].values())
+            await send_to_room(room_id, "typing_status", {
+                "typing_users": typing_users
+            })
+        
+        for user_id in users_to_remove:
+            user_name = None
+            if user_id in user_sessions:
+                user_name = user_sessions[user_id].get("user_name", user_id)
+                del user_sessions[user_id]
+            
+            if user_id in room_data["users"]:
+                del room_data["users"][user_id]
+            if user_id in room_data["cursors"]:
+                del room_data["cursors"][user_id]
+            if user_id in room_data.get("typing_users", {}):
+                del room_data["typing_users"][user_id]
+            
+            execution_tracker.cancel_user(user_id, room_id, reason="disconnected")
+            
+            # Notify remaining users with user name
+            await send_to_room(room_id, "user_left", {
+                "user_id": user_id,
+                "user_name": user_name or user_id,
+                "users": list(room_data["users"].values())
+            })
+        
+        # Drop rooms that have stayed empty; code is persisted on every update, chat on eviction
+        if room_data["users"]:
+            room_data.pop("empty_since", None)
+        elif ROOM_EVICT_AFTER > 0:
+            empty_since = room_data.setdefault("empty_since", current_time)
+            if (current_time - empty_since).total_seconds() >= ROOM_EVICT_AFTER and active_rooms.get(room_id) is room_data:
+                await evict_room(room_id, room_data)
+
+async def evict_room(room_id: str, room_data: dict):
+    """Save an idle room's chat history to its document, then drop the room from memory"""
+    # The room cache never holds chat history, so it needs no update
+    try:
+        await db.rooms.update_one({"id": room_id}, {"$set": {"chat_messages": list(room_data["chat_messages"])}})
+    except Exception as e:
+        # Keep the room (and its history) in memory; the next sweep tries again
+        logger.error(f"Could not save chat history for room {room_id}, not evicting: {e}")
+        return
+    # Someone may have joined while the history was being written
+    if room_data["users"] or active_rooms.get(room_id) is not room_data:
+        room_data.pop("empty_since", None)
+        return
+    del active_rooms[room_id]
+    propagation_tracker.forget_room(room_id)
+    logger.info(f"Evicted idle room from memory: {room_id}")
+
 async def cleanup_disconnected_users():
     """Background task to clean up disconnected users and stale typing indicators"""
     while True:
         try:
-            current_time = datetime.utcnow()
-            for room_id, room_data in list(active_rooms.items()):
-                users_to_remove = []
-                for user_id in list(room_data["users"].keys()):
-                    if user_id not in sse_connections:
-                        users_to_remove.append(user_id)
-                
-                # Clean up stale typing indicators (older than 10 seconds)
-                typing_users_to_remove = []
-                for user_id, typing_data in list(room_data.get("typing_users", {}).items()):
-                    typing_timestamp = typing_data.get("timestamp")
-                    if typing_timestamp and (current_time - typing_timestamp).total_seconds() > 10:
-                        typing_users_to_remove.append(user_id)
-                
-                for user_id in typing_users_to_remove:
-                    if user_id in room_data["typing_users"]:
-                        del room_data["typing_users"][user_id]
-                    
-                    # Broadcast updated typing status
-                    typing_users = list(room_data["typing_users"].values())
-                    await send_to_room(room_id, "typing_status", {
-                        "typing_users": typing_users
-                    })
-                
-                for user_id in users_to_remove:
-                    user_name = None
-                    if user_id in user_sessions:
-                        user_name = user_sessions[user_id].get("user_name", user_id)
-                        del user_sessions[user_id]
-                    
-                    if user_id in room_data["users"]:
-                        del room_data["users"][user_id]
-                    if user_id in room_data["cursors"]:
-                        del room_data["cursors"][user_id]
-                    if user_id in room_data.get("typing_users", {}):
-                        del room_data["typing_users"][user_id]
-                    
-                    # Notify remaining users with user name
-                    await send_to_room(room_id, "user_left", {
-                        "user_id": user_id,
-                        "user_name": user_name or user_id,
-                        "users": list(room_data["users"].values())
-                    })
-            
-            await asyncio.sleep(30)  # Check every 30 seconds
+            await cleanup_sweep()
+            await asyncio.sleep(CLEANUP_INTERVAL)
         except Exception as e:
             logger.error(f"Error in cleanup task: {e}")
-            await asyncio.sleep(30)
+            await asyncio.sleep(CLEANUP_INTERVAL)
 
 # Start cleanup task
 @app.on_event("startup")
@@ -763,9 +1278,27 @@ async def startup_event():
     if connection_success:
         db = mongo_config.get_database()
         logger.info("✅ Database initialized successfully")
+        
+        # Make sure every query path is backed by an index
+        await ensure_indexes(db)
+        for entry in await query_plan_report(db):
+            if entry.get("collection_scan"):
+                logger.warning(f"{entry['handler']} query on {entry['collection']} uses a collection scan")
     else:
         logger.critical("❌ Failed to connect to MongoDB. Application may not function properly.")
         # Don't exit the application, just log the error
     
+    # Probe database health in the background; health endpoints serve the cached result
+    await health_prober.probe()
+    health_prober.start()
+    tracer.start()
+    memory_diagnostics.start()
+    traffic_recorder.start()
+    
+    # Open the pooled Piston client so the first run skips the handshake cost
+    await piston_client.start()
+    await executor.start()
+    await runtime_catalog.start()
+    
     # Start the cleanup task
     asyncio.create_task(cleanup_disconnected_users())
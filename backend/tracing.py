@@ -0,0 +1,348 @@
+"""
+Lightweight tracing with contextvar spans, a ring buffer and an OTLP-style file exporter
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = ContextVar("current_span", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id, parent_id, name, kind=KIND_INTERNAL, start_ns=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def context(self):
+        """Trace context carried in event payloads so receivers can attach their spans"""
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "sent_ns": time.time_ns()}
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def as_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class RingBufferExporter:
+    """Keeps the most recent finished spans in memory for the traces endpoints"""
+
+    def __init__(self, size):
+        self.spans = deque(maxlen=size)
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def trace(self, trace_id):
+        return sorted((span for span in self.spans if span.trace_id == trace_id), key=lambda span: span.start_ns)
+
+    def recent(self, limit):
+        """Most recent traces, newest first, as (trace_id, spans) pairs"""
+        traces = {}
+        for span in reversed(self.spans):
+            traces.setdefault(span.trace_id, []).append(span)
+        return list(traces.items())[:limit]
+
+
+class OtlpFileExporter:
+    """Appends OTLP/JSON ExportTraceServiceRequest lines to a file from a background thread"""
+
+    def __init__(self, path, service_name, batch_size=256, flush_interval=2.0):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.written = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="otlp-file-exporter", daemon=True)
+            self.thread.start()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def export(self, span):
+        self.queue.put(span)
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "codesync"}, "spans": [span.as_otlp() for span in batch]}],
+        }]}
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, separators=(",", ":")) + "\n")
+            self.written += len(batch)
+        except OSError as e:
+            logger.error(f"Could not write spans to {self.path}: {e}")
+
+
+class Tracer:
+    """Creates spans for sampled requests and hands finished ones to the exporters
+
+    Only requests picked by the sampler (or continuing a sampled W3C traceparent)
+    get a root span; span() is a no-op outside one, so untraced work pays almost nothing.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("TRACING_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.sample_rate = float(os.environ.get("TRACING_SAMPLE_RATE", "0.1"))
+        self.ring = RingBufferExporter(int(os.environ.get("TRACING_RING_SIZE", "2048")))
+        self.exporters = [self.ring]
+        self.file_exporter = None
+        export_path = os.environ.get("TRACING_EXPORT_PATH")
+        if export_path:
+            self.file_exporter = OtlpFileExporter(export_path, os.environ.get("TRACING_SERVICE_NAME", "codesync-backend"))
+            self.exporters.append(self.file_exporter)
+        self.traces_started = 0
+        self.spans_finished = 0
+
+    def start(self):
+        if self.file_exporter:
+            self.file_exporter.start()
+
+    def close(self):
+        if self.file_exporter:
+            self.file_exporter.close()
+
+    def current(self):
+        return _current_span.get()
+
+    def start_root(self, name, traceparent=None, **attributes):
+        """Open a server span if this request is sampled; returns (span, token) or (None, None)"""
+        if not self.enabled:
+            return None, None
+        trace_id = parent_id = None
+        if traceparent:
+            parts = traceparent.split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and len(parts[3]) == 2:
+                try:
+                    sampled = int(parts[3], 16) & 1
+                except ValueError:
+                    sampled = None
+                if sampled == 0:
+                    return None, None
+                if sampled:
+                    trace_id, parent_id = parts[1], parts[2]
+        if trace_id is None:
+            if random.random() >= self.sample_rate:
+                return None, None
+            trace_id = _new_id(128)
+        span = Span(trace_id, parent_id, name, KIND_SERVER, attributes=attributes)
+        self.traces_started += 1
+        return span, _current_span.set(span)
+
+    def finish(self, span, token=None):
+        span.end_ns = time.time_ns()
+        if token is not None:
+            _current_span.reset(token)
+        self.spans_finished += 1
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Child span of the current one; yields None when the request is not traced"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace_id, parent.span_id, name, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            self.finish(span, token)
+
+    def span_from_start(self, name, **attributes):
+        """Record a child covering the time from the current span's start until now
+
+        Handlers use this for work FastAPI does before they run, such as reading
+        the body and validating it into the request model.
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(parent.trace_id, parent.span_id, name, start_ns=parent.start_ns, attributes=attributes)
+            self.finish(span)
+
+    def record(self, name, trace_context, end_ns=None, **attributes):
+        """Record a span for work in another task, from a context handed over alongside a queued event"""
+        span = Span(trace_context["trace_id"], trace_context["span_id"], name,
+                    start_ns=trace_context["sent_ns"], attributes=attributes)
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self.spans_finished += 1
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def recent_traces(self, limit=20):
+        summaries = []
+        for trace_id, spans in self.ring.recent(limit):
+            root = min(spans, key=lambda span: span.start_ns)
+            summaries.append({
+                "trace_id": trace_id,
+                "root": root.name,
+                "spans": len(spans),
+                "duration_ms": round((max(span.end_ns for span in spans) - root.start_ns) / 1e6, 3),
+            })
+        return summaries
+
+    def get_trace(self, trace_id):
+        return [span.as_dict() for span in self.ring.trace(trace_id)]
+
+    def metrics(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "traces_started": self.traces_started,
+            "spans_finished": self.spans_finished,
+            "ring_buffer_spans": len(self.ring.spans),
+            "export_path": self.file_exporter.path if self.file_exporter else None,
+            "exported_to_file": self.file_exporter.written if self.file_exporter else 0,
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per sampled HTTP request
+
+    SSE streams are skipped: they stay open for the whole session, and their
+    deliveries are recorded against the broadcast that queued each event.
+    """
+
+    def __init__(self, app, tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if b"text/event-stream" in headers.get(b"accept", b""):
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = headers.get(b"traceparent")
+        span, token = self.tracer.start_root(
+            f"{scope['method']} {scope['path']}",
+            traceparent.decode("latin-1") if traceparent else None,
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set("http.status_code", message["status"])
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-trace-id", span.trace_id.encode("ascii"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+            self.tracer.finish(span, token)
+
+# Global tracer instance
+tracer = Tracer()
@@ -0,0 +1,179 @@
+"""
+Opt-in capture of real-time API traffic for replay in benchmarks
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Recorded endpoints and the short names written to the capture file
+RECORDED_PATHS = {
+    "/api/rooms/join": "join",
+    "/api/rooms/code": "code",
+    "/api/rooms/cursor": "cursor",
+    "/api/send-chat-message": "chat",
+    "/api/typing-status": "typing",
+    "/api/leave-room": "leave",
+}
+
+# Free-text fields blanked when redacting; lengths and line breaks are kept so payload sizes stay realistic
+REDACTED_FIELDS = ("code", "message", "user_name")
+_NOT_NEWLINE = re.compile(r"[^\n]")
+
+FORMAT_NAME = "codesync-traffic"
+FORMAT_VERSION = 1
+
+
+def redact(body):
+    for field in REDACTED_FIELDS:
+        value = body.get(field)
+        if isinstance(value, str):
+            body[field] = _NOT_NEWLINE.sub("x", value)
+    return body
+
+
+class TrafficRecorder:
+    """Writes recorded requests as gzip-compressed NDJSON from a background thread
+
+    Each recording starts with a header line; every following line is one
+    request: {"t": ms since the header, "e": endpoint name, "s": response
+    status, "b": JSON body}. Batches are appended as separate gzip members,
+    so a file cut short by a crash stays readable up to the last batch, and
+    restarts append a new header to the same file.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("TRAFFIC_RECORDING", "false").strip().lower() in ("1", "true", "yes", "on")
+        self.path = os.environ.get("TRAFFIC_RECORD_PATH", "traffic.ndjson.gz")
+        self.redact = os.environ.get("TRAFFIC_RECORD_REDACT", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.max_events = int(os.environ.get("TRAFFIC_RECORD_MAX_EVENTS", "1000000"))
+        self.queue_size = int(os.environ.get("TRAFFIC_RECORD_QUEUE_SIZE", "10000"))
+        self.flush_interval = float(os.environ.get("TRAFFIC_RECORD_FLUSH_INTERVAL", "2"))
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.thread = None
+        self.started_ns = None
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+
+    def start(self):
+        if not self.enabled or self.thread is not None:
+            return
+        self.started_ns = time.perf_counter_ns()
+        header = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "started_at": time.time(), "redacted": self.redact}
+        self.thread = threading.Thread(target=self._run, args=(header,), name="traffic-recorder", daemon=True)
+        self.thread.start()
+        logger.info(f"Recording traffic to {self.path}")
+
+    def close(self):
+        if self.thread is not None:
+            # Blocks briefly if the queue is full; the writer is draining it
+            self.queue.put(None)
+            self.thread.join(timeout=10)
+            self.thread = None
+            logger.info(f"Traffic recording stopped: {self.written} requests written, {self.dropped} dropped")
+
+    def record(self, endpoint, arrived_ns, status, body):
+        """Queue one request for writing; never blocks the event loop"""
+        if self.recorded >= self.max_events:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait((endpoint, arrived_ns, status, body))
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _encode(self, endpoint, arrived_ns, status, body):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            # Replayed as-is so malformed requests keep failing the same way
+            payload = body.decode("utf-8", errors="replace")
+        if self.redact and isinstance(payload, dict):
+            payload = redact(payload)
+        entry = {"t": round((arrived_ns - self.started_ns) / 1e6, 3), "e": endpoint, "s": status, "b": payload}
+        return json.dumps(entry, separators=(",", ":"))
+
+    def _run(self, header):
+        pending = [json.dumps(header, separators=(",", ":"))]
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while True:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(self._encode(*item))
+            if pending:
+                self._write(pending)
+                pending = []
+            if stopping:
+                return
+
+    def _write(self, lines):
+        try:
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.written += sum(1 for line in lines if line.startswith('{"t":'))
+        except OSError as e:
+            logger.error(f"Could not write traffic to {self.path}: {e}")
+
+    def metrics(self):
+        return {
+            "enabled": self.enabled,
+            "path": self.path if self.enabled else None,
+            "redacted": self.redact,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+        }
+
+
+class TrafficRecorderMiddleware:
+    """ASGI middleware capturing the bodies and response status of recorded endpoints"""
+
+    def __init__(self, app, recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        endpoint = RECORDED_PATHS.get(scope["path"]) if scope["type"] == "http" else None
+        if endpoint is None or not self.recorder.enabled or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        arrived_ns = time.perf_counter_ns()
+        chunks = []
+        status = [0]
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.recorder.record(endpoint, arrived_ns, status[0], b"".join(chunks))
+
+# Global traffic recorder instance
+traffic_recorder = TrafficRecorder()
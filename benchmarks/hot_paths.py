@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the backend's real-time hot paths
+
+Calls the server functions directly, with no network or database involved:
+send_to_room fan-out at several room sizes, SSE framing in
+generate_sse_stream, Pydantic parsing of CodeUpdate and CursorUpdate, chat
+append and trim, and the cleanup sweep. The encode benchmarks compare the
+standard library and FastAPI encoders with json_codec. The request
+benchmarks push whole HTTP requests through the ASGI app, middleware
+included, to give the CPU cost per request.
+
+Results are per-operation times in microseconds. --save-baseline stores them
+as JSON. Later runs compare against that file and exit non-zero when any
+benchmark's best time is slower than the baseline by more than --threshold,
+when the baseline file is missing, or when a benchmark has no baseline entry.
+Baselines only mean something on the machine that recorded them, so none is
+committed; record one before comparing.
+
+Usage: python benchmarks/hot_paths.py [--filter send_to_room] [--repeat 7]
+       python benchmarks/hot_paths.py --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+from pathlib import Path
+
+# Keep log output and tracing out of the measurements
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("TRACING_ENABLED", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+import json_codec  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "hot_paths.json"
+
+SAMPLE_CODE = "def handler(event):\n    return {'status': 'ok', 'items': [i * 2 for i in range(10)]}\n" * 25
+
+
+def reset_state():
+    server.active_rooms.clear()
+    server.user_sessions.clear()
+    server.sse_connections.clear()
+
+
+def make_room(room_id, users, connected=True):
+    """Put a room with the given number of joined users (and SSE queues) in memory"""
+    room = {
+        "name": room_id, "code": "", "language": "python",
+        "users": {}, "cursors": {}, "chat_messages": [], "typing_users": {}
+    }
+    for index in range(users):
+        user_id = f"{room_id}_user_{index}"
+        room["users"][user_id] = {"user_id": user_id, "user_name": f"User {index}"}
+        server.user_sessions[user_id] = {"room_id": room_id, "user_name": f"User {index}"}
+        if connected:
+            server.sse_connections[user_id] = asyncio.Queue()
+    server.active_rooms[room_id] = room
+    return room
+
+
+def drain_queues():
+    for queue in server.sse_connections.values():
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def bench_send_to_room(users):
+    async def setup():
+        reset_state()
+        make_room("bench", users + 1)
+
+    async def run(ops):
+        data = {"code": SAMPLE_CODE, "user_id": "bench_user_0", "user_name": "User 0"}
+        for _ in range(ops):
+            await server.send_to_room("bench", "code_updated", data, exclude_user="bench_user_0")
+
+    return setup, run, drain_queues
+
+
+def bench_sse_framing():
+    message = (json.dumps({"type": "code_updated", "data": {"code": SAMPLE_CODE, "user_id": "u", "user_name": "U"},
+                           "seq": 1, "sent_at": time.time() * 1000}), None)
+    state = {}
+
+    async def setup():
+        reset_state()
+        stream = server.generate_sse_stream("listener")
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        server.sse_connections["listener"].put_nowait(message)
+        await first
+        state["stream"] = stream
+        return stream.aclose
+
+    async def run(ops):
+        queue = server.sse_connections["listener"]
+        stream = state["stream"]
+        for _ in range(ops):
+            queue.put_nowait(message)
+            await stream.__anext__()
+
+    return setup, run, None
+
+
+def bench_parse(model, payload, from_json):
+    raw = json.dumps(payload).encode()
+
+    async def setup():
+        pass
+
+    async def run(ops):
+        if from_json:
+            for _ in range(ops):
+                model.model_validate_json(raw)
+        else:
+            for _ in range(ops):
+                model.model_validate(payload)
+
+    return setup, run, None
+
+
+def bench_chat_append_trim():
+    request = server.SendChatMessageRequest(room_id="chat", user_id="chat_user_0", user_name="User 0",
+                                            message="benchmark chat message")
+
+    async def setup():
+        reset_state()
+        room = make_room("chat", 4)
+        # Start full so every message also takes the trim path
+        room["chat_messages"] = [{"id": str(index), "message": "old"} for index in range(100)]
+
+    async def run(ops):
+        for _ in range(ops):
+            await server.send_chat_message(request)
+
+    return setup, run, drain_queues
+
+
+def bench_cleanup_sweep(rooms, users):
+    async def setup():
+        reset_state()
+        for index in range(rooms):
+            make_room(f"room{index}", users)
+
+    async def run(ops):
+        for _ in range(ops):
+            await server.cleanup_sweep()
+
+    return setup, run, None
+
+
+def bench_encode(encode, value):
+    async def setup():
+        pass
+
+    async def run(ops):
+        for _ in range(ops):
+            encode(value)
+
+    return setup, run, None
+
+
+def bench_request(path, payload, chat_history=0):
+    """POST one request at a time through the full ASGI app into a room of 10 connected users"""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80), "client": ("127.0.0.1", 50000),
+    }
+    request = {"type": "http.request", "body": body, "more_body": False}
+
+    async def receive():
+        return request
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} returned HTTP {message['status']}")
+
+    async def setup():
+        reset_state()
+        room = make_room("bench", 10)
+        room["chat_messages"] = [
+            server.ChatMessage(room_id="bench", user_id="bench_user_1", user_name="User 1", message="benchmark chat message").model_dump()
+            for _ in range(chat_history)
+        ]
+
+    async def run(ops):
+        for _ in range(ops):
+            await server.app(dict(scope), receive, send)
+
+    return setup, run, drain_queues
+
+
+CODE_UPDATE = {"room_id": "r" * 36, "user_id": "user_abcdefgh", "user_name": "User", "code": SAMPLE_CODE}
+CURSOR_UPDATE = {"room_id": "r" * 36, "user_id": "user_abcdefgh", "user_name": "User",
+                 "position": {"lineNumber": 12, "column": 30}}
+
+EVENT = {"type": "code_updated", "data": {"code": SAMPLE_CODE, "user_id": "user_abcdefgh", "user_name": "User"},
+         "seq": 1, "sent_at": 1700000000000.0}
+JOIN_RESPONSE = {
+    "room_id": "r" * 36, "room_name": "Room", "code": SAMPLE_CODE, "language": "python",
+    "users": [{"user_id": f"user_{index}", "user_name": f"User {index}"} for index in range(10)],
+    "chat_messages": [server.ChatMessage(room_id="r" * 36, user_id="user_1", user_name="User 1",
+                                         message="benchmark chat message").model_dump() for _ in range(100)],
+}
+MEMBER = {"room_id": "bench", "user_id": "bench_user_0", "user_name": "User 0"}
+
+# name -> (factory, operations per timed run)
+BENCHMARKS = {
+    "send_to_room[users=1]": (lambda: bench_send_to_room(1), 5000),
+    "send_to_room[users=10]": (lambda: bench_send_to_room(10), 2000),
+    "send_to_room[users=50]": (lambda: bench_send_to_room(50), 500),
+    "send_to_room[users=200]": (lambda: bench_send_to_room(200), 200),
+    "sse_framing": (bench_sse_framing, 5000),
+    "parse_code_update[dict]": (lambda: bench_parse(server.CodeUpdate, CODE_UPDATE, False), 20000),
+    "parse_code_update[json]": (lambda: bench_parse(server.CodeUpdate, CODE_UPDATE, True), 20000),
+    "parse_cursor_update[dict]": (lambda: bench_parse(server.CursorUpdate, CURSOR_UPDATE, False), 20000),
+    "parse_cursor_update[json]": (lambda: bench_parse(server.CursorUpdate, CURSOR_UPDATE, True), 20000),
+    "encode_event[json.dumps]": (lambda: bench_encode(json.dumps, EVENT), 20000),
+    "encode_event[json_codec]": (lambda: bench_encode(json_codec.dumps_str, EVENT), 20000),
+    "encode_join[jsonable_encoder]": (lambda: bench_encode(lambda value: JSONResponse(jsonable_encoder(value)), JOIN_RESPONSE), 200),
+    "encode_join[json_codec]": (lambda: bench_encode(json_codec.FastJSONResponse, JOIN_RESPONSE), 2000),
+    "request[cursor]": (lambda: bench_request("/api/rooms/cursor", {**MEMBER, "position": {"lineNumber": 12, "column": 30}}), 2000),
+    "request[typing]": (lambda: bench_request("/api/typing-status", {**MEMBER, "is_typing": True}), 2000),
+    "request[chat]": (lambda: bench_request("/api/send-chat-message", {**MEMBER, "message": "benchmark chat message"}), 2000),
+    "request[join,chat=100]": (lambda: bench_request("/api/rooms/join", MEMBER, chat_history=100), 500),
+    "chat_append_trim": (bench_chat_append_trim, 2000),
+    "cleanup_sweep[rooms=100,users=10]": (lambda: bench_cleanup_sweep(100, 10), 200),
+}
+
+
+def measure(loop, factory, ops, repeat):
+    """Time a benchmark; factory() gives (async setup returning an optional async cleanup, run, before each run)"""
+    setup, run, before_run = factory()
+    samples = []
+    cleanup = loop.run_until_complete(setup())
+    try:
+        # One untimed pass warms caches and lazily built state
+        loop.run_until_complete(run(max(1, ops // 10)))
+        for _ in range(repeat):
+            if before_run is not None:
+                before_run()
+            started = time.perf_counter()
+            loop.run_until_complete(run(ops))
+            samples.append((time.perf_counter() - started) / ops * 1e6)
+    finally:
+        if cleanup is not None:
+            loop.run_until_complete(cleanup())
+        reset_state()
+    return {"best_us": round(min(samples), 3), "median_us": round(statistics.median(samples), 3), "ops": ops}
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose best time regressed past the threshold, as (name, baseline_us, current_us)"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["best_us"] > previous["best_us"] * (1 + threshold):
+            regressions.append((name, previous["best_us"], result["best_us"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply operations per run")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging, e.g. 0.25 = 25%%")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if not args.save_baseline:
+        if not args.baseline.exists():
+            parser.error(f"no baseline at {args.baseline}; record one first with --save-baseline")
+        baseline = json.loads(args.baseline.read_text())["results"]
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    print(f"{'benchmark':<38}{'best us':>12}{'median us':>12}{'baseline':>12}{'change':>9}")
+    for name, (factory, ops) in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = measure(loop, factory, max(1, int(ops * args.scale)), args.repeat)
+        results[name] = result
+        previous = baseline.get(name, {}).get("best_us")
+        change = f"{(result['best_us'] / previous - 1) * 100:+.1f}%" if previous else ""
+        print(f"{name:<38}{result['best_us']:>12}{result['median_us']:>12}{previous or '':>12}{change:>9}")
+    loop.close()
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, previous, current in regressions:
+        print(f"REGRESSION {name}: {previous}us -> {current}us (+{(current / previous - 1) * 100:.1f}%)")
+    # A benchmark with nothing to compare against would otherwise pass silently
+    unbaselined = [name for name in results if name not in baseline]
+    for name in unbaselined:
+        print(f"NO BASELINE {name}: re-record with --save-baseline")
+    return 1 if regressions or unbaselined else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
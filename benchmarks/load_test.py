@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Asyncio load generator for rooms, editors and SSE listeners
+
+Creates N rooms with M simulated users each. Every user holds a real SSE
+stream and sends code edits, cursor moves and chat messages at Poisson rates.
+Edits carry a marker, so the harness can time each edit from its POST to its
+arrival on every peer's stream. All users run in this one process, so that
+timing needs no clock sync.
+
+Pass --serve to start a local backend on the in-memory database
+(MONGO_BACKEND=memory, which needs mongomock-motor). Otherwise pass
+--base-url to point at a running server. Install the tools' dependencies
+with pip install -r benchmarks/requirements.txt.
+
+Usage: python benchmarks/load_test.py --serve --rooms 10 --users 5 --duration 30
+       python benchmarks/load_test.py --base-url http://localhost:8001 --edit-rate 2 --json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+
+    def at(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+    return {
+        "count": len(samples),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": round(samples[-1], 2),
+    }
+
+
+class Stats:
+    """Request latencies, errors and broadcast delivery samples for the whole run"""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.events = defaultdict(int)
+        self.delivery_ms = []
+        # edit marker -> perf_counter when the edit was posted
+        self.edits_sent = {}
+
+    async def call(self, client, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            failed = response.status_code >= 400 or "error" in response.json()
+        except (httpx.HTTPError, ValueError):
+            failed = True
+            response = None
+        self.latency[name].append((time.perf_counter() - started) * 1000)
+        if failed:
+            self.errors[name] += 1
+        return response
+
+
+class SimulatedUser:
+    def __init__(self, args, stats, room_id, index):
+        self.args = args
+        self.stats = stats
+        self.room_id = room_id
+        self.user_id = f"load_{room_id[:8]}_{index}"
+        self.user_name = f"Load User {index}"
+        self.edits = 0
+        self.pending_acks = []
+        self.connected = asyncio.Event()
+
+    async def listen(self, client, stop):
+        """Hold an SSE stream open and time every edit marker that arrives"""
+        try:
+            async with client.stream("GET", f"/api/sse/{self.user_id}", timeout=None) as response:
+                self.connected.set()
+                async for line in response.aiter_lines():
+                    if stop.is_set():
+                        break
+                    if not line.startswith("data: "):
+                        continue
+                    received = time.perf_counter()
+                    event = json.loads(line[6:])
+                    self.stats.events[event.get("type")] += 1
+                    if "seq" in event:
+                        self.pending_acks.append((event["seq"], received))
+                    if event.get("type") == "code_updated":
+                        sent = self.stats.edits_sent.get(event["data"]["code"].split("\n", 1)[0])
+                        if sent is not None:
+                            self.stats.delivery_ms.append((received - sent) * 1000)
+        except httpx.HTTPError:
+            self.stats.errors["sse"] += 1
+        finally:
+            self.connected.set()
+
+    async def every(self, rate, stop, action):
+        if rate <= 0:
+            return
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=random.expovariate(rate))
+            except asyncio.TimeoutError:
+                await action()
+
+    async def edit(self, client):
+        self.edits += 1
+        marker = f"// {self.user_id} edit {self.edits}"
+        self.stats.edits_sent[marker] = time.perf_counter()
+        code = marker + "\n" + "x = 1\n" * self.args.code_lines
+        await self.stats.call(client, "code", "POST", "/api/rooms/code", json={
+            "room_id": self.room_id, "user_id": self.user_id, "user_name": self.user_name, "code": code
+        })
+
+    async def cursor(self, client):
+        await self.stats.call(client, "cursor", "POST", "/api/rooms/cursor", json={
+            "room_id": self.room_id, "user_id": self.user_id, "user_name": self.user_name,
+            "position": {"lineNumber": random.randint(1, 50), "column": random.randint(1, 80)}
+        })
+
+    async def chat(self, client):
+        await self.stats.call(client, "chat", "POST", "/api/send-chat-message", json={
+            "room_id": self.room_id, "user_id": self.user_id, "user_name": self.user_name,
+            "message": f"load test message {random.randint(0, 9999)}"
+        })
+
+    async def ack(self, client):
+        pending, self.pending_acks = self.pending_acks, []
+        if pending:
+            now = time.perf_counter()
+            await self.stats.call(client, "ack", "POST", "/api/rooms/ack", json={
+                "room_id": self.room_id, "user_id": self.user_id,
+                "acks": [{"seq": seq, "hold_ms": (now - received) * 1000} for seq, received in pending]
+            })
+
+    async def run(self, client, stop):
+        await self.stats.call(client, "join", "POST", "/api/rooms/join", json={
+            "room_id": self.room_id, "user_id": self.user_id, "user_name": self.user_name
+        })
+        listener = asyncio.create_task(self.listen(client, stop))
+        await self.connected.wait()
+        tasks = [
+            self.every(self.args.edit_rate, stop, lambda: self.edit(client)),
+            self.every(self.args.cursor_rate, stop, lambda: self.cursor(client)),
+            self.every(self.args.chat_rate, stop, lambda: self.chat(client)),
+        ]
+        if self.args.ack:
+            tasks.append(self.every(1.0, stop, lambda: self.ack(client)))
+        await asyncio.gather(*tasks)
+        await self.stats.call(client, "leave", "POST", "/api/leave-room", json={
+            "room_id": self.room_id, "user_id": self.user_id, "user_name": self.user_name
+        })
+        listener.cancel()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+def start_server(port, **extra_env):
+    env = {**os.environ, "MONGO_BACKEND": "memory", "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"), **extra_env}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+async def run_load(args):
+    stats = Stats()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.rooms * args.users + 50)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        room_ids = []
+        for index in range(args.rooms):
+            response = await stats.call(client, "create_room", "POST", "/api/rooms", json={
+                "name": f"load-room-{index}", "language": "python"
+            })
+            if response is None or response.status_code != 200:
+                raise RuntimeError("Could not create rooms; is the server reachable?")
+            room_ids.append(response.json()["id"])
+
+        users = [SimulatedUser(args, stats, room_id, index) for room_id in room_ids for index in range(args.users)]
+        stop = asyncio.Event()
+        started = time.perf_counter()
+        runners = []
+        for user in users:
+            runners.append(asyncio.create_task(user.run(client, stop)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / len(users))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        elapsed = time.perf_counter() - started
+        await asyncio.wait(runners, timeout=args.timeout + 5)
+
+        server_latency = None
+        if args.ack:
+            response = await client.get("/api/propagation/metrics")
+            if response.status_code == 200:
+                server_latency = response.json()
+
+    requests = sum(len(samples) for samples in stats.latency.values())
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1),
+        "events_received": dict(stats.events),
+        "events_per_second": round(sum(stats.events.values()) / elapsed, 1),
+        "errors": dict(stats.errors),
+        "request_latency_ms": {name: percentiles(samples) for name, samples in stats.latency.items()},
+        "edit_delivery_ms": percentiles(stats.delivery_ms),
+        "server_propagation": server_latency,
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['requests_per_second']} req/s), {report['events_per_second']} events/s received")
+    print(f"{'operation':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    rows = dict(report["request_latency_ms"])
+    rows["edit delivery"] = report["edit_delivery_ms"]
+    for name, stats in rows.items():
+        if not stats["count"]:
+            continue
+        print(f"{name:<14}{stats['count']:>8}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}"
+              f"{stats['max']:>10}{report['errors'].get(name, 0):>8}")
+    if report["errors"].get("sse"):
+        print(f"SSE stream failures: {report['errors']['sse']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--serve", action="store_true", help="start a local server on the in-memory database")
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--users", type=int, default=4, help="users per room")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of steady load")
+    parser.add_argument("--ramp", type=float, default=2, help="seconds over which users join")
+    parser.add_argument("--edit-rate", type=float, default=1.0, help="edits per user per second")
+    parser.add_argument("--cursor-rate", type=float, default=2.0, help="cursor moves per user per second")
+    parser.add_argument("--chat-rate", type=float, default=0.1, help="chat messages per user per second")
+    parser.add_argument("--code-lines", type=int, default=50, help="lines of code sent with each edit")
+    parser.add_argument("--ack", action="store_true", help="ack events so the server records propagation latency")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    server = None
+    if args.serve:
+        port = free_port()
+        args.base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port)
+    try:
+        await wait_for_server(args.base_url)
+        report = await run_load(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
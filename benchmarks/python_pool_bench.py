@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Cold vs warm start latency for local Python execution
+
+Runs the same snippets through the local executor with a fresh interpreter
+per run (cold) and through the pre-warmed worker pool (warm).
+
+Usage: python benchmarks/python_pool_bench.py [--runs 30] [--pool-size 4]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from executors import LocalExecutor  # noqa: E402
+from python_pool import PythonWorkerPool  # noqa: E402
+
+SNIPPETS = {
+    "hello": 'print("hello")',
+    "imports": "import json, re, random, collections\nprint(json.dumps(collections.Counter('abracadabra')))",
+    "stdin": "n = int(input())\nprint(sum(range(n)))",
+}
+
+
+class Request:
+    def __init__(self, code, stdin=""):
+        self.code = code
+        self.stdin = stdin
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+async def measure(executor, request, runs, settle):
+    samples = []
+    for _ in range(runs):
+        if settle:
+            # Give the pool time to refill so every run starts warm
+            await asyncio.sleep(settle)
+        started = time.perf_counter()
+        result = await executor.run(request, "python", "local")
+        samples.append((time.perf_counter() - started) * 1000)
+        if result["exit_code"] != 0:
+            raise RuntimeError(f"benchmark snippet failed: {result['stderr']}")
+    return summarize(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--settle", type=float, default=0.2, help="seconds to wait between warm runs")
+    args = parser.parse_args()
+
+    cold = LocalExecutor()
+    cold.python_pool = None
+
+    os.environ["PYTHON_POOL_SIZE"] = str(args.pool_size)
+    warm = LocalExecutor()
+    warm.python_pool = PythonWorkerPool(warm)
+    await warm.start()
+
+    print(f"{'snippet':<10} {'mode':<5} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    print("-" * 43)
+    try:
+        for name, code in SNIPPETS.items():
+            request = Request(code, "1000\n")
+            for mode, executor, settle in (("cold", cold, 0), ("warm", warm, args.settle)):
+                stats = await measure(executor, request, args.runs, settle)
+                print(f"{name:<10} {mode:<5} {stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['mean']:>8.1f}")
+    finally:
+        await warm.close()
+
+    pool = warm.python_pool.metrics()
+    print("-" * 43)
+    print(f"warm runs: {pool['warm_runs']}, cold fallbacks: {pool['cold_fallbacks']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Replay recorded API traffic against a server at 1x or faster
+
+Plays back a capture written by the server with TRAFFIC_RECORDING=true: join,
+code, cursor, chat, typing and leave requests at their recorded offsets,
+divided by --speed. Every recorded room is recreated on the target and every
+user gets a stable replay ID, so the same capture always produces the same
+request sequence. Each user's requests are sent in recorded order. Users run
+concurrently, and each holds an SSE stream from just before its first request
+until it leaves, so broadcast fan-out matches the original traffic.
+
+The report has the load test's request latency table plus schedule lag: how
+late requests went out compared to the recording. High lag means the server,
+or this client, could not keep up at that speed. Requests whose HTTP
+status class (success or error) differs from the recording are counted as
+mismatches.
+
+Usage: python benchmarks/replay_traffic.py traffic.ndjson.gz --serve
+       python benchmarks/replay_traffic.py traffic.ndjson.gz --base-url http://localhost:8001 --speed 4 --json replay.json
+"""
+
+import gzip
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from load_test import Stats, free_port, percentiles, print_report, start_server, wait_for_server
+
+PATHS = {
+    "join": "/api/rooms/join",
+    "code": "/api/rooms/code",
+    "cursor": "/api/rooms/cursor",
+    "chat": "/api/send-chat-message",
+    "typing": "/api/typing-status",
+    "leave": "/api/leave-room",
+}
+
+# Seconds (at recorded pace) a user's SSE stream opens before its first request
+STREAM_LEAD = 0.5
+
+
+def load_recording(path, duration=None):
+    """Recorded requests as (offset seconds, endpoint, status, body), recordings placed back to back"""
+    events = []
+    segment_start = 0.0
+    last = 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if "format" in entry:
+                if entry["format"] != "codesync-traffic" or entry["version"] != 1:
+                    raise ValueError(f"Unsupported recording format {entry['format']} v{entry['version']}")
+                # A server restart appended a new recording; continue right after the previous one
+                segment_start = last
+                continue
+            offset = segment_start + entry["t"] / 1000
+            if duration is not None and offset > duration:
+                break
+            last = max(last, offset)
+            events.append((offset, entry["e"], entry["s"], entry["b"]))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+class Replay:
+    def __init__(self, args, stats, client, events):
+        self.args = args
+        self.stats = stats
+        self.client = client
+        self.events = events
+        self.rooms = {}
+        self.users = {}
+        self.lag_ms = []
+        self.mismatches = defaultdict(int)
+        self.started = None
+
+    def user_key(self, body):
+        return body.get("user_id") if isinstance(body, dict) else None
+
+    async def create_rooms(self):
+        """Recreate every recorded room on the target, in order of first use"""
+        for _, _, _, body in self.events:
+            if isinstance(body, dict) and isinstance(body.get("room_id"), str) and body["room_id"] not in self.rooms:
+                response = await self.stats.call(self.client, "create_room", "POST", "/api/rooms", json={
+                    "name": f"replay-{len(self.rooms)}", "language": "python"
+                })
+                if response is None or response.status_code != 200:
+                    raise RuntimeError("Could not create rooms; is the server reachable?")
+                self.rooms[body["room_id"]] = response.json()["id"]
+
+    def rewrite(self, body):
+        if not isinstance(body, dict):
+            return body
+        body = dict(body)
+        if body.get("room_id") in self.rooms:
+            body["room_id"] = self.rooms[body["room_id"]]
+        if isinstance(body.get("user_id"), str):
+            body["user_id"] = self.users.setdefault(body["user_id"], f"{self.args.id_prefix}_{len(self.users)}")
+        return body
+
+    async def wait_until(self, offset):
+        delay = self.started + offset / self.args.speed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def listen(self, user_id, connected):
+        try:
+            async with self.client.stream("GET", f"/api/sse/{user_id}", timeout=None) as response:
+                connected.set()
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        self.stats.events[json.loads(line[6:]).get("type")] += 1
+        except httpx.HTTPError:
+            self.stats.errors["sse"] += 1
+        finally:
+            connected.set()
+
+    async def open_stream(self, user_id):
+        connected = asyncio.Event()
+        task = asyncio.create_task(self.listen(user_id, connected))
+        await connected.wait()
+        return task
+
+    async def close_stream(self, task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def play_user(self, user_events):
+        """Send one user's requests in recorded order, each no earlier than its scheduled time"""
+        stream = None
+        for offset, endpoint, status, body in user_events:
+            if stream is None and self.args.listen and isinstance(body, dict) and "user_id" in body:
+                await self.wait_until(max(0.0, offset - STREAM_LEAD))
+                stream = await self.open_stream(body["user_id"])
+            await self.wait_until(offset)
+            self.lag_ms.append(max(0.0, (time.monotonic() - self.started - offset / self.args.speed) * 1000))
+            kwargs = {"json": body} if isinstance(body, dict) else {"content": body}
+            response = await self.stats.call(self.client, endpoint, "POST", PATHS[endpoint], **kwargs)
+            # Only the HTTP status is recorded, so outcomes are compared by status class
+            failed = response is None or response.status_code >= 400
+            if failed != (status >= 400 or status == 0):
+                self.mismatches[endpoint] += 1
+            if endpoint == "leave":
+                await self.close_stream(stream)
+                stream = None
+        await self.close_stream(stream)
+
+    async def run(self):
+        await self.create_rooms()
+        per_user = defaultdict(list)
+        for offset, endpoint, status, body in self.events:
+            body = self.rewrite(body)
+            per_user[self.user_key(body)].append((offset, endpoint, status, body))
+        # Skip the idle time between the server starting to record and the first request
+        self.started = time.monotonic() - self.events[0][0] / self.args.speed
+        await asyncio.gather(*(self.play_user(user_events) for user_events in per_user.values()))
+        return time.monotonic() - self.started - self.events[0][0] / self.args.speed
+
+
+async def run_replay(args):
+    events = load_recording(args.recording, args.duration)
+    if args.limit:
+        events = events[:args.limit]
+    if not events:
+        raise RuntimeError(f"No recorded requests in {args.recording}")
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        replay = Replay(args, stats, client, events)
+        elapsed = await replay.run()
+
+    requests = sum(len(samples) for name, samples in stats.latency.items() if name != "create_room")
+    return {
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items() if key != "json"},
+        "recorded_seconds": round(events[-1][0] - events[0][0], 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "rooms": len(replay.rooms),
+        "users": len(replay.users),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+        "events_received": dict(stats.events),
+        "events_per_second": round(sum(stats.events.values()) / elapsed, 1) if elapsed else 0.0,
+        "errors": dict(stats.errors),
+        "outcome_mismatches": dict(replay.mismatches),
+        "request_latency_ms": {name: percentiles(samples) for name, samples in stats.latency.items()},
+        "edit_delivery_ms": {"count": 0},
+        "schedule_lag_ms": percentiles(replay.lag_ms),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", type=Path, help="gzip NDJSON capture written with TRAFFIC_RECORDING=true")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--serve", action="store_true", help="start a local server on the in-memory database")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback rate; 2 replays twice as fast")
+    parser.add_argument("--duration", type=float, help="only replay the first this many recorded seconds")
+    parser.add_argument("--limit", type=int, help="only replay the first this many requests")
+    parser.add_argument("--no-listen", dest="listen", action="store_false", help="do not open SSE streams")
+    parser.add_argument("--id-prefix", default="replay", help="prefix for replayed user IDs")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    server = None
+    if args.serve:
+        port = free_port()
+        args.base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port)
+    try:
+        await wait_for_server(args.base_url)
+        report = await run_replay(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"Replayed {report['recorded_seconds']}s of traffic from {report['users']} users in {report['rooms']} rooms "
+          f"at {args.speed}x")
+    print_report(report)
+    lag = report["schedule_lag_ms"]
+    print(f"Schedule lag ms: p50={lag['p50']} p95={lag['p95']} p99={lag['p99']} max={lag['max']}")
+    if report["outcome_mismatches"]:
+        print(f"Outcome differs from the recording: {report['outcome_mismatches']}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Long-running churn soak test with memory leak detection
+
+Concurrent workers play out short user sessions over and over. Each session
+creates or joins a room, opens an SSE stream, edits and chats, then ends by
+leaving, by dropping the stream without leaving, or by reconnecting first.
+Rooms are replaced over time, so per-room state churns as well.
+
+While this runs, the harness polls /api/debug/memory. That endpoint needs
+MEMORY_DIAGNOSTICS=true on the server and reports RSS, the sizes of the
+server's in-memory dicts, and tracemalloc growth by source line. After
+--warmup, the harness fits a line to every series and fails when RSS grows
+faster than --max-rss-slope (MB/hour) or any size faster than
+--max-size-slope (entries/hour). Fixed-capacity caches and buffers are
+reported but not checked. Once load stops it waits --drain seconds
+and fails if users, sessions, SSE connections or executions are still held.
+
+Pass --serve to start a local server on the in-memory database with
+diagnostics, tracemalloc and a short cleanup interval and room eviction delay.
+
+Usage: python benchmarks/soak_test.py --serve --duration 3600
+       python benchmarks/soak_test.py --serve --duration 300 --warmup 60 --json soak.json
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+import httpx
+
+from load_test import free_port, start_server, wait_for_server
+
+# Sizes that must return to zero once every simulated user is gone
+RESIDUAL_ZERO = ("room_users", "user_sessions", "sse_connections", "execution_jobs")
+
+# Sizes held by fixed-capacity buffers and caches; they grow until full, which is not a leak
+BOUNDED = ("trace_ring_spans", "room_cache_entries", "execution_cache_entries", "sse_queued_events")
+
+
+def slope_per_hour(points):
+    """Least-squares slope of (seconds, value) points, scaled to units per hour"""
+    if len(points) < 3:
+        return 0.0
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    variance = sum((t - mean_t) ** 2 for t, _ in points)
+    if variance == 0:
+        return 0.0
+    covariance = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return covariance / variance * 3600
+
+
+class Soak:
+    def __init__(self, args, client):
+        self.args = args
+        self.client = client
+        self.rooms = []
+        self.sessions = {"leave": 0, "disconnect": 0, "reconnect": 0}
+        self.errors = 0
+
+    async def post(self, path, payload):
+        try:
+            response = await self.client.post(path, json=payload)
+            if response.status_code >= 400 or "error" in response.json():
+                self.errors += 1
+            return response
+        except (httpx.HTTPError, ValueError):
+            self.errors += 1
+            return None
+
+    async def pick_room(self):
+        if len(self.rooms) < self.args.rooms or random.random() < self.args.room_churn:
+            response = await self.post("/api/rooms", {"name": f"soak-{uuid.uuid4().hex[:6]}", "language": "python"})
+            if response is not None and response.status_code == 200:
+                self.rooms.append(response.json()["id"])
+                if len(self.rooms) > self.args.rooms:
+                    # Forget the oldest room; once its users are gone the server should evict it
+                    self.rooms.pop(0)
+        return random.choice(self.rooms)
+
+    async def listen(self, user_id, connected):
+        try:
+            async with self.client.stream("GET", f"/api/sse/{user_id}", timeout=None) as response:
+                connected.set()
+                async for _ in response.aiter_lines():
+                    pass
+        except httpx.HTTPError:
+            pass
+        finally:
+            connected.set()
+
+    async def open_stream(self, user_id):
+        connected = asyncio.Event()
+        task = asyncio.create_task(self.listen(user_id, connected))
+        await connected.wait()
+        # Let the server register the stream's queue before events are sent
+        await asyncio.sleep(0.05)
+        return task
+
+    async def close_stream(self, task):
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def activity(self, room_id, user_id):
+        for _ in range(random.randint(1, self.args.actions)):
+            action = random.random()
+            if action < 0.6:
+                await self.post("/api/rooms/code", {"room_id": room_id, "user_id": user_id,
+                                                    "code": f"# {user_id}\n" + "print('soak')\n" * 20})
+            elif action < 0.9:
+                await self.post("/api/rooms/cursor", {"room_id": room_id, "user_id": user_id,
+                                                      "position": {"lineNumber": random.randint(1, 20), "column": 1}})
+            else:
+                await self.post("/api/send-chat-message", {"room_id": room_id, "user_id": user_id,
+                                                           "user_name": user_id, "message": "soak"})
+            await asyncio.sleep(random.uniform(0, self.args.think))
+
+    async def session(self):
+        room_id = await self.pick_room()
+        user_id = f"soak_{uuid.uuid4().hex[:10]}"
+        member = {"room_id": room_id, "user_id": user_id, "user_name": user_id}
+        stream = await self.open_stream(user_id)
+        await self.post("/api/rooms/join", member)
+        await self.activity(room_id, user_id)
+
+        ending = random.choices(["leave", "disconnect", "reconnect"], weights=self.args.endings)[0]
+        self.sessions[ending] += 1
+        if ending == "reconnect":
+            await self.close_stream(stream)
+            stream = await self.open_stream(user_id)
+            await self.post("/api/rooms/join", member)
+            await self.activity(room_id, user_id)
+        if ending != "disconnect":
+            await self.post("/api/leave-room", member)
+        await self.close_stream(stream)
+
+    async def worker(self, deadline):
+        while time.monotonic() < deadline:
+            await self.session()
+
+
+async def sample(client, started):
+    response = await client.get("/api/debug/memory", params={"top": 10})
+    if response.status_code == 404:
+        raise RuntimeError("Memory diagnostics are disabled on the server (set MEMORY_DIAGNOSTICS=true)")
+    data = response.json()
+    return {"t": round(time.monotonic() - started, 1), "rss_mb": round(data["rss_bytes"] / 2 ** 20, 2),
+            "traced_mb": round(data["traced_bytes"] / 2 ** 20, 2), **data["sizes"], "_top": data["top_growth"]}
+
+
+async def run_soak(args):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.concurrency * 2 + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        soak = Soak(args, client)
+        samples = []
+        started = time.monotonic()
+        deadline = started + args.duration
+        workers = [asyncio.create_task(soak.worker(deadline)) for _ in range(args.concurrency)]
+
+        while time.monotonic() < deadline:
+            samples.append(await sample(client, started))
+            latest = samples[-1]
+            print(f"[{latest['t']:>7.0f}s] rss={latest['rss_mb']}MB rooms={latest['active_rooms']} "
+                  f"users={latest['room_users']} sse={latest['sse_connections']} sessions={sum(soak.sessions.values())}")
+            await asyncio.sleep(args.sample_interval)
+        await asyncio.gather(*workers)
+
+        await asyncio.sleep(args.drain)
+        residual = await sample(client, started)
+
+    series = [key for key, value in samples[0].items() if key not in ("t", "_top") and isinstance(value, (int, float))]
+    steady = [entry for entry in samples if entry["t"] >= args.warmup]
+    slopes = {key: round(slope_per_hour([(entry["t"], entry[key]) for entry in steady]), 2) for key in series}
+
+    failures = []
+    if slopes["rss_mb"] > args.max_rss_slope:
+        failures.append(f"RSS grows {slopes['rss_mb']} MB/hour (limit {args.max_rss_slope})")
+    for key in series:
+        if key not in ("rss_mb", "traced_mb") + BOUNDED and slopes[key] > args.max_size_slope:
+            failures.append(f"{key} grows {slopes[key]} entries/hour (limit {args.max_size_slope})")
+    for key in RESIDUAL_ZERO:
+        if residual.get(key):
+            failures.append(f"{key} still holds {residual[key]} entries after draining")
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "sessions": soak.sessions,
+        "errors": soak.errors,
+        "samples": [{key: value for key, value in entry.items() if key != "_top"} for entry in samples],
+        "slopes_per_hour": slopes,
+        "residual": {key: value for key, value in residual.items() if key != "_top"},
+        "top_growth": residual["_top"],
+        "failures": failures,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--serve", action="store_true", help="start a local server with diagnostics enabled")
+    parser.add_argument("--duration", type=float, default=3600, help="seconds of churn")
+    parser.add_argument("--warmup", type=float, default=300, help="seconds excluded from slope fitting")
+    parser.add_argument("--drain", type=float, default=30, help="idle seconds before the residual check")
+    parser.add_argument("--sample-interval", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--rooms", type=int, default=10, help="rooms in use at any time")
+    parser.add_argument("--room-churn", type=float, default=0.05, help="chance a session opens a new room")
+    parser.add_argument("--actions", type=int, default=10, help="max edits/cursors/chats per session")
+    parser.add_argument("--think", type=float, default=0.2, help="max pause between actions in seconds")
+    parser.add_argument("--endings", type=float, nargs=3, default=[0.5, 0.3, 0.2], metavar=("LEAVE", "DISCONNECT", "RECONNECT"),
+                        help="relative weights of how sessions end")
+    parser.add_argument("--max-rss-slope", type=float, default=20, help="MB/hour")
+    parser.add_argument("--max-size-slope", type=float, default=50, help="entries/hour for each tracked dict")
+    parser.add_argument("--cleanup-interval", type=float, default=5, help="server cleanup sweep interval with --serve")
+    parser.add_argument("--room-evict-after", type=float, default=10, help="server idle room eviction with --serve")
+    parser.add_argument("--tracemalloc-frames", type=int, default=1, help="0 disables tracemalloc with --serve")
+    parser.add_argument("--json", type=Path, help="write the full report to this file")
+    args = parser.parse_args()
+
+    server = None
+    if args.serve:
+        port = free_port()
+        args.base_url = f"http://127.0.0.1:{port}"
+        server = start_server(
+            port, MEMORY_DIAGNOSTICS="true", TRACEMALLOC_FRAMES=str(args.tracemalloc_frames),
+            SESSION_CLEANUP_INTERVAL=str(args.cleanup_interval), ROOM_EVICT_AFTER=str(args.room_evict_after)
+        )
+    try:
+        await wait_for_server(args.base_url)
+        report = await run_soak(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"\nSessions: {report['sessions']}, request errors: {report['errors']}")
+    print("Growth per hour after warmup:")
+    for key, slope in report["slopes_per_hour"].items():
+        print(f"  {key:<26}{slope:>12}")
+    print("Residual after drain: " + ", ".join(f"{key}={report['residual'][key]}" for key in RESIDUAL_ZERO + ("active_rooms",)))
+    if report["top_growth"]:
+        print("Largest allocation growth since startup:")
+        for stat in report["top_growth"][:5]:
+            print(f"  {stat['size_diff_kb']:>10} KB  {stat['location']}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.json}")
+
+    for failure in report["failures"]:
+        print(f"FAIL {failure}")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,13 +1,32 @@
 #!/usr/bin/env python3
 """
 Deployment health check script for CodeSync
+
+By default this runs each check once and prints pass or fail. With
+--monitor it becomes a synthetic monitor: health, room join, a code update
+round trip seen through a real SSE listener, and run-code are probed
+concurrently and repeatedly, and each --window is summarised as latency
+percentiles and error rates. --json prints one JSON object per window for
+alerting, and the exit code is 1 when any window breaches --max-error-rate
+or --max-p95-ms.
+
+Rooms are permanent, so the monitor creates one room per run and every probe
+shares it. --room-create adds a room creation probe, which leaves a new room
+behind on every run.
 """
 
-import asyncio
-import httpx
 import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import defaultdict
 from datetime import datetime
 
+import httpx
+
 async def check_backend_health(base_url):
     """Check backend API health"""
     try:
@@ -57,17 +76,264 @@ async def check_api_endpoints(base_url):
         print(f"❌ API Test Failed: {str(e)}")
         return False
 
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+
+    def at(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(samples[-1], 2)}
+
+class ProbeFailed(Exception):
+    pass
+
+def expect_ok(response, what):
+    if response.status_code != 200:
+        raise ProbeFailed(f"{what} returned HTTP {response.status_code}")
+    data = response.json()
+    if isinstance(data, dict) and data.get("error"):
+        raise ProbeFailed(f"{what} failed: {data['error']}")
+    return data
+
+async def probe_health(client, state):
+    data = expect_ok(await client.get("/health"), "health")
+    if data.get("status") != "healthy" or data.get("database") != "connected":
+        raise ProbeFailed(f"health status {data.get('status')}, database {data.get('database')}")
+
+async def create_room(client, name):
+    room = expect_ok(await client.post("/api/rooms", json={"name": name, "language": "javascript"}), "room create")
+    return room["id"]
+
+async def probe_room_create(client, state):
+    await create_room(client, "health-check")
+
+async def probe_room_join(client, state):
+    member = {"room_id": state["room_id"], "user_id": f"monitor_{uuid.uuid4().hex[:8]}", "user_name": "Monitor"}
+    expect_ok(await client.post("/api/rooms/join", json=member), "room join")
+    expect_ok(await client.post("/api/leave-room", json=member), "leave room")
+
+async def probe_code_round_trip(client, state, timeout=10.0):
+    """Time a code update from one user's POST to its arrival on another user's SSE stream"""
+    room_id = state["room_id"]
+    suffix = uuid.uuid4().hex[:8]
+    writer = {"room_id": room_id, "user_id": f"monitor_w_{suffix}", "user_name": "Monitor Writer"}
+    reader = {"room_id": room_id, "user_id": f"monitor_r_{suffix}", "user_name": "Monitor Reader"}
+    marker = f"// monitor {suffix}"
+    connected = asyncio.Event()
+
+    async def listen():
+        async with client.stream("GET", f"/api/sse/{reader['user_id']}", timeout=None) as response:
+            connected.set()
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and marker in line:
+                    event = json.loads(line[6:])
+                    if event.get("type") == "code_updated" and event["data"]["code"].startswith(marker):
+                        return time.perf_counter()
+
+    listener = asyncio.create_task(listen())
+    try:
+        await asyncio.wait_for(connected.wait(), timeout)
+        expect_ok(await client.post("/api/rooms/join", json=writer), "writer join")
+        expect_ok(await client.post("/api/rooms/join", json=reader), "reader join")
+        sent = time.perf_counter()
+        expect_ok(await client.post("/api/rooms/code", json={**writer, "code": marker + "\nconsole.log('ok');"}), "code update")
+        try:
+            received = await asyncio.wait_for(listener, timeout)
+        except asyncio.TimeoutError:
+            raise ProbeFailed(f"code update not delivered over SSE within {timeout}s")
+        if received is None:
+            raise ProbeFailed("SSE stream closed before the code update arrived")
+        return (received - sent) * 1000
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        for member in (writer, reader):
+            try:
+                await client.post("/api/leave-room", json=member)
+            except httpx.HTTPError:
+                pass
+
+async def probe_run_code(client, state):
+    # Varying the code keeps the execution cache from answering instead of the runner
+    nonce = uuid.uuid4().hex[:8]
+    data = expect_ok(await client.post("/api/run-code", json={
+        "language": "javascript", "code": f"console.log('health {nonce}');", "cache": False
+    }), "run code")
+    if f"health {nonce}" not in data.get("stdout", ""):
+        raise ProbeFailed(f"run code output was {data.get('stdout', '')[:80]!r}, stderr {data.get('stderr', '')[:80]!r}")
+
+# Probes that run in the monitor's shared room
+NEEDS_ROOM = ("room_join", "code_round_trip")
+
+# Probes left out unless asked for; room_create adds a permanent room per run
+OPT_IN = ("room_create",)
+
+PROBES = {
+    "health": probe_health,
+    "room_create": probe_room_create,
+    "room_join": probe_room_join,
+    "code_round_trip": probe_code_round_trip,
+    "run_code": probe_run_code,
+}
+
+class MonitorRoom:
+    """The one room a monitor run probes in, created on first use outside any timed run"""
+
+    def __init__(self):
+        self.room_id = None
+        self.created = 0
+        self.lock = asyncio.Lock()
+
+    async def get(self, client, timeout):
+        async with self.lock:
+            if self.room_id is None:
+                self.room_id = await asyncio.wait_for(create_room(client, "synthetic-monitor"), timeout)
+                self.created += 1
+        return self.room_id
+
+    def lost(self, room_id):
+        """Forget a room the server no longer knows, so the next run creates another"""
+        if self.room_id == room_id:
+            self.room_id = None
+
+class Window:
+    """Latency samples and failures for every probe over one reporting window"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.latency = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.last_error = {}
+
+    def summary(self, probes):
+        report = {"window_start": datetime.fromtimestamp(self.started).isoformat(), "window_seconds": round(time.time() - self.started, 1), "probes": {}}
+        for name in probes:
+            runs = len(self.latency[name]) + self.failures[name]
+            report["probes"][name] = {
+                "runs": runs,
+                "failures": self.failures[name],
+                "error_rate": round(self.failures[name] / runs, 4) if runs else None,
+                "latency_ms": percentiles(self.latency[name]),
+                "last_error": self.last_error.get(name),
+            }
+        return report
+
+async def probe_worker(client, name, args, stop, windows, room):
+    """Run one probe over and over, recording each run in the current window"""
+    state = {}
+    probe = PROBES[name]
+    # Spread workers out so probes do not fire in lockstep
+    await asyncio.sleep(random.uniform(0, args.interval))
+    while not stop.is_set():
+        window = windows[-1]
+        try:
+            if name in NEEDS_ROOM:
+                state["room_id"] = await room.get(client, args.timeout)
+            started = time.perf_counter()
+            measured = await asyncio.wait_for(probe(client, state), args.timeout)
+            window.latency[name].append(measured if measured is not None else (time.perf_counter() - started) * 1000)
+        except (ProbeFailed, httpx.HTTPError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            window.failures[name] += 1
+            window.last_error[name] = str(e) or type(e).__name__
+            if "Room not found" in str(e):
+                room.lost(state.get("room_id"))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=args.interval)
+        except asyncio.TimeoutError:
+            pass
+
+def breaches(summary, args):
+    problems = []
+    for name, probe in summary["probes"].items():
+        if probe["runs"] == 0:
+            problems.append(f"{name}: no completed runs")
+            continue
+        if probe["error_rate"] > args.max_error_rate:
+            problems.append(f"{name}: error rate {probe['error_rate']:.1%} (last error: {probe['last_error']})")
+        p95 = probe["latency_ms"]["p95"]
+        if args.max_p95_ms and p95 is not None and p95 > args.max_p95_ms:
+            problems.append(f"{name}: p95 {p95}ms")
+    return problems
+
+def print_window(summary, problems):
+    print(f"\nWindow from {summary['window_start']} ({summary['window_seconds']}s)")
+    print(f"{'probe':<18}{'runs':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, probe in summary["probes"].items():
+        latency = probe["latency_ms"]
+        print(f"{name:<18}{probe['runs']:>6}{probe['failures']:>8}" + "".join(
+            f"{latency[key] if latency[key] is not None else '-':>10}" for key in ("p50", "p95", "p99", "max")))
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ All probes within limits")
+
+async def monitor(base_url, args):
+    """Probe every endpoint concurrently until --windows windows have been reported"""
+    probes = [name for name in PROBES
+              if (name not in OPT_IN or args.room_create) and (not args.skip or name not in args.skip)]
+    room = MonitorRoom()
+    windows = [Window()]
+    stop = asyncio.Event()
+    breached = False
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=len(probes) * args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        workers = [asyncio.create_task(probe_worker(client, name, args, stop, windows, room))
+                   for name in probes for _ in range(args.concurrency)]
+        reported = 0
+        while args.windows == 0 or reported < args.windows:
+            await asyncio.sleep(args.window)
+            window = windows[-1]
+            windows[:] = [Window()]
+            summary = window.summary(probes)
+            problems = breaches(summary, args)
+            summary["ok"] = not problems
+            summary["problems"] = problems
+            breached = breached or bool(problems)
+            reported += 1
+            if args.json:
+                print(json.dumps(summary), flush=True)
+            else:
+                print_window(summary, problems)
+        stop.set()
+        await asyncio.gather(*workers)
+    return not breached
+
 async def main():
     """Main health check function"""
-    print(f"CodeSync Deployment Health Check - {datetime.now()}")
-    print("=" * 50)
-    
-    if len(sys.argv) < 2:
-        print("Usage: python check_deployment.py <backend_url>")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backend_url", nargs="?")
+    parser.add_argument("--monitor", action="store_true", help="probe repeatedly and report percentiles per window")
+    parser.add_argument("--window", type=float, default=60, help="seconds per reporting window")
+    parser.add_argument("--windows", type=int, default=1, help="windows to report before exiting (0 runs forever)")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between runs of a probe in each worker")
+    parser.add_argument("--concurrency", type=int, default=2, help="concurrent workers per probe")
+    parser.add_argument("--timeout", type=float, default=15, help="seconds before a probe run counts as failed")
+    parser.add_argument("--skip", nargs="*", choices=list(PROBES), help="probes to leave out")
+    parser.add_argument("--room-create", action="store_true",
+                        help="also probe room creation (every run leaves a new room in the database)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="error rate above which a window fails")
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="p95 latency above which a window fails (0 disables)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per window")
+    args = parser.parse_args()
+
+    if not args.backend_url:
+        print("Usage: python check_deployment.py <backend_url> [--monitor]")
         print("Example: python check_deployment.py https://your-app.onrender.com")
         sys.exit(1)
     
-    backend_url = sys.argv[1].rstrip('/')
+    backend_url = args.backend_url.rstrip('/')
+
+    if args.monitor:
+        if not args.json:
+            print(f"CodeSync Synthetic Monitor - {datetime.now()}")
+            print(f"Monitoring: {backend_url}")
+        ok = await monitor(backend_url, args)
+        sys.exit(0 if ok else 1)
+
+    print(f"CodeSync Deployment Health Check - {datetime.now()}")
+    print("=" * 50)
     
     print(f"Checking: {backend_url}")
     print("-" * 50)
@@ -87,4 +353,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
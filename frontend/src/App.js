@@ -20,6 +20,14 @@ import './App.css';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Cancellations, timeouts and output limits only arrive as the run's error, so show it under stderr
+const appendRunError = (stderr, error) => {
+  if (!error || stderr.endsWith(error)) {
+    return stderr;
+  }
+  return stderr && !stderr.endsWith('\n') ? `${stderr}\n${error}` : `${stderr}${error}`;
+};
+
 function AppContent() {
   const { theme } = useTheme();
   const [eventSource, setEventSource] = useState(null);
@@ -71,6 +79,8 @@ function AppContent() {
   const monacoRef = useRef(null);
   const codeUpdateTimeoutRef = useRef(null);
   const chatEndRef = useRef(null);
+  const outputJobIdRef = useRef(null);
+  const pendingAcksRef = useRef([]);
 
   const languages = [
     { value: 'javascript', label: 'JavaScript' },
@@ -94,6 +104,33 @@ function AppContent() {
     };
   }, [isInRoom, roomId, userId]);
 
+  // Acknowledge received broadcasts in batches so the server can measure delivery latency
+  useEffect(() => {
+    if (!isInRoom || !roomId) {
+      return;
+    }
+
+    const flushAcks = () => {
+      const pending = pendingAcksRef.current;
+      if (pending.length === 0) {
+        return;
+      }
+      pendingAcksRef.current = [];
+      const now = performance.now();
+      axios.post(`${API}/rooms/ack`, {
+        room_id: roomId,
+        user_id: userId,
+        acks: pending.map(({ seq, receivedAt }) => ({ seq, hold_ms: now - receivedAt }))
+      }).catch((error) => console.error('Error sending event acks:', error));
+    };
+
+    const interval = setInterval(flushAcks, 1000);
+    return () => {
+      clearInterval(interval);
+      pendingAcksRef.current = [];
+    };
+  }, [isInRoom, roomId, userId]);
+
   // Auto-scroll chat to bottom when new messages arrive
   useEffect(() => {
     if (chatEndRef.current) {
@@ -119,6 +156,9 @@ function AppContent() {
       try {
         console.log('SSE message received:', event.data);
         const data = JSON.parse(event.data);
+        if (typeof data.seq === 'number') {
+          pendingAcksRef.current.push({ seq: data.seq, receivedAt: performance.now() });
+        }
         handleSSEMessage(data);
       } catch (error) {
         console.error('Error parsing SSE message:', error);
@@ -183,6 +223,36 @@ function AppContent() {
         }));
         break;
       
+      case 'run_queued':
+        setStatusMessage(`Waiting to run code (position ${data.position} in queue)...`);
+        break;
+      
+      case 'run_output':
+        setShowOutput(true);
+        if (outputJobIdRef.current !== data.job_id) {
+          // A new run started in the room; replace the previous output
+          outputJobIdRef.current = data.job_id;
+          setCodeOutput({ stdout: '', stderr: '', exit_code: 0 });
+        }
+        if (data.done) {
+          setCodeOutput(prev => ({
+            ...prev,
+            exit_code: data.exit_code,
+            stderr: appendRunError(prev.stderr, data.error)
+          }));
+          if (data.error) {
+            setStatusMessage(`Code execution failed: ${data.error}`);
+          } else {
+            setStatusMessage(data.exit_code === 0 ? 'Code executed successfully' : 'Code execution completed with errors');
+          }
+          if (data.user_id === userId) {
+            setIsCodeRunning(false);
+          }
+        } else {
+          setCodeOutput(prev => ({ ...prev, [data.stream]: prev[data.stream] + data.data }));
+        }
+        break;
+      
       case 'chat_message':
         console.log('Chat message received:', data);
         setChatMessages(prev => [...prev, data]);
@@ -498,21 +568,51 @@ function AppContent() {
     setStatusMessage('Running code...');
     setShowOutput(true);
     
+    if (isInRoom) {
+      // Output arrives as run_output SSE events so the whole room sees it live
+      try {
+        const response = await axios.post(`${API}/run-code/stream`, {
+          language: language,
+          code: code,
+          stdin: "",
+          room_id: roomId,
+          user_id: userId
+        });
+        if (response.data.error) {
+          throw new Error(response.data.error);
+        }
+      } catch (error) {
+        console.error('Error starting code run:', error);
+        setCodeOutput({
+          stdout: '',
+          stderr: error.response?.data?.message || 'Failed to execute code. Please try again.',
+          exit_code: 1
+        });
+        setStatusMessage('Failed to run code');
+        setIsCodeRunning(false);
+      }
+      return;
+    }
+    
     try {
       const response = await axios.post(`${API}/run-code`, {
         language: language,
         code: code,
-        stdin: ""
+        stdin: "",
+        room_id: roomId,
+        user_id: userId
       });
       
       const result = response.data;
       setCodeOutput({
         stdout: result.stdout || '',
-        stderr: result.stderr || '',
+        stderr: appendRunError(result.stderr || '', result.error),
         exit_code: result.exit_code || 0
       });
       
-      if (result.exit_code === 0) {
+      if (result.error) {
+        setStatusMessage(`Code execution failed: ${result.error}`);
+      } else if (result.exit_code === 0) {
         setStatusMessage('Code executed successfully');
       } else {
         setStatusMessage('Code execution completed with errors');
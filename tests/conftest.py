@@ -0,0 +1,23 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules, as they do when uvicorn runs from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    """server.db swapped for an indexed in-memory database, as MONGO_BACKEND=memory provides"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+    from db_indexes import ensure_indexes
+
+    db = mongomock_motor.AsyncMongoMockClient()["codesync_test"]
+    asyncio.run(ensure_indexes(db))
+    monkeypatch.setattr(server, "db", db)
+    server.room_cache.entries.clear()
+    yield db
+    server.room_cache.entries.clear()
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from db_indexes import QUERY_SHAPES, index_models
+
+
+def structure(value):
+    """A filter with its values blanked, so shapes compare by fields and operators only"""
+    if isinstance(value, dict):
+        return {key: structure(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [structure(item) for item in value]
+    return None
+
+
+class RecordingCursor:
+    def __init__(self, shape):
+        self.shape = shape
+
+    def sort(self, key, direction=None):
+        self.shape["sort"] = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, limit):
+        self.shape["limit"] = limit
+        return self
+
+    def batch_size(self, _size):
+        return self
+
+    async def to_list(self, _length):
+        return []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+class RecordingCollection:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def find(self, query, projection=None):
+        shape = {"collection": self.name, "filter": query, "projection": projection, "sort": None, "limit": None}
+        self.log.append(shape)
+        return RecordingCursor(shape)
+
+    async def find_one(self, query, projection=None):
+        self.log.append({"collection": self.name, "filter": query, "projection": projection, "sort": None, "limit": 1})
+        return None
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.log = []
+
+    def __getattr__(self, name):
+        return RecordingCollection(name, self.log)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    database = RecordingDatabase()
+    monkeypatch.setattr(server, "db", database)
+    return server, database.log
+
+
+async def drain(generator):
+    async for _ in generator:
+        pass
+
+
+def handler_calls(server):
+    cursor = server.encode_status_cursor({"timestamp": datetime(2024, 1, 1), "id": "abc"})
+    return {
+        "GET /api/rooms/{room_id}": server.load_room("room"),
+        "POST /api/rooms/join": server.load_chat_history("room"),
+        "GET /api/status": server.get_status_checks(),
+        "GET /api/status/page": server.get_status_checks_page(limit=100, cursor=None),
+        "GET /api/status/page?cursor": server.get_status_checks_page(limit=100, cursor=cursor),
+        "GET /api/status/export": drain(server.generate_status_export(500)),
+    }
+
+
+def test_query_shapes_mirror_the_handlers(server):
+    server, log = server
+    calls = handler_calls(server)
+    assert sorted(calls) == sorted(shape[0] for shape in QUERY_SHAPES)
+
+    for handler, collection, query, projection, sort, limit in QUERY_SHAPES:
+        log.clear()
+        asyncio.run(calls[handler])
+        assert log == [{
+            "collection": collection,
+            "filter": log[0]["filter"],
+            "projection": projection,
+            "sort": sort,
+            "limit": limit,
+        }], handler
+        assert structure(log[0]["filter"]) == structure(query), handler
+
+
+def status_check_indexes():
+    return {model.document["name"]: model.document for model in index_models()["status_checks"]}
+
+
+def test_plain_timestamp_index_only_backs_the_ttl(monkeypatch):
+    monkeypatch.delenv("STATUS_CHECK_TTL_SECONDS", raising=False)
+    assert set(status_check_indexes()) == {"id_unique", "timestamp_id"}
+
+    monkeypatch.setenv("STATUS_CHECK_TTL_SECONDS", "3600")
+    indexes = status_check_indexes()
+    assert indexes["timestamp"]["expireAfterSeconds"] == 3600
+    assert "timestamp_id" in indexes
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import execution_cache as cache_module
+from execution_cache import ExecutionCache, execution_key
+
+
+@pytest.fixture
+def make_cache(monkeypatch):
+    def make(size=3, ttl=300, max_output=1024):
+        monkeypatch.setenv("EXECUTION_CACHE_ENABLED", "true")
+        monkeypatch.setenv("EXECUTION_CACHE_SIZE", str(size))
+        monkeypatch.setenv("EXECUTION_CACHE_TTL", str(ttl))
+        monkeypatch.setenv("EXECUTION_CACHE_MAX_OUTPUT", str(max_output))
+        return ExecutionCache()
+    return make
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def result(stdout="ok\n"):
+    return {"stdout": stdout, "stderr": "", "exit_code": 0}
+
+
+def test_least_recently_used_entry_is_evicted_first(make_cache):
+    cache = make_cache(size=3)
+    for key in ("a", "b", "c"):
+        cache.put(key, result(key))
+    # Reading a makes b the least recently used
+    assert cache.get("a")["stdout"] == "a"
+    cache.put("d", result("d"))
+
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_the_ttl(make_cache, clock):
+    cache = make_cache(ttl=10)
+    cache.put("key", result())
+    clock[0] += 9.9
+    assert cache.get("key") == result()
+    clock[0] += 0.2
+    assert cache.get("key") is None
+    assert "key" not in cache.entries
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+
+
+def test_output_over_the_cap_is_not_cached(make_cache):
+    cache = make_cache(max_output=10)
+    # The cap counts encoded bytes of stdout and stderr together
+    assert cache.put("fits", {"stdout": "12345", "stderr": "67890", "exit_code": 0}) is True
+    assert cache.put("too_big", {"stdout": "é" * 6, "stderr": "", "exit_code": 0}) is False
+    assert cache.get("too_big") is None
+    assert cache.rejected == 1
+
+
+def test_cached_results_are_copies(make_cache):
+    cache = make_cache()
+    stored = result()
+    cache.put("key", stored)
+    stored["stdout"] = "changed"
+    cache.get("key")["stdout"] = "changed again"
+    assert cache.get("key")["stdout"] == "ok\n"
+
+
+def test_key_covers_every_input_and_treats_missing_stdin_as_empty():
+    base = execution_key("local:python", "3.10.0", "print(1)", "")
+    assert execution_key("local:python", "3.10.0", "print(1)", None) == base
+    assert execution_key("local:python", "3.10.0", "print(1)") == base
+    for other in (
+        execution_key("piston:python", "3.10.0", "print(1)", ""),
+        execution_key("local:python", "3.11.0", "print(1)", ""),
+        execution_key("local:python", "3.10.0", "print(2)", ""),
+        execution_key("local:python", "3.10.0", "print(1)", "input"),
+        # Fields cannot bleed into each other
+        execution_key("local:python", "3.10.0", "print(1)\"", ""),
+    ):
+        assert other != base
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    monkeypatch.setattr(server.runtime_catalog, "resolve", lambda language: ("python", "3.10.0"))
+    server.execution_cache.entries.clear()
+    yield server
+    server.execution_cache.entries.clear()
+
+
+@pytest.mark.parametrize("outcome", [
+    {"stdout": "", "stderr": "", "exit_code": 137, "error": "Execution killed by SIGKILL (time or memory limit exceeded)"},
+    {"stdout": "", "stderr": "", "exit_code": 143, "error": "Execution terminated by SIGTERM"},
+    {"stdout": "partial", "stderr": "", "exit_code": 124, "error": "Execution timed out after 10 seconds"},
+    {"stdout": "", "stderr": "", "exit_code": None},
+], ids=["sigkill", "sigterm", "timeout", "no-exit-code"])
+def test_abnormal_runs_are_never_cached(server, monkeypatch, outcome):
+    async def abnormal_run(request, language, version):
+        return dict(outcome)
+    monkeypatch.setattr(server.executor, "run", abnormal_run)
+
+    request = server.RunCodeRequest(language="python", code="while True: pass")
+    asyncio.run(server.execute_request(request))
+    assert len(server.execution_cache.entries) == 0
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    monkeypatch.setenv("EXEC_OUTPUT_FLUSH_MS", "1")
+    monkeypatch.setattr(server.runtime_catalog, "resolve", lambda language: ("python", "3.10.0"))
+    server.execution_cache.entries.clear()
+    server.active_rooms["room"] = {"users": {}}
+    yield server
+    server.active_rooms.clear()
+    server.execution_cache.entries.clear()
+
+
+def test_cancelled_caller_gets_no_output_from_a_shared_run(server, monkeypatch):
+    events = []
+    release = None
+
+    async def record(room_id, event_type, data, exclude_user=None):
+        events.append(data)
+    monkeypatch.setattr(server, "send_to_room", record)
+
+    async def gated_stream(request, language, version, on_output):
+        await on_output("stdout", "one\n")
+        await release.wait()
+        await on_output("stdout", "two\n")
+        return {"stdout": "one\ntwo\n", "stderr": "", "exit_code": 0}
+    monkeypatch.setattr(server.executor, "stream", gated_stream)
+
+    def output(job_id):
+        return "".join(event["data"] for event in events if event["job_id"] == job_id and not event["done"])
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        code = "print('one'); input(); print('two')"
+        a = await server.run_code_stream(server.RunCodeRequest(language="python", code=code, room_id="room", user_id="a"))
+        b = await server.run_code_stream(server.RunCodeRequest(language="python", code=code, room_id="room", user_id="b"))
+        await asyncio.sleep(0.05)
+        # Both callers see the first chunk live, from one shared execution
+        assert output(a["job_id"]) == output(b["job_id"]) == "one\n"
+        assert server.execution_flights.metrics()["inflight"] == 1
+
+        server.execution_tracker.cancel_user("a", "room", reason="left")
+        await asyncio.sleep(0.05)
+        a_events = len([event for event in events if event["job_id"] == a["job_id"]])
+
+        release.set()
+        await asyncio.sleep(0.05)
+        return a["job_id"], b["job_id"], a_events
+
+    a_job, b_job, a_events = asyncio.run(run())
+    a_stream = [event for event in events if event["job_id"] == a_job]
+    b_stream = [event for event in events if event["job_id"] == b_job]
+
+    # A's stream ends with its cancellation and nothing arrives after it
+    assert len(a_stream) == a_events
+    assert a_stream[-1]["done"] is True
+    assert a_stream[-1]["error"] == "Execution cancelled: user left the room"
+    assert output(a_job) == "one\n"
+
+    # B keeps streaming live and gets each chunk exactly once
+    assert output(b_job) == "one\ntwo\n"
+    assert b_stream[-1]["done"] is True and b_stream[-1]["exit_code"] == 0
+
+
+def test_late_subscriber_catches_up_before_going_live():
+    from execution_cache import SingleFlight
+
+    flights = SingleFlight()
+    received = {"first": [], "late": []}
+
+    async def run():
+        release = asyncio.Event()
+
+        async def work(publish):
+            await publish("stdout", "a")
+            await release.wait()
+            await publish("stdout", "b")
+            return {"stdout": "ab", "stderr": "", "exit_code": 0}
+
+        async def collect(name, stream_name, text):
+            received[name].append(text)
+
+        first = asyncio.ensure_future(flights.run("key", work, lambda s, t: collect("first", s, t)))
+        await asyncio.sleep(0)
+        late = asyncio.ensure_future(flights.run("key", work, lambda s, t: collect("late", s, t)))
+        await asyncio.sleep(0)
+        release.set()
+        return await first, await late
+
+    (_, first_shared), (_, late_shared) = asyncio.run(run())
+    assert (first_shared, late_shared) == (False, True)
+    assert received == {"first": ["a", "b"], "late": ["a", "b"]}
+    assert flights.executions == 1
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from execution_scheduler import ExecutionScheduler, QueueFullError
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    def make(max_concurrent=1, language_limits="", max_queue=100):
+        monkeypatch.setenv("EXEC_MAX_CONCURRENT", str(max_concurrent))
+        monkeypatch.delenv("EXEC_MAX_PER_LANGUAGE", raising=False)
+        monkeypatch.setenv("EXEC_LANGUAGE_LIMITS", language_limits)
+        monkeypatch.setenv("EXEC_MAX_QUEUE", str(max_queue))
+        return ExecutionScheduler()
+    return make
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_cancelled_while_the_slot_is_released(make_scheduler):
+    scheduler = make_scheduler(max_concurrent=1)
+
+    async def run():
+        holder = await scheduler.acquire("python", "room-a")
+        waiters = [asyncio.create_task(scheduler.acquire("python", room)) for room in ("room-b", "room-c")]
+        await settle()
+        assert scheduler.waiting == 2
+
+        # Both waiters are cancelled in the same tick the slot is handed back
+        for waiter in waiters:
+            waiter.cancel()
+        scheduler.release(holder)
+        assert scheduler.running == 0
+
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert scheduler.running == 0
+        assert scheduler.waiting == 0
+        assert not scheduler.rooms
+
+        # The slot is still usable
+        ticket = await asyncio.wait_for(scheduler.acquire("python", "room-d"), 1)
+        scheduler.release(ticket)
+
+    asyncio.run(run())
+
+
+def test_release_skips_a_cancelled_waiter_and_grants_the_next(make_scheduler):
+    scheduler = make_scheduler(max_concurrent=1)
+
+    async def run():
+        holder = await scheduler.acquire("python", "room-a")
+        cancelled = asyncio.create_task(scheduler.acquire("python", "room-b"))
+        live = asyncio.create_task(scheduler.acquire("python", "room-c"))
+        await settle()
+
+        cancelled.cancel()
+        scheduler.release(holder)
+        ticket = await asyncio.wait_for(live, 1)
+        assert ticket.room_id == "room-c"
+        assert scheduler.running == 1
+        await asyncio.gather(cancelled, return_exceptions=True)
+        scheduler.release(ticket)
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+
+def test_language_under_its_cap_is_not_queued_behind_another_language(make_scheduler):
+    scheduler = make_scheduler(max_concurrent=4, language_limits="python=1")
+
+    async def run():
+        running = await scheduler.acquire("python", "room-a")
+        queued = asyncio.create_task(scheduler.acquire("python", "room-a"))
+        await settle()
+        assert scheduler.waiting == 1
+
+        javascript = await asyncio.wait_for(scheduler.acquire("javascript", "room-b"), 1)
+        assert scheduler.running_by_language == {"python": 1, "javascript": 1}
+        assert not queued.done()
+
+        scheduler.release(javascript)
+        scheduler.release(running)
+        scheduler.release(await asyncio.wait_for(queued, 1))
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+
+def test_rooms_are_served_round_robin(make_scheduler):
+    scheduler = make_scheduler(max_concurrent=1)
+    served = []
+
+    async def job(room_id):
+        async with scheduler.slot("python", room_id):
+            served.append(room_id)
+            await asyncio.sleep(0)
+
+    async def run():
+        holder = await scheduler.acquire("python", "busy")
+        jobs = [asyncio.create_task(job(room)) for room in ("a", "a", "a", "b")]
+        await settle()
+        scheduler.release(holder)
+        await asyncio.wait_for(asyncio.gather(*jobs), 1)
+
+    asyncio.run(run())
+    assert served == ["a", "b", "a", "a"]
+
+
+def test_full_queue_rejects_new_waiters(make_scheduler):
+    scheduler = make_scheduler(max_concurrent=1, max_queue=1)
+
+    async def run():
+        holder = await scheduler.acquire("python")
+        waiter = asyncio.create_task(scheduler.acquire("python"))
+        await settle()
+        with pytest.raises(QueueFullError):
+            await scheduler.acquire("python")
+        assert scheduler.rejected == 1
+        scheduler.release(holder)
+        scheduler.release(await waiter)
+
+    asyncio.run(run())
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from execution_tracker import ExecutionTracker
+
+
+async def idle():
+    await asyncio.Event().wait()
+
+
+def test_new_run_supersedes_the_users_previous_run_in_the_room():
+    tracker = ExecutionTracker()
+
+    async def run():
+        first = asyncio.ensure_future(idle())
+        second = asyncio.ensure_future(idle())
+        other_room = asyncio.ensure_future(idle())
+        tracker.track("first", first, "room", "u")
+        tracker.track("other", other_room, "elsewhere", "u")
+        tracker.track("second", second, "room", "u")
+        await asyncio.gather(first, return_exceptions=True)
+
+        assert first.cancelled()
+        assert not other_room.cancelled()
+        assert tracker.pop_reason("first") == "superseded"
+        assert tracker.pop_reason("first") is None
+        assert tracker.current == {("room", "u"): "second", ("elsewhere", "u"): "other"}
+        assert "first" not in tracker.jobs
+
+        for task in (second, other_room):
+            task.cancel()
+        await asyncio.gather(second, other_room, return_exceptions=True)
+
+    asyncio.run(run())
+    assert tracker.current == {}
+    assert tracker.jobs == {}
+    assert tracker.metrics()["cancelled"]["superseded"] == 1
+
+
+def test_current_is_cleaned_up_when_a_run_finishes():
+    tracker = ExecutionTracker()
+
+    async def run():
+        task = asyncio.ensure_future(asyncio.sleep(0))
+        tracker.track("job", task, "room", "u")
+        await task
+        await asyncio.sleep(0)
+        assert tracker.cancel("job") is False
+
+    asyncio.run(run())
+    assert tracker.current == {}
+    assert tracker.jobs == {}
+    assert tracker.pop_reason("job") is None
+
+
+def test_cancel_user_is_scoped_to_the_room():
+    tracker = ExecutionTracker()
+
+    async def run():
+        tasks = {name: asyncio.ensure_future(idle()) for name in ("a1", "a2", "b")}
+        tracker.track("a1", tasks["a1"], "room-a", "u")
+        tracker.track("a2", tasks["a2"], "room-a", None)
+        tracker.track("b", tasks["b"], "room-b", "u")
+        assert tracker.cancel_user("u", "room-a", reason="left") == 1
+        # a1 is still unwinding from its cancellation, so only b is cancelled and a1 keeps its reason
+        assert tracker.cancel_user("u", reason="disconnected") == 1
+        tasks["a2"].cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert tasks["a1"].cancelled() and tasks["b"].cancelled()
+    assert tracker.pop_reason("a1") == "left"
+    assert tracker.pop_reason("b") == "disconnected"
+    # a2 was cancelled outside the tracker, so it has no reason
+    assert tracker.pop_reason("a2") is None
+    assert tracker.current == {}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    monkeypatch.setattr(server, "execution_tracker", ExecutionTracker())
+    monkeypatch.setattr(server.runtime_catalog, "resolve", lambda language: ("python", "3.10.0"))
+
+    async def blocking_run(request, language, version):
+        await idle()
+    monkeypatch.setattr(server.executor, "run", blocking_run)
+
+    server.active_rooms.clear()
+    server.user_sessions.clear()
+    server.sse_connections.clear()
+    server.active_rooms["room"] = {"users": {"u": {"user_id": "u", "user_name": "U"}},
+                                   "cursors": {}, "typing_users": {}, "chat_messages": []}
+    yield server
+    server.active_rooms.clear()
+    server.user_sessions.clear()
+
+
+def start_run(server, user_id="u"):
+    request = server.RunCodeRequest(language="python", code="input()", cache=False, room_id="room", user_id=user_id)
+    return asyncio.ensure_future(server.run_code(request))
+
+
+def test_superseded_run_returns_the_cancelled_result(server):
+    async def run():
+        first = start_run(server)
+        await asyncio.sleep(0.01)
+        second = start_run(server)
+        response = await first
+        server.execution_tracker.cancel_user("u")
+        await asyncio.gather(second, return_exceptions=True)
+        return response
+
+    response = asyncio.run(run())
+    assert response.error == "Execution cancelled: a newer run was started"
+    assert response.stderr == response.error
+    assert response.exit_code == 1
+    assert server.execution_tracker.current == {}
+
+
+def test_leaving_the_room_cancels_the_run(server):
+    async def run():
+        task = start_run(server)
+        await asyncio.sleep(0.01)
+        await server.leave_room(server.LeaveRoomRequest(room_id="room", user_id="u", user_name="U"))
+        return await task
+
+    assert asyncio.run(run()).error == "Execution cancelled: user left the room"
+    assert server.execution_tracker.jobs == {}
+
+
+def test_disconnecting_cancels_the_run(server):
+    async def run():
+        task = start_run(server)
+        await asyncio.sleep(0.01)
+        # The user has no SSE stream, so the sweep treats them as disconnected
+        await server.cleanup_sweep()
+        return await task
+
+    assert asyncio.run(run()).error == "Execution cancelled: user disconnected"
+    assert server.execution_tracker.jobs == {}
+
+
+def test_cancel_endpoint_checks_the_owner_and_cancels(server):
+    async def run():
+        task = start_run(server)
+        await asyncio.sleep(0.01)
+        job_id = next(iter(server.execution_tracker.jobs))
+        stranger = await server.cancel_run(server.CancelRunRequest(room_id="room", user_id="other", job_id=job_id))
+        cancelled = await server.cancel_run(server.CancelRunRequest(room_id="room", user_id="u", job_id=job_id))
+        response = await task
+        nothing_left = await server.cancel_run(server.CancelRunRequest(room_id="room", user_id="u"))
+        return stranger, cancelled, response, nothing_left
+
+    stranger, cancelled, response, nothing_left = asyncio.run(run())
+    assert stranger == {"error": "Execution not found"}
+    assert cancelled == {"success": True, "cancelled": 1}
+    assert response.error == "Execution cancelled"
+    assert nothing_left == {"error": "No running execution to cancel"}
+    assert server.execution_tracker.metrics()["cancelled"]["requested"] == 1
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+import executors
+from executors import PistonExecutor
+
+
+class FakeRequest:
+    code = "print('hi')"
+    stdin = ""
+
+
+def piston_response(monkeypatch, payload, status=200):
+    async def execute(_payload):
+        return httpx.Response(status, json=payload)
+    monkeypatch.setattr(executors.piston_client, "execute", execute)
+
+
+def run(language="python"):
+    return asyncio.run(PistonExecutor().run(FakeRequest(), language, "*"))
+
+
+def test_normal_run_has_no_error(monkeypatch):
+    piston_response(monkeypatch, {"run": {"stdout": "hi\n", "stderr": "", "code": 0, "signal": None}})
+    assert run() == {"stdout": "hi\n", "stderr": "", "exit_code": 0}
+
+
+def test_nonzero_exit_is_a_normal_result(monkeypatch):
+    piston_response(monkeypatch, {"run": {"stdout": "", "stderr": "boom", "code": 3, "signal": None}})
+    assert run() == {"stdout": "", "stderr": "boom", "exit_code": 3}
+
+
+def test_killed_run_becomes_an_error(monkeypatch):
+    piston_response(monkeypatch, {"run": {"stdout": "partial", "stderr": "", "code": None, "signal": "SIGKILL"}})
+    result = run()
+    assert result["exit_code"] == 137
+    assert "SIGKILL" in result["error"]
+    assert result["stdout"] == "partial"
+
+
+def test_piston_message_is_used_as_the_error(monkeypatch):
+    piston_response(monkeypatch, {"run": {"stdout": "", "stderr": "", "code": None, "signal": "SIGKILL",
+                                          "message": "Timeout exceeded"}})
+    assert run()["error"] == "Timeout exceeded"
+
+
+def test_null_code_without_signal_becomes_an_error(monkeypatch):
+    piston_response(monkeypatch, {"run": {"stdout": None, "stderr": None, "code": None, "signal": None}})
+    assert run() == {"stdout": "", "stderr": "", "exit_code": 1, "error": "Execution did not complete"}
+
+
+def test_failed_compile_is_reported_instead_of_an_empty_run(monkeypatch):
+    piston_response(monkeypatch, {"compile": {"stdout": "", "stderr": "error: expected ';'", "code": 1, "signal": None}})
+    result = run("cpp")
+    assert result["exit_code"] == 1
+    assert result["stderr"] == "error: expected ';'"
+    assert result["error"] == "Compilation failed"
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    monkeypatch.setattr(server.runtime_catalog, "resolve", lambda language: ("python", "3.10.0"))
+    server.execution_cache.entries.clear()
+    yield server
+    server.execution_cache.entries.clear()
+
+
+def test_killed_runs_are_not_cached(server, monkeypatch):
+    calls = []
+
+    async def killed_run(request, language, version):
+        calls.append(language)
+        return {"stdout": "", "stderr": "", "exit_code": 137, "error": "Execution killed by SIGKILL"}
+    monkeypatch.setattr(server.executor, "run", killed_run)
+
+    async def twice():
+        request = server.RunCodeRequest(language="python", code="while True: pass")
+        first = await server.execute_request(request)
+        second = await server.execute_request(request)
+        return first, second
+
+    first, second = asyncio.run(twice())
+    assert len(calls) == 2
+    assert not second.get("cached")
+    assert first["error"] == second["error"]
+    assert len(server.execution_cache.entries) == 0
+
+
+def test_completed_runs_are_cached(server, monkeypatch):
+    calls = []
+
+    async def completed_run(request, language, version):
+        calls.append(language)
+        return {"stdout": "hi\n", "stderr": "", "exit_code": 0}
+    monkeypatch.setattr(server.executor, "run", completed_run)
+
+    async def twice():
+        request = server.RunCodeRequest(language="python", code="print('hi')")
+        await server.execute_request(request)
+        return await server.execute_request(request)
+
+    assert asyncio.run(twice())["cached"] is True
+    assert len(calls) == 1
@@ -0,0 +1,90 @@
+import asyncio
+
+from executors import OutputBatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, stream_name, text):
+        self.events.append((stream_name, text))
+
+
+def test_small_writes_are_coalesced_until_the_interval_passes():
+    recorder = Recorder()
+
+    async def run():
+        batcher = OutputBatcher(recorder, interval=0.05, max_bytes=1 << 20)
+        for i in range(100):
+            await batcher.write("stdout", f"line {i}\n")
+        assert recorder.events == []
+        await asyncio.sleep(0.1)
+        assert len(recorder.events) == 1
+        # Output after a quiet period still arrives without an explicit flush
+        await batcher.write("stdout", "late\n")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert recorder.events == [("stdout", "".join(f"line {i}\n" for i in range(100))), ("stdout", "late\n")]
+
+
+def test_size_threshold_flushes_immediately():
+    recorder = Recorder()
+
+    async def run():
+        batcher = OutputBatcher(recorder, interval=60, max_bytes=10)
+        await batcher.write("stdout", "12345")
+        assert recorder.events == []
+        await batcher.write("stdout", "67890")
+        assert recorder.events == [("stdout", "1234567890")]
+        await batcher.write("stdout", "tail")
+        await batcher.flush()
+        assert batcher.timer is None
+
+    asyncio.run(run())
+    assert recorder.events[-1] == ("stdout", "tail")
+
+
+def test_stream_switches_keep_stdout_and_stderr_in_order():
+    recorder = Recorder()
+
+    async def run():
+        batcher = OutputBatcher(recorder, interval=60, max_bytes=1 << 20)
+        await batcher.write("stdout", "a")
+        await batcher.write("stdout", "b")
+        await batcher.write("stderr", "oops")
+        await batcher.write("stdout", "c")
+        await batcher.flush()
+
+    asyncio.run(run())
+    assert recorder.events == [("stdout", "ab"), ("stderr", "oops"), ("stdout", "c")]
+
+
+def test_cancel_drops_buffered_output():
+    recorder = Recorder()
+
+    async def run():
+        batcher = OutputBatcher(recorder, interval=0.01, max_bytes=1 << 20)
+        await batcher.write("stdout", "never sent")
+        batcher.cancel()
+        await asyncio.sleep(0.05)
+        await batcher.flush()
+
+    asyncio.run(run())
+    assert recorder.events == []
+
+
+def test_writes_after_close_are_dropped():
+    recorder = Recorder()
+
+    async def run():
+        batcher = OutputBatcher(recorder, interval=0.01, max_bytes=1 << 20)
+        await batcher.write("stdout", "last")
+        await batcher.close()
+        await batcher.write("stdout", "too late")
+        await asyncio.sleep(0.05)
+        assert batcher.timer is None
+
+    asyncio.run(run())
+    assert recorder.events == [("stdout", "last")]
@@ -0,0 +1,178 @@
+import json
+import socket
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from piston_client import PistonClient
+
+
+class PistonStub:
+    """Piston-compatible /execute endpoint recording which client connection served each request"""
+
+    def __init__(self):
+        self.peers = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        self.peers.append(scope["client"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if scope["path"] == "/api/v2/piston/slow":
+                await asyncio.sleep(1.0)
+            elif scope["path"] == "/api/v2/piston/busy":
+                await asyncio.sleep(0.1)
+            if scope["path"] == "/api/v2/piston/fail":
+                status, payload = 500, {"message": "upstream failure"}
+            else:
+                request = json.loads(body or b"{}")
+                status, payload = 200, {
+                    "language": request.get("language"), "version": "3.10.0",
+                    "run": {"stdout": "ok\n", "stderr": "", "output": "ok\n", "code": 0, "signal": None},
+                }
+        finally:
+            self.in_flight -= 1
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app = PistonStub()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Piston stub did not start")
+        time.sleep(0.01)
+    app.url = f"http://127.0.0.1:{port}/api/v2/piston"
+    app.host = f"127.0.0.1:{port}"
+    yield app
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def make_client(stub, monkeypatch):
+    stub.peers.clear()
+    stub.max_in_flight = 0
+
+    def make(**env):
+        monkeypatch.setenv("PISTON_URL", stub.url)
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        return PistonClient()
+    return make
+
+
+PAYLOAD = {"language": "python", "version": "*", "files": [{"content": "print('ok')"}]}
+
+
+def test_sequential_requests_reuse_one_connection(stub, make_client):
+    client = make_client()
+
+    async def run():
+        await client.start()
+        for _ in range(5):
+            response = await client.execute(PAYLOAD)
+            assert response.status_code == 200
+            assert response.json()["run"]["stdout"] == "ok\n"
+        await client.close()
+
+    asyncio.run(run())
+    # Every request arrived from the same client port, so no new connection was opened
+    assert len(stub.peers) == 5
+    assert len(set(stub.peers)) == 1
+
+
+def test_concurrent_requests_respect_max_connections(stub, make_client):
+    client = make_client(PISTON_MAX_CONNECTIONS=2, PISTON_MAX_KEEPALIVE=2)
+
+    async def run():
+        await client.start()
+        responses = await asyncio.gather(*(client.request("POST", "/busy", json=PAYLOAD) for _ in range(6)))
+        await client.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert all(response.status_code == 200 for response in responses)
+    assert stub.max_in_flight <= 2
+    assert len(set(stub.peers)) <= 2
+
+
+def test_timeout_is_recorded_as_a_host_error(stub, make_client):
+    client = make_client(PISTON_TIMEOUT=0.2)
+
+    async def run():
+        await client.start()
+        with pytest.raises(httpx.TimeoutException):
+            await client.request("POST", "/slow", json=PAYLOAD)
+        await client.close()
+
+    asyncio.run(run())
+    stats = client.metrics()["hosts"][stub.host]
+    assert stats["requests"] == 1
+    assert stats["errors"] == 1
+    assert stats["max_ms"] < 1000
+
+
+def test_per_host_metrics_count_requests_and_server_errors(stub, make_client):
+    client = make_client()
+
+    async def run():
+        await client.execute(PAYLOAD)
+        await client.execute(PAYLOAD)
+        response = await client.request("POST", "/fail", json=PAYLOAD)
+        assert response.status_code == 500
+        await client.close()
+
+    asyncio.run(run())
+    metrics = client.metrics()
+    assert metrics["base_url"] == stub.url
+    assert list(metrics["hosts"]) == [stub.host]
+    stats = metrics["hosts"][stub.host]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 1
+    assert stats["avg_ms"] > 0
+
+
+def test_close_releases_the_pool_and_a_later_request_reopens_it(stub, make_client):
+    client = make_client()
+
+    async def run():
+        await client.start()
+        pooled = client.client
+        await client.execute(PAYLOAD)
+        await client.close()
+        assert pooled.is_closed
+        assert client.client is None
+        assert client.metrics()["started"] is False
+        # Closing twice is harmless, and the next request starts a fresh pool
+        await client.close()
+        response = await client.execute(PAYLOAD)
+        assert response.status_code == 200
+        assert client.client is not pooled
+        await client.close()
+
+    asyncio.run(run())
+    assert len(set(stub.peers)) == 2
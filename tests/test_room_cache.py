@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from room_cache import RoomCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("ROOM_CACHE_TTL", "60")
+    monkeypatch.setenv("ROOM_CACHE_NEGATIVE_TTL", "10")
+    monkeypatch.setenv("ROOM_CACHE_SIZE", "2")
+    return RoomCache()
+
+
+class GatedLoader:
+    """Loader that returns the document as it was when the load started, once released"""
+
+    def __init__(self, document):
+        self.document = document
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self, room_id):
+        self.calls += 1
+        snapshot = dict(self.document) if self.document is not None else None
+        await self.release.wait()
+        return snapshot
+
+
+@pytest.mark.parametrize("write", ["apply", "invalidate", "put"])
+def test_write_during_a_load_keeps_the_stale_result_out_of_the_cache(cache, write):
+    async def run():
+        loader = GatedLoader({"id": "r", "code": "old"})
+        load = asyncio.ensure_future(cache.get("r", loader))
+        await asyncio.sleep(0)
+
+        if write == "apply":
+            cache.apply("r", {"code": "new"})
+        elif write == "invalidate":
+            cache.invalidate("r")
+        else:
+            cache.put("r", {"id": "r", "code": "new"})
+        loader.release.set()
+        stale = await load
+
+        # The in-flight caller still gets what it read, but the cache does not keep it
+        assert stale["code"] == "old"
+        assert cache.versions == {} and cache.loading == {}
+        if write == "put":
+            assert cache.entries["r"][1]["code"] == "new"
+        else:
+            assert "r" not in cache.entries
+
+    asyncio.run(run())
+
+
+def test_overlapping_loads_are_all_discarded_after_a_write(cache):
+    async def run():
+        loader = GatedLoader({"id": "r", "code": "old"})
+        first = asyncio.ensure_future(cache.get("r", loader))
+        second = asyncio.ensure_future(cache.get("r", loader))
+        await asyncio.sleep(0)
+        cache.apply("r", {"code": "new"})
+        loader.release.set()
+        await asyncio.gather(first, second)
+
+        assert "r" not in cache.entries
+        # Versions only live while a load is pending
+        assert cache.versions == {} and cache.loading == {}
+
+        loader.document = {"id": "r", "code": "new"}
+        assert (await cache.get("r", loader))["code"] == "new"
+        assert (await cache.get("r", loader))["code"] == "new"
+        return loader.calls
+
+    assert asyncio.run(run()) == 3
+
+
+def test_unknown_rooms_are_cached_as_missing(cache):
+    async def run():
+        loader = GatedLoader(None)
+        loader.release.set()
+        assert await cache.get("ghost", loader) is None
+        assert await cache.get("ghost", loader) is None
+        # Creating the room replaces the negative entry
+        cache.put("ghost", {"id": "ghost"})
+        assert await cache.get("ghost", loader) == {"id": "ghost"}
+        return loader.calls
+
+    assert asyncio.run(run()) == 1
+    assert cache.negative_hits == 1
+
+
+def test_least_recently_used_room_is_dropped(cache):
+    for room_id in ("a", "b"):
+        cache.put(room_id, {"id": room_id})
+    asyncio.run(cache.get("a", GatedLoader(None)))
+    cache.put("c", {"id": "c"})
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_room_lookups_go_through_the_cache(memory_db):
+    import server
+
+    async def run():
+        room = await server.create_room(server.RoomCreate(name="cached", language="python"))
+        server.room_cache.entries.clear()
+        first = await server.load_room(room.id)
+        await server.get_room(room.id)
+        await server.get_room(room.id)
+        server.active_rooms[room.id] = {"users": {}, "cursors": {}, "code": "", "typing_users": {}, "chat_messages": []}
+        await server.update_code(server.CodeUpdate(room_id=room.id, code="x = 2", user_id="u"))
+        cached = await server.room_cache.get(room.id, server.load_room)
+        stored = await memory_db.rooms.find_one({"id": room.id}, {"_id": 0})
+        server.active_rooms.pop(room.id)
+        return first, cached, stored
+
+    misses = server.room_cache.misses
+    first, cached, stored = asyncio.run(run())
+    assert first["name"] == "cached"
+    assert server.room_cache.misses == misses + 1
+    # The write was merged into the cached room rather than dropped or left stale
+    assert cached["code"] == stored["code"] == "x = 2"
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class UnavailableRooms:
+    async def update_one(self, query, update):
+        raise ConnectionError("database unavailable")
+
+
+class FakeDatabase:
+    rooms = UnavailableRooms()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import server
+    monkeypatch.setattr(server, "ROOM_EVICT_AFTER", 60)
+    server.active_rooms.clear()
+    server.user_sessions.clear()
+    server.sse_connections.clear()
+    server.room_cache.entries.clear()
+    yield server
+    server.active_rooms.clear()
+    server.user_sessions.clear()
+    server.room_cache.entries.clear()
+
+
+def idle_room(messages):
+    return {
+        "name": "idle", "code": "print(1)", "language": "python",
+        "users": {}, "cursors": {}, "typing_users": {},
+        "chat_messages": messages,
+        "empty_since": datetime.utcnow() - timedelta(minutes=5),
+    }
+
+
+def chat(text):
+    return {"id": text, "room_id": "room", "user_id": "u", "user_name": "U", "message": text,
+            "timestamp": datetime(2024, 1, 1)}
+
+
+def test_chat_history_survives_eviction_but_is_not_served_by_room_lookups(server, memory_db):
+    async def run():
+        room = await server.create_room(server.RoomCreate(name="idle", language="python"))
+        server.active_rooms[room.id] = idle_room([chat("hello"), chat("bye")])
+        await server.cleanup_sweep()
+        assert room.id not in server.active_rooms
+
+        looked_up = (await server.get_room(room.id)).body
+        request = server.JoinRoomRequest(room_id=room.id, user_id="alice", user_name="Alice")
+        joined = (await server.join_room(request)).body
+        stored = await memory_db.rooms.find_one({"id": room.id})
+        return room.id, looked_up, joined, stored
+
+    room_id, looked_up, joined, stored = asyncio.run(run())
+    assert [message["message"] for message in stored["chat_messages"]] == ["hello", "bye"]
+    assert [message["message"] for message in server.active_rooms[room_id]["chat_messages"]] == ["hello", "bye"]
+    assert b'"message":"hello"' in joined
+    assert b"chat_messages" not in looked_up
+    assert "chat_messages" not in server.room_cache.entries[room_id][1]
+
+
+def test_room_stays_in_memory_when_history_cannot_be_saved(server, monkeypatch):
+    monkeypatch.setattr(server, "db", FakeDatabase())
+    server.active_rooms["room"] = idle_room([chat("hello")])
+
+    asyncio.run(server.cleanup_sweep())
+    assert server.active_rooms["room"]["chat_messages"] == [chat("hello")]
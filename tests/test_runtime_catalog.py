@@ -0,0 +1,45 @@
+import asyncio
+
+from runtime_catalog import RuntimeCatalog
+
+
+class SlowExecutor:
+    name = "stub"
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    def resolve(self, language):
+        return language, "*"
+
+    async def runtimes(self):
+        self.calls += 1
+        await self.release.wait()
+        return [
+            {"language": "python", "version": "3.9.4", "aliases": ["py"]},
+            {"language": "python", "version": "3.10.0", "aliases": ["py", "python3"]},
+        ]
+
+
+def test_start_does_not_wait_for_the_first_refresh():
+    async def run():
+        executor = SlowExecutor()
+        catalog = RuntimeCatalog(executor)
+        await asyncio.wait_for(catalog.start(), 0.1)
+        await asyncio.sleep(0)
+        # The first refresh is under way, and lookups fall back to the executor meanwhile
+        assert executor.calls == 1
+        assert catalog.resolve("python") == ("python", "*")
+
+        executor.release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        resolved = catalog.resolve("python"), catalog.resolve("py")
+        await catalog.close()
+        return resolved, catalog.metrics()
+
+    resolved, metrics = asyncio.run(run())
+    assert resolved == (("python", "3.10.0"), ("python", "3.10.0"))
+    assert metrics["loaded"] is True
+    assert metrics["refreshes"] == 1
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.fixture
+def server():
+    import server
+    server.active_rooms.clear()
+    server.sse_connections.clear()
+    server.active_rooms["room"] = {"users": {"alice": {}, "bob": {}}}
+    yield server
+    server.active_rooms.clear()
+    server.sse_connections.clear()
+
+
+def frame_payload(frame):
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    return json.loads(frame[len("data: "):])
+
+
+def test_traced_broadcast_carries_its_trace_id_and_records_each_delivery(server):
+    async def run():
+        streams = {user_id: server.generate_sse_stream(user_id) for user_id in ("alice", "bob")}
+        frames = {user_id: asyncio.ensure_future(stream.__anext__()) for user_id, stream in streams.items()}
+        await asyncio.sleep(0)
+
+        root, token = server.tracer.start_root("POST /api/rooms/code", traceparent=f"00-{'a' * 32}-{'b' * 16}-01")
+        await server.send_to_room("room", "code_updated", {"code": "x = 1"})
+        server.tracer.finish(root, token)
+
+        payloads = {user_id: frame_payload(await frame) for user_id, frame in frames.items()}
+        # Delivery is recorded once the frame has been handed on and the stream resumes
+        for user_id, stream in streams.items():
+            server.notify_user(user_id, "ping", {})
+            await stream.__anext__()
+            await stream.aclose()
+        return payloads
+
+    payloads = asyncio.run(run())
+    for payload in payloads.values():
+        assert payload["type"] == "code_updated"
+        assert payload["data"] == {"code": "x = 1"}
+        assert payload["trace_id"] == "a" * 32
+        # The span context stays on the server
+        assert "trace" not in payload
+
+    # The trace_id a client received finds the broadcast and both deliveries
+    spans = server.tracer.ring.trace(payloads["alice"]["trace_id"])
+    names = [span.name for span in spans]
+    assert "room.broadcast" in names
+    assert sorted(span.attributes["user_id"] for span in spans if span.name == "sse.deliver") == ["alice", "bob"]
+
+
+def test_untraced_events_are_delivered_without_recording(server, monkeypatch):
+    delivered = []
+    monkeypatch.setattr(server.tracer, "record", lambda *args, **kwargs: delivered.append(args))
+
+    async def run():
+        stream = server.generate_sse_stream("alice")
+        frame = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        server.notify_user("alice", "run_queued", {"position": 2})
+        payload = frame_payload(await frame)
+        await stream.aclose()
+        return payload
+
+    payload = asyncio.run(run())
+    assert payload == {"type": "run_queued", "data": {"position": 2}}
+    assert delivered == []
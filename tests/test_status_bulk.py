@@ -0,0 +1,77 @@
+import asyncio
+import itertools
+import json
+import uuid
+
+import httpx
+import pytest
+
+
+def post(body, content_type):
+    import server
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/status/bulk", content=body, headers={"content-type": content_type})
+    return asyncio.run(run())
+
+
+def stored_ids(db):
+    async def run():
+        return {document["id"] async for document in db.status_checks.find({}, {"id": 1})}
+    return asyncio.run(run())
+
+
+def test_json_array_with_invalid_records_inserts_the_rest(memory_db):
+    body = json.dumps([{"client_name": "a"}, {"name": "missing client_name"}, {"client_name": "b"}, "not an object"])
+    result = post(body, "application/json").json()
+
+    assert (result["inserted"], result["failed"]) == (2, 2)
+    assert [entry["index"] for entry in result["results"]] == [0, 1, 2, 3]
+    assert "client_name" in result["results"][1]["error"]
+    assert "error" in result["results"][3]
+    assert stored_ids(memory_db) == {result["results"][0]["id"], result["results"][2]["id"]}
+
+
+def test_ndjson_reports_bad_lines_by_position_and_skips_blank_ones(memory_db):
+    body = b'{"client_name": "a"}\n\n{not json}\n{"client_name": "b"}\n'
+    result = post(body, "application/x-ndjson").json()
+
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert result["results"][1]["index"] == 1
+    assert result["results"][1]["error"].startswith("Invalid JSON")
+    assert len(stored_ids(memory_db)) == 2
+
+
+def test_write_errors_map_back_to_request_positions_across_batches(memory_db, monkeypatch):
+    import server
+    monkeypatch.setattr(server, "STATUS_BULK_BATCH_SIZE", 2)
+    asyncio.run(memory_db.status_checks.insert_one({"id": "00000000-0000-0000-0000-000000000003", "client_name": "x"}))
+    # Deterministic ids; the fourth record collides with the existing check
+    counter = itertools.count(1)
+    monkeypatch.setattr(server.uuid, "uuid4", lambda: uuid.UUID(int=next(counter)))
+
+    body = json.dumps([{"client_name": f"c{n}"} for n in range(5)])
+    result = post(body, "application/json").json()
+
+    assert (result["inserted"], result["failed"]) == (4, 1)
+    failed = [entry for entry in result["results"] if "error" in entry]
+    assert [entry["index"] for entry in failed] == [2]
+    assert "E11000" in failed[0]["error"]
+    assert [entry["index"] for entry in result["results"]] == list(range(5))
+
+
+def test_malformed_array_and_non_array_bodies_are_rejected(memory_db):
+    assert post(b"[{", "application/json").status_code == 400
+    # A lone object is read as one NDJSON record
+    assert post(b'{"client_name": "a"}', "application/json").json()["inserted"] == 1
+    assert post(b'[1, 2', "application/json").status_code == 400
+
+
+def test_too_many_records_is_rejected_before_inserting(memory_db, monkeypatch):
+    import server
+    monkeypatch.setattr(server, "STATUS_BULK_MAX_RECORDS", 3)
+    response = post(json.dumps([{"client_name": "a"}] * 4), "application/json")
+    assert response.status_code == 413
+    assert stored_ids(memory_db) == set()
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def status_checks(memory_db):
+    """Seven checks; the middle five share one timestamp so only the id orders them"""
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    documents = [{"id": "first", "client_name": "c", "timestamp": base - timedelta(seconds=1)}]
+    documents += [{"id": f"tie-{n}", "client_name": "c", "timestamp": base} for n in range(5)]
+    documents += [{"id": "last", "client_name": "c", "timestamp": base + timedelta(seconds=1)}]
+    asyncio.run(memory_db.status_checks.insert_many([dict(document) for document in documents]))
+    # Newest first, ties broken by id descending
+    return [document["id"] for document in sorted(documents, key=lambda d: (d["timestamp"], d["id"]), reverse=True)]
+
+
+def get(path, **params):
+    import server
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, params=params)
+    return asyncio.run(run())
+
+
+def test_cursor_walks_every_check_once_across_tied_timestamps(status_checks):
+    seen = []
+    cursor = None
+    for _ in range(len(status_checks)):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = get("/api/status/page", **params).json()
+        assert len(page["items"]) <= 2
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == status_checks
+
+
+def test_exact_final_page_has_no_next_cursor(status_checks):
+    page = get("/api/status/page", limit=len(status_checks)).json()
+    assert [item["id"] for item in page["items"]] == status_checks
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_limit_outside_the_allowed_range_is_rejected(memory_db, limit):
+    assert get("/api/status/page", limit=limit).status_code == 422
+
+
+def test_malformed_cursor_is_a_client_error(memory_db):
+    response = get("/api/status/page", cursor="not-a-cursor")
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+def test_export_is_newline_delimited_json_in_batches(status_checks):
+    import server
+
+    async def chunks():
+        return [chunk async for chunk in server.generate_status_export(3)]
+
+    batches = asyncio.run(chunks())
+    # Each chunk holds whole records and ends on a record boundary
+    assert [chunk.count("\n") for chunk in batches] == [3, 3, 1]
+    assert all(chunk.endswith("\n") for chunk in batches)
+
+    response = get("/api/status/export", batch_size=3)
+    assert response.status_code == 200
+    assert "ndjson" in response.headers["content-type"]
+    lines = response.text.split("\n")
+    assert lines[-1] == ""
+    records = [json.loads(line) for line in lines[:-1]]
+    assert [record["id"] for record in records] == status_checks
+    assert all("_id" not in record for record in records)
+
+
+def test_export_of_an_empty_collection_is_empty(memory_db):
+    response = get("/api/status/export")
+    assert response.status_code == 200
+    assert response.text == ""